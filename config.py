@@ -9,9 +9,87 @@ MONGODB_URI = os.getenv("MONGODB_URI")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+YOUTUBE_API_BASE_URL = os.getenv("YOUTUBE_API_BASE_URL", "https://www.googleapis.com/youtube/v3")  # 로컬 대체 서버로 바꿀 수 있음
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
 
+# 개발 모드: DB 조회 함수마다 explain()으로 실행 계획을 확인하고 컬렉션 전체 스캔(COLLSCAN)이면 경고
+DB_EXPLAIN_QUERIES = os.getenv("DB_EXPLAIN_QUERIES", "false").lower() in ("1", "true", "yes")
+
 # 기타 설정
-MAX_VIDEO_DURATION = 1200  # 20분 (초 단위)
\ No newline at end of file
+MAX_VIDEO_DURATION = 30 * 60  # 30분 (초 단위). 웹 페이지와 worker 프로세스가 모두 이 값을 사용
+
+# 임베딩 설정
+EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_MAX_WORKERS = int(os.getenv("EMBEDDING_MAX_WORKERS", "4"))  # 동시에 보낼 임베딩 요청 수
+EMBEDDING_STORAGE_DTYPE = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32")  # DB 저장 형식: float32 또는 int8(양자화)
+CHUNK_MAX_TOKENS = 400  # 검색용 청크(패시지)당 최대 토큰 수
+CHUNK_OVERLAP_TOKENS = 50  # 이웃한 청크가 겹치는 토큰 수
+
+# 벡터 인덱스(FAISS) 저장 경로
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", os.path.join("data", "vector_index"))
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", os.path.join("data", "lexical_index"))
+
+# 질문 응답(검색/프롬프트) 설정
+RETRIEVAL_CANDIDATES = 50  # 어휘/벡터 검색에서 각각 가져올 후보 패시지 수
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))  # 프롬프트에 넣을 패시지의 최대 토큰 수
+
+# 공유 캐시 설정 (답변, 비디오 정보 등). memory: 프로세스 내만, sqlite: 같은 머신의 프로세스 간 공유,
+# redis: 여러 서버 간 공유 (CACHE_URL 필요, redis 패키지 설치 필요)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", os.path.join("data", "cache.sqlite3"))
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", "2048"))  # 프로세스 내 캐시 최대 항목 수
+# 공유 캐시 값을 프로세스 내에 보관하는 최대 시간 (초). 다른 프로세스에서 지우거나 바꾼 값이 이 시간 동안 보일 수 있음
+CACHE_LOCAL_TTL = int(os.getenv("CACHE_LOCAL_TTL", "10"))
+
+# 답변 캐시 설정
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))  # 초 단위
+ANSWER_CACHE_SIMILARITY = 0.95  # 질문 임베딩의 코사인 유사도가 이 값 이상이면 같은 질문으로 간주
+
+# 백그라운드 작업 설정
+JOB_WORKER_THREADS = int(os.getenv("JOB_WORKER_THREADS", "2"))  # 웹 프로세스 내 작업 스레드 수 (0이면 별도 worker 프로세스만 사용)
+JOB_STALE_SECONDS = 15 * 60  # 이 시간 동안 진행 상황(또는 heartbeat)이 갱신되지 않은 실행 중 작업은 다시 대기열로
+JOB_HEARTBEAT_INTERVAL = 60  # 진행 상황 변화 없이 기다리는 단계에서 작업이 살아 있음을 기록하는 간격 (초)
+
+# 동시 인제스트 중복 방지 설정
+INGEST_LEASE_SECONDS = 10 * 60  # 비디오 처리 선점 기한 (오래 걸리는 단계 전에 연장)
+INGEST_WAIT_TIMEOUT = int(os.getenv("INGEST_WAIT_TIMEOUT", str(30 * 60)))  # 다른 요청의 처리 완료를 기다리는 최대 시간
+INGEST_POLL_INTERVAL = 2  # 처리 완료 여부 확인 간격 (초)
+INGEST_LOOKUP_THREADS = 8  # 인제스트 앞단(DB 확인, 비디오 정보, 자막)을 동시에 조회하는 스레드 수
+
+# 오디오 변환(Whisper) 설정
+AUDIO_SEGMENT_SECONDS = 5 * 60  # 동시에 변환할 오디오 구간 길이
+AUDIO_SEGMENT_OVERLAP_SECONDS = 2  # 경계에서 잘린 단어를 보완하기 위해 이웃 구간과 겹치는 길이
+TRANSCRIPTION_MAX_WORKERS = int(os.getenv("TRANSCRIPTION_MAX_WORKERS", "4"))  # 동시에 보낼 Whisper 요청 수
+
+# YouTube 비디오 정보 캐시 설정
+VIDEO_METADATA_TTL = int(os.getenv("VIDEO_METADATA_TTL", str(24 * 3600)))  # 초 단위 (만료 후에는 ETag로 재검증)
+
+# 재생목록/채널 가져오기 설정
+BULK_IMPORT_CONCURRENCY = int(os.getenv("BULK_IMPORT_CONCURRENCY", "3"))  # 가져오기 하나에서 동시에 처리할 동영상 수
+
+# 채널 구독 설정
+SUBSCRIPTION_POLL_INTERVAL = int(os.getenv("SUBSCRIPTION_POLL_INTERVAL", str(30 * 60)))  # 채널별 새 업로드 확인 간격 (초)
+
+# 동영상 목록 페이지 설정
+VIDEO_LIST_PAGE_SIZE = int(os.getenv("VIDEO_LIST_PAGE_SIZE", "20"))  # 목록 한 페이지에 표시할 동영상 수
+DATA_CACHE_TTL = int(os.getenv("DATA_CACHE_TTL", "60"))  # 화면 조회 결과 캐시 유지 시간 (초, 변경 시에는 즉시 무효화)
+DATA_CACHE_MAX_ENTRIES = int(os.getenv("DATA_CACHE_MAX_ENTRIES", "1000"))  # 조회 함수별 최대 캐시 항목 수
+
+# 외부 API 호출 한도 (분당 요청 수, 분당 토큰 수, 최대 동시 요청 수). 계정 등급에 맞게 환경 변수로 조정
+RATE_LIMITS = {
+    "openai_embeddings": {"requests_per_minute": int(os.getenv("OPENAI_EMBEDDING_RPM", "3000")),
+                          "tokens_per_minute": int(os.getenv("OPENAI_EMBEDDING_TPM", "1000000")),
+                          "max_concurrency": 8},
+    "openai_whisper": {"requests_per_minute": int(os.getenv("OPENAI_WHISPER_RPM", "50")), "max_concurrency": 8},
+    "gemini": {"requests_per_minute": int(os.getenv("GEMINI_RPM", "60")),
+               "tokens_per_minute": int(os.getenv("GEMINI_TPM", "1000000")),
+               "max_concurrency": 8},
+    "youtube_data": {"requests_per_minute": int(os.getenv("YOUTUBE_DATA_RPM", "600")), "max_concurrency": 16},
+    "youtube_transcript": {"requests_per_minute": int(os.getenv("YOUTUBE_TRANSCRIPT_RPM", "30")), "max_concurrency": 4},
+    # yt-dlp 메타데이터/자막 목록 추출과 자막 파일 다운로드 (API 키 없이 youtube.com에 직접 요청)
+    "ytdlp": {"requests_per_minute": int(os.getenv("YTDLP_RPM", "30")), "max_concurrency": 4},
+}
+RATE_LIMIT_MAX_RETRIES = 5  # 한도 초과/일시적 오류 시 최대 재시도 횟수
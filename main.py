@@ -2,7 +2,7 @@
 
 import streamlit as st
 import time 
-from modules import auth, ui
+from modules import auth, database, ui
 
 st.set_page_config(page_title="유튜브 질문하기", page_icon="🎥", layout="wide")
 
@@ -56,6 +56,7 @@ st.markdown(
 )
 
 def main():
+    database.ensure_indexes()  # 프로세스당 한 번만 생성 (이후 호출은 바로 반환)
     ui.show_header()
     check_session_timeout()  # 세션 타임아웃 체크 및 갱신
 
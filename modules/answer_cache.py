@@ -0,0 +1,187 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+
+from config import ANSWER_CACHE_TTL, ANSWER_CACHE_SIMILARITY
+from modules import cache as shared_cache  # 모듈 끝의 답변 캐시 인스턴스(cache)와 구분
+
+logger = logging.getLogger(__name__)
+
+# 다른 요청의 답변 생성을 기다리는 최대 시간 (초)
+INFLIGHT_WAIT_TIMEOUT = 180
+
+# 공유 캐시 키: 답변, 비디오 집합별 답변 키 목록, 비디오별 비디오 집합 목록
+ANSWER_KEY = "answer:{}"
+SCOPE_KEY = "answer_scope:{}"
+VIDEO_KEY = "answer_video:{}"
+MAX_ENTRIES_PER_SCOPE = 200
+MAX_SCOPES_PER_VIDEO = 200
+
+
+def normalize_question(question):
+    """대소문자, 공백, 끝의 문장부호 차이를 없앤 질문 문자열"""
+    question = re.sub(r'\s+', ' ', question.strip().lower())
+    return question.rstrip(' ?!.。？！')
+
+
+def scope_key(video_ids):
+    """답변의 근거가 되는 비디오 집합의 키"""
+    return ",".join(sorted(set(video_ids)))
+
+
+def entry_key(video_ids, question):
+    """(비디오 집합, 정규화된 질문)의 정확 일치 키"""
+    raw = f"{scope_key(video_ids)}\n{normalize_question(question)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _scope_hash(scope):
+    return hashlib.sha256(scope.encode('utf-8')).hexdigest()
+
+
+def _append_unique(values, value, max_length):
+    """목록 끝에 값을 추가하고 오래된 항목부터 잘라 최대 길이를 유지합니다."""
+    values = [item for item in (values or []) if item != value] + [value]
+    return values[-max_length:]
+
+
+def _cosine(matrix, vector):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    vector = np.asarray(vector, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * max(np.linalg.norm(vector), 1e-12)
+    return (matrix @ vector) / np.maximum(norms, 1e-12)
+
+
+class _Flight:
+    """진행 중인 답변 생성 하나를 나타내며, 같은 질문의 다른 요청이 결과를 기다립니다."""
+
+    def __init__(self, key):
+        self.key = key
+        self.event = threading.Event()
+        self.answer = None
+
+    def wait(self, timeout=INFLIGHT_WAIT_TIMEOUT):
+        self.event.wait(timeout)
+        return self.answer
+
+
+class AnswerCache:
+    """
+    (비디오 집합, 질문) 기준의 답변 캐시
+
+    정규화된 질문의 정확 일치를 먼저 찾고, 없으면 같은 비디오 집합에서 질문 임베딩의
+    코사인 유사도가 임계값 이상인 항목을 찾습니다.
+    답변은 공유 캐시(modules.cache)에 저장하므로 같은 저장소를 쓰는 다른 프로세스/서버와 공유됩니다.
+    유사 질문 검색과 무효화를 위해 비디오 집합별 답변 키 목록과 비디오별 비디오 집합 목록을 함께 저장합니다.
+    """
+
+    def __init__(self, backend=None, similarity_threshold=ANSWER_CACHE_SIMILARITY, ttl=ANSWER_CACHE_TTL):
+        self._backend = backend
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = shared_cache.get_cache()
+        return self._backend
+
+    def _find_similar(self, video_ids, question_embedding):
+        entry_keys = self.backend.get(SCOPE_KEY.format(_scope_hash(scope_key(video_ids)))) or []
+        entries = self.backend.get_many([ANSWER_KEY.format(key) for key in entry_keys])
+        candidates = [entry for entry in entries.values() if entry.get("embedding") is not None]
+        if not candidates:
+            return None
+        similarities = _cosine([entry["embedding"] for entry in candidates], question_embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        logger.info(f"유사 질문 캐시 적중 (유사도 {similarities[best]:.3f}): {candidates[best]['question']}")
+        return candidates[best]["answer"]
+
+    def lookup(self, video_ids, question, question_embedding=None):
+        """캐시된 답변을 반환합니다. 없으면 None"""
+        try:
+            entry = self.backend.get(ANSWER_KEY.format(entry_key(video_ids, question)))
+            if entry is not None:
+                return entry["answer"]
+            if question_embedding is None:
+                return None
+            return self._find_similar(video_ids, question_embedding)
+        except Exception as e:
+            logger.warning(f"답변 캐시 조회 중 오류 발생: {str(e)}")
+            return None
+
+    def store(self, video_ids, question, answer, question_embedding=None):
+        key = entry_key(video_ids, question)
+        scope_hash = _scope_hash(scope_key(video_ids))
+        entry = {
+            "scope": scope_key(video_ids),
+            "video_ids": sorted(set(video_ids)),
+            "question": normalize_question(question),
+            "embedding": None if question_embedding is None
+            else np.asarray(question_embedding, dtype=np.float32).tolist(),
+            "answer": answer,
+            "created_at": time.time(),
+        }
+        try:
+            self.backend.set(ANSWER_KEY.format(key), entry, self.ttl)
+            # 다른 프로세스가 같은 목록을 동시에 고칠 수 있으므로 compare-and-set으로 추가
+            shared_cache.update(self.backend, SCOPE_KEY.format(scope_hash),
+                                lambda keys: _append_unique(keys, key, MAX_ENTRIES_PER_SCOPE), self.ttl)
+            for video_id in entry["video_ids"]:
+                shared_cache.update(self.backend, VIDEO_KEY.format(video_id),
+                                    lambda scopes: _append_unique(scopes, scope_hash, MAX_SCOPES_PER_VIDEO), self.ttl)
+        except Exception as e:
+            logger.warning(f"답변 캐시 저장 중 오류 발생: {str(e)}")
+
+    def begin(self, video_ids, question):
+        """
+        같은 질문의 답변 생성을 하나로 합칩니다.
+
+        :return: (flight, is_leader). is_leader가 True이면 직접 생성한 뒤 finish를 호출해야 하고,
+                 False이면 flight.wait()으로 다른 요청의 결과를 기다립니다.
+        """
+        key = entry_key(video_ids, question)
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                return flight, False
+            flight = _Flight(key)
+            self._inflight[key] = flight
+            return flight, True
+
+    def finish(self, flight, answer=None):
+        """생성을 마치고 기다리는 요청을 깨웁니다. answer가 None이면 실패로 보고 각자 다시 생성합니다."""
+        flight.answer = answer
+        with self._inflight_lock:
+            self._inflight.pop(flight.key, None)
+        flight.event.set()
+
+    def invalidate_video(self, video_id):
+        """
+        비디오의 트랜스크립트가 바뀌면 그 비디오를 근거로 한 답변을 모두 버립니다.
+
+        목록은 프로세스 내 사본이 아닌 공유 저장소에서 읽어 다른 프로세스가 추가한 답변까지 지웁니다.
+        (다른 프로세스의 프로세스 내 사본은 최대 CACHE_LOCAL_TTL 동안 남을 수 있음)
+        """
+        try:
+            scope_hashes, _ = self.backend.get_with_token(VIDEO_KEY.format(video_id))
+            for scope_hash in scope_hashes or []:
+                entry_keys, _ = self.backend.get_with_token(SCOPE_KEY.format(scope_hash))
+                for key in entry_keys or []:
+                    self.backend.delete(ANSWER_KEY.format(key))
+                self.backend.delete(SCOPE_KEY.format(scope_hash))
+            self.backend.delete(VIDEO_KEY.format(video_id))
+        except Exception as e:
+            logger.warning(f"답변 캐시 무효화 중 오류 발생: {str(e)}")
+
+
+# 프로세스 전체에서 공유하는 답변 캐시 (저장소는 처음 사용할 때 설정에 맞게 생성)
+cache = AnswerCache()
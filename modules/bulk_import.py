@@ -0,0 +1,247 @@
+import logging
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+
+import yt_dlp
+from bson.objectid import ObjectId
+
+from config import BULK_IMPORT_CONCURRENCY, MAX_VIDEO_DURATION, JOB_HEARTBEAT_INTERVAL
+from modules import database, rate_limit, video_processing, youtube_api
+from modules.database import imports_collection
+
+logger = logging.getLogger(__name__)
+
+IMPORT_STATUS_PENDING = "pending"
+IMPORT_STATUS_RUNNING = "running"
+IMPORT_STATUS_COMPLETED = "completed"
+
+# 가져오기 항목 상태
+ITEM_PENDING = "pending"
+ITEM_DONE = "done"
+ITEM_EXISTING = "existing"  # 이미 처리된 비디오 (사용자만 추가할 예정)
+ITEM_LINKED = "linked"  # 이미 처리된 비디오에 사용자 추가 완료
+ITEM_TOO_LONG = "too_long"
+ITEM_FAILED = "failed"
+
+CHANNEL_PATH_PATTERN = re.compile(r'^/(channel/(?P<channel_id>UC[\w-]{22})|(?P<handle>@[\w.-]+)|(c|user)/(?P<name>[\w.-]+))')
+
+
+def parse_collection_url(url):
+    """
+    재생목록/채널 URL을 분석합니다.
+
+    :return: ("playlist", 재생목록 ID), ("channel", 채널 ID), ("handle", @핸들), ("custom", URL) 중 하나.
+             단일 비디오 URL이면 None
+    """
+    parsed_url = urlparse(url)
+    if 'youtube.com' not in parsed_url.netloc and 'youtu.be' not in parsed_url.netloc:
+        return None
+
+    query = parse_qs(parsed_url.query)
+    # watch?v=...&list=... 처럼 비디오와 재생목록이 함께 있으면 단일 비디오로 처리
+    if 'list' in query and 'v' not in query and 'youtu.be' not in parsed_url.netloc:
+        return "playlist", query['list'][0]
+
+    match = CHANNEL_PATH_PATTERN.match(parsed_url.path)
+    if not match:
+        return None
+    if match.group('channel_id'):
+        return "channel", match.group('channel_id')
+    if match.group('handle'):
+        return "handle", match.group('handle')
+    return "custom", url
+
+
+def is_collection_url(url):
+    return parse_collection_url(url) is not None
+
+
+def get_uploads_playlist_id(kind, value):
+    """채널 ID 또는 @핸들로 채널의 업로드 재생목록 ID를 찾습니다."""
+    params = {"part": "contentDetails"}
+    params["id" if kind == "channel" else "forHandle"] = value
+    data, _ = youtube_api.api_get("channels", params)
+    items = data.get("items", [])
+    if not items:
+        raise ValueError(f"채널을 찾을 수 없습니다: {value}")
+    return items[0]["contentDetails"]["relatedPlaylists"]["uploads"]
+
+
+def list_playlist_video_ids(playlist_id):
+    """playlistItems API로 재생목록의 비디오 ID를 모두 가져옵니다. (50개씩 페이지 단위)"""
+    video_ids = []
+    page_token = None
+    while True:
+        params = {"part": "contentDetails", "playlistId": playlist_id, "maxResults": 50}
+        if page_token:
+            params["pageToken"] = page_token
+        data, _ = youtube_api.api_get("playlistItems", params)
+        video_ids.extend(item["contentDetails"]["videoId"] for item in data.get("items", []))
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            return video_ids
+
+
+def list_flat_video_ids(url):
+    """yt-dlp 평면 추출로 미디어 정보 없이 비디오 ID 목록만 가져옵니다. (API로 찾을 수 없는 URL용)"""
+    ydl_opts = {'extract_flat': 'in_playlist', 'skip_download': True, 'quiet': True}
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = rate_limit.call("ytdlp", ydl.extract_info, url, download=False)
+
+    video_ids = []
+    for entry in info.get('entries') or []:
+        # 채널 URL은 '동영상', 'Shorts' 탭이 중첩된 재생목록으로 반환됨
+        if entry.get('_type') == 'playlist' or entry.get('entries'):
+            video_ids.extend(e['id'] for e in entry.get('entries') or [] if e.get('id'))
+        elif entry.get('id'):
+            video_ids.append(entry['id'])
+    return video_ids
+
+
+def expand_collection_url(url):
+    """재생목록/채널 URL을 비디오 ID 목록으로 펼칩니다. (중복 제거, 원래 순서 유지)"""
+    parsed = parse_collection_url(url)
+    if parsed is None:
+        raise ValueError("재생목록 또는 채널 URL이 아닙니다.")
+
+    kind, value = parsed
+    if kind == "playlist":
+        video_ids = list_playlist_video_ids(value)
+    elif kind in ("channel", "handle"):
+        video_ids = list_playlist_video_ids(get_uploads_playlist_id(kind, value))
+    else:
+        video_ids = list_flat_video_ids(value)
+    return list(dict.fromkeys(video_ids))
+
+
+def create_import(url, user_id):
+    """가져오기 작업 문서를 만듭니다. 비디오 목록은 실행 시 펼쳐서 저장합니다."""
+    now = datetime.utcnow()
+    return imports_collection.insert_one({
+        "url": url,
+        "user_id": user_id,
+        "status": IMPORT_STATUS_PENDING,
+        "items": None,
+        "created_at": now,
+        "updated_at": now,
+    }).inserted_id
+
+
+def _plan_items(url):
+    """URL을 펼치고 길이 제한과 기존 처리 여부로 항목별 초기 상태를 정합니다."""
+    video_ids = expand_collection_url(url)
+    metadata = youtube_api.get_videos_metadata(video_ids)
+    processed_ids = database.get_processed_video_ids(video_ids)
+
+    items = []
+    for video_id in video_ids:
+        info = metadata.get(video_id)
+        if info is None:
+            # 비공개/삭제된 비디오
+            continue
+        title, channel, duration = info
+        if video_id in processed_ids:
+            status = ITEM_EXISTING
+        elif duration > MAX_VIDEO_DURATION:
+            status = ITEM_TOO_LONG
+        else:
+            status = ITEM_PENDING
+        items.append({"video_id": video_id, "title": title, "channel": channel, "duration": duration,
+                      "status": status})
+    return items
+
+
+def _set_item_status(import_id, video_id, status, error=None):
+    update = {"items.$.status": status, "updated_at": datetime.utcnow()}
+    if error:
+        update["items.$.error"] = error
+    imports_collection.update_one({"_id": import_id, "items.video_id": video_id}, {"$set": update})
+
+
+def _ingest_item(import_id, user_id, item):
+    try:
+        video_processing.process_video(item["video_id"], user_id,
+                                       video_info=(item["title"], item["channel"], item["duration"]))
+        _set_item_status(import_id, item["video_id"], ITEM_DONE)
+    except Exception as e:
+        logger.error(f"가져오기 항목 처리 실패: {item['video_id']} - {str(e)}")
+        _set_item_status(import_id, item["video_id"], ITEM_FAILED, str(e))
+
+
+def _link_existing_item(import_id, user_id, item):
+    try:
+        video_processing.update_user_for_video(item["video_id"], user_id)
+        _set_item_status(import_id, item["video_id"], ITEM_LINKED)
+    except Exception as e:
+        # 상태를 그대로 두어 다음 실행에서 다시 시도
+        logger.error(f"가져오기 항목 사용자 추가 실패: {item['video_id']} - {str(e)}")
+
+
+def run_import(import_id, progress_bar=None, max_workers=BULK_IMPORT_CONCURRENCY):
+    """
+    가져오기를 실행합니다. 항목별 상태가 문서에 기록되므로 중단된 가져오기는 남은 항목부터 이어서 처리합니다.
+
+    :return: 항목 상태별 개수
+    """
+    import_id = ObjectId(import_id)
+    record = imports_collection.find_one({"_id": import_id})
+    if record is None:
+        raise ValueError(f"가져오기 작업을 찾을 수 없습니다: {import_id}")
+    user_id = record["user_id"]
+
+    items = record.get("items")
+    if items is None:
+        if progress_bar:
+            progress_bar.progress(0, text="재생목록/채널의 동영상 목록을 가져오는 중... 📜")
+        items = _plan_items(record["url"])
+        imports_collection.update_one(
+            {"_id": import_id},
+            {"$set": {"items": items, "total": len(items), "status": IMPORT_STATUS_RUNNING,
+                      "updated_at": datetime.utcnow()}}
+        )
+
+    # 이미 처리된 비디오는 다시 처리하지 않고 사용자만 추가. 항목마다 기록하므로 중단되면 남은 항목부터 다시 추가
+    # (update_user_for_video는 이미 추가된 사용자면 아무것도 하지 않으므로 다시 실행해도 안전)
+    for item in items:
+        if item["status"] == ITEM_EXISTING:
+            _link_existing_item(import_id, user_id, item)
+            if hasattr(progress_bar, "heartbeat"):
+                progress_bar.heartbeat()
+
+    pending = [item for item in items if item["status"] == ITEM_PENDING]
+    finished = len(items) - len(pending)
+    logger.info(f"가져오기 {import_id}: 전체 {len(items)}개 중 {len(pending)}개 처리 예정")
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="bulk-import") as executor:
+        remaining = {executor.submit(_ingest_item, import_id, user_id, item) for item in pending}
+        try:
+            while remaining:
+                # 항목 하나가 오래 걸려도 작업이 살아 있음을 기록하도록 일정 간격으로 깨어남
+                done, remaining = wait(remaining, timeout=JOB_HEARTBEAT_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                    finished += 1
+                    if progress_bar:
+                        progress_bar.progress(int(finished * 100 / len(items)),
+                                              text=f"동영상 처리 중... ({finished}/{len(items)})")
+                if hasattr(progress_bar, "heartbeat"):
+                    progress_bar.heartbeat()
+        except Exception:
+            # 작업이 다른 작업자에게 넘어갔으면 아직 시작하지 않은 항목은 실행하지 않음
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    imports_collection.update_one({"_id": import_id},
+                                  {"$set": {"status": IMPORT_STATUS_COMPLETED, "updated_at": datetime.utcnow()}})
+    return summarize_import(import_id)
+
+
+def summarize_import(import_id):
+    """항목 상태별 개수"""
+    record = imports_collection.find_one({"_id": ObjectId(import_id)}, {"items.status": 1})
+    counts = {}
+    for item in record.get("items") or []:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    return counts
@@ -0,0 +1,467 @@
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+
+from config import CACHE_BACKEND, CACHE_SQLITE_PATH, CACHE_URL, CACHE_LOCAL_MAX_ENTRIES, CACHE_LOCAL_TTL
+
+logger = logging.getLogger(__name__)
+
+# SQLite 저장소에서 만료/초과 항목을 정리하는 쓰기 간격
+SQLITE_EVICT_EVERY = 100
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data):
+    return json.loads(data)
+
+
+class CacheBackend(ABC):
+    """
+    키-값 캐시 저장소 인터페이스
+
+    값은 JSON으로 직렬화할 수 있어야 합니다. ttl은 초 단위이며 None이면 만료되지 않습니다.
+    compare_and_set은 get_with_token이 반환한 토큰이 그대로일 때만 값을 바꿉니다.
+    (토큰이 None이면 키가 없을 때만 저장)
+    """
+
+    name = "cache"
+
+    def __init__(self):
+        self._metrics_lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "sets": 0, "deletes": 0, "cas_conflicts": 0}
+
+    def _count(self, **values):
+        with self._metrics_lock:
+            for key, value in values.items():
+                self.metrics[key] += value
+
+    def _count_lookup(self, found):
+        self._count(hits=int(found), misses=int(not found))
+
+    def get(self, key):
+        value, _ = self.get_with_token(key)
+        return value
+
+    def get_many(self, keys):
+        """{키: 값}. 없는 키는 포함되지 않음"""
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    @abstractmethod
+    def get_with_token(self, key):
+        """(값, 토큰). 없으면 (None, None)"""
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        """값을 저장합니다."""
+
+    @abstractmethod
+    def compare_and_set(self, key, value, token, ttl=None):
+        """토큰이 그대로이면 저장하고 True, 그 사이 다른 쓰기가 있었으면 False"""
+
+    @abstractmethod
+    def delete(self, key):
+        """값을 지웁니다. 없는 키면 아무것도 하지 않습니다."""
+
+    def snapshot(self):
+        with self._metrics_lock:
+            return dict(self.metrics)
+
+
+class MemoryCache(CacheBackend):
+    """프로세스 내 LRU + TTL 저장소 (값을 복사하지 않으므로 꺼낸 값을 바꾸면 안 됨)"""
+
+    name = "memory"
+
+    def __init__(self, max_entries=CACHE_LOCAL_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # 키 -> (값, 버전, 만료 시각(monotonic) 또는 None)
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get_with_token(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self._count_lookup(entry is not None)
+        return (entry[0], entry[1]) if entry is not None else (None, None)
+
+    def _store(self, key, value, ttl):
+        self._entries[key] = (value, next(self._versions), time.monotonic() + ttl if ttl else None)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+        self._count(sets=1)
+
+    def compare_and_set(self, key, value, token, ttl=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                entry = None
+            if (entry[1] if entry is not None else None) != token:
+                self._count(cas_conflicts=1)
+                return False
+            self._store(key, value, ttl)
+        self._count(sets=1)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        self._count(deletes=1)
+
+
+def _initial_version():
+    # 지웠다가 다시 만든 키가 이전 토큰과 겹치지 않도록 시각으로 시작
+    return time.time_ns()
+
+
+class SQLiteCache(CacheBackend):
+    """같은 머신의 여러 프로세스(웹, 작업자)가 공유하는 로컬 SQLite 저장소"""
+
+    name = "sqlite"
+
+    def __init__(self, path=CACHE_SQLITE_PATH, max_entries=100000):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self._writes = itertools.count(1)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    version INTEGER NOT NULL,
+                    expires_at REAL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        """트랜잭션 하나를 실행할 연결. 끝나면 커밋(오류 시 롤백)하고 연결을 닫습니다."""
+        with closing(sqlite3.connect(self.path, timeout=5)) as conn, conn:
+            yield conn
+
+    def get_with_token(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, version FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+        self._count_lookup(row is not None)
+        return (_loads(row[0]), row[1]) if row is not None else (None, None)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(keys))}) "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (*keys, now),
+            ).fetchall()
+        self._count(hits=len(rows), misses=len(keys) - len(rows))
+        return {key: _loads(value) for key, value in rows}
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO cache (key, value, version, expires_at, last_access) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, version = cache.version + 1, "
+                "expires_at = excluded.expires_at, last_access = excluded.last_access",
+                (key, _dumps(value), _initial_version(), now + ttl if ttl else None, now),
+            )
+            self._maybe_evict(conn)
+        self._count(sets=1)
+
+    def compare_and_set(self, key, value, token, ttl=None):
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._connect() as conn:
+            if token is None:
+                # 만료된 행은 없는 것으로 보고 새로 넣음
+                conn.execute("DELETE FROM cache WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                             (key, now))
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO cache (key, value, version, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, _dumps(value), _initial_version(), expires_at, now),
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE cache SET value = ?, version = version + 1, expires_at = ?, last_access = ? "
+                    "WHERE key = ? AND version = ? AND (expires_at IS NULL OR expires_at > ?)",
+                    (_dumps(value), expires_at, now, key, token, now),
+                )
+            stored = cursor.rowcount == 1
+        if not stored:
+            self._count(cas_conflicts=1)
+            return False
+        self._count(sets=1)
+        return True
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        self._count(deletes=1)
+
+    def _maybe_evict(self, conn):
+        """만료된 항목과 최대 개수를 넘는 오래된(최근 사용 기준) 항목을 가끔 삭제합니다."""
+        if next(self._writes) % SQLITE_EVICT_EVERY:
+            return
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class RedisCache(CacheBackend):
+    """
+    여러 서버(레플리카)가 공유하는 네트워크 캐시 어댑터
+
+    redis-py와 같은 인터페이스(get, mget, set(ex, nx), delete, pipeline의 watch/multi/execute)를
+    가진 클라이언트면 어느 것이든 사용할 수 있습니다.
+    """
+
+    name = "redis"
+
+    def __init__(self, client, prefix="ytqa:"):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, prefix="ytqa:"):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("CACHE_BACKEND=redis를 사용하려면 redis 패키지를 설치해야 합니다.")
+        return cls(redis.Redis.from_url(url), prefix)
+
+    def _key(self, key):
+        return self.prefix + key
+
+    @staticmethod
+    def _token(data):
+        # 저장된 바이트가 같으면 같은 버전으로 봄
+        return hashlib.sha1(data).hexdigest()
+
+    def get_with_token(self, key):
+        data = self.client.get(self._key(key))
+        self._count_lookup(data is not None)
+        return (_loads(data), self._token(data)) if data is not None else (None, None)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        rows = self.client.mget([self._key(key) for key in keys])
+        values = {key: _loads(data) for key, data in zip(keys, rows) if data is not None}
+        self._count(hits=len(values), misses=len(keys) - len(values))
+        return values
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self._key(key), _dumps(value), ex=int(ttl) if ttl else None)
+        self._count(sets=1)
+
+    def compare_and_set(self, key, value, token, ttl=None):
+        full_key = self._key(key)
+        data = _dumps(value)
+        ex = int(ttl) if ttl else None
+        if token is None:
+            stored = bool(self.client.set(full_key, data, ex=ex, nx=True))
+        else:
+            stored = False
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(full_key)
+                    current = pipe.get(full_key)
+                    if current is not None and self._token(current) == token:
+                        pipe.multi()
+                        pipe.set(full_key, data, ex=ex)
+                        pipe.execute()
+                        stored = True
+                    else:
+                        pipe.unwatch()
+                except Exception as e:
+                    # WatchError: 확인과 쓰기 사이에 다른 쓰기가 있었음
+                    if type(e).__name__ != "WatchError":
+                        raise
+        self._count(sets=int(stored), cas_conflicts=int(not stored))
+        return stored
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+        self._count(deletes=1)
+
+
+class TieredCache(CacheBackend):
+    """
+    프로세스 내 캐시(local) 앞에 두고 공유 캐시(shared)를 뒤에 둔 2단 캐시
+
+    조회는 local → shared 순이며 shared에서 찾은 값은 local에 짧게(CACHE_LOCAL_TTL) 올립니다.
+    토큰 조회와 compare_and_set은 여러 프로세스가 함께 보는 shared에서만 하고 local의 사본은 지웁니다.
+    shared 오류는 경고만 남기고 캐시 미스로 처리합니다.
+
+    set/delete는 이 프로세스의 local과 shared만 바꾸므로, 다른 프로세스(레플리카)의 local에 올라간 사본은
+    최대 local_ttl 동안 이전 값을 돌려줄 수 있습니다. 무효화가 곧바로 보여야 하는 값은 get_with_token으로 읽습니다.
+    """
+
+    name = "tiered"
+
+    def __init__(self, local, shared, local_ttl=CACHE_LOCAL_TTL):
+        super().__init__()
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+        self.errors = 0
+
+    def _local_ttl(self, ttl):
+        return min(ttl, self.local_ttl) if ttl else self.local_ttl
+
+    def _shared_call(self, action, default, *args, **kwargs):
+        try:
+            return getattr(self.shared, action)(*args, **kwargs)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"공유 캐시 {action} 중 오류 발생 ({self.shared.name}): {str(e)}")
+            return default
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None:
+            value = self._shared_call("get", None, key)
+            if value is not None:
+                self.local.set(key, value, self.local_ttl)
+        self._count_lookup(value is not None)
+        return value
+
+    def get_many(self, keys):
+        keys = list(keys)
+        values = self.local.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            fetched = self._shared_call("get_many", {}, missing)
+            for key, value in fetched.items():
+                self.local.set(key, value, self.local_ttl)
+            values.update(fetched)
+        self._count(hits=len(values), misses=len(keys) - len(values))
+        return values
+
+    def get_with_token(self, key):
+        value, token = self._shared_call("get_with_token", (None, None), key)
+        self._count_lookup(value is not None)
+        return value, token
+
+    def set(self, key, value, ttl=None):
+        self.local.set(key, value, self._local_ttl(ttl))
+        self._shared_call("set", None, key, value, ttl)
+        self._count(sets=1)
+
+    def compare_and_set(self, key, value, token, ttl=None):
+        stored = self._shared_call("compare_and_set", False, key, value, token, ttl)
+        self.local.delete(key)
+        self._count(sets=int(stored), cas_conflicts=int(not stored))
+        return stored
+
+    def delete(self, key):
+        self.local.delete(key)
+        self._shared_call("delete", None, key)
+        self._count(deletes=1)
+
+    def snapshot(self):
+        metrics = super().snapshot()
+        metrics["errors"] = self.errors
+        return metrics
+
+
+def update(cache, key, func, ttl=None, retries=10):
+    """
+    compare_and_set으로 값을 원자적으로 바꿉니다. 다른 쓰기와 겹치면 다시 읽어 재시도합니다.
+
+    :param func: 현재 값(없으면 None)을 받아 새 값을 반환하는 함수
+    :return: 저장한 새 값. 재시도 횟수를 넘기면 None
+    """
+    for _ in range(retries):
+        current, token = cache.get_with_token(key)
+        new_value = func(current)
+        if cache.compare_and_set(key, new_value, token, ttl):
+            return new_value
+    logger.warning(f"캐시 값 갱신 경합으로 포기했습니다: {key}")
+    return None
+
+
+def create_cache(backend=CACHE_BACKEND):
+    """설정(CACHE_BACKEND)에 맞는 캐시를 만듭니다. 공유 저장소를 쓸 수 없으면 프로세스 내 캐시만 사용합니다."""
+    local = MemoryCache()
+    if backend == "memory":
+        return local
+    try:
+        if backend == "redis":
+            shared = RedisCache.from_url(CACHE_URL)
+        elif backend == "sqlite":
+            shared = SQLiteCache()
+        else:
+            raise ValueError(f"알 수 없는 캐시 저장소입니다: {backend}")
+    except (ValueError, sqlite3.Error, OSError) as e:
+        logger.warning(f"공유 캐시를 사용할 수 없어 메모리 캐시만 사용합니다: {str(e)}")
+        return local
+    return TieredCache(local, shared)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """프로세스 전체에서 공유하는 캐시"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = create_cache()
+        return _cache
+
+
+def get_metrics():
+    """캐시 단계별 적중/미스/쓰기/CAS 충돌 지표"""
+    cache = get_cache()
+    if isinstance(cache, TieredCache):
+        return {cache.name: cache.snapshot(), cache.local.name: cache.local.snapshot(),
+                cache.shared.name: cache.shared.snapshot()}
+    return {cache.name: cache.snapshot()}
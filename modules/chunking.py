@@ -0,0 +1,115 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import tiktoken
+
+from config import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+
+EMBEDDING_MODEL_NAME = "text-embedding-ada-002"
+
+# 문장 끝(마침표/물음표/느낌표 뒤 공백) 또는 줄바꿈을 청크 경계 후보로 사용
+SENTENCE_BOUNDARY_PATTERN = re.compile(r'(?<=[.!?。？！])\s+|\n+')
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name=EMBEDDING_MODEL_NAME):
+    """모델에 맞는 tiktoken 인코더를 프로세스당 한 번만 로드합니다."""
+    return tiktoken.encoding_for_model(model_name)
+
+
+@lru_cache(maxsize=None)
+def _token_char_counts(model_name=EMBEDDING_MODEL_NAME):
+    """
+    어휘의 각 토큰이 새로 시작하는 문자 수를 담은 배열을 만듭니다.
+
+    UTF-8 연속 바이트(0x80~0xBF)가 아닌 바이트 수가 곧 해당 토큰에서 시작되는 문자 수이므로,
+    토큰 배열에 대해 누적합을 구하면 토큰 경계의 문자 오프셋을 한 번에 계산할 수 있습니다.
+    """
+    enc = get_encoding(model_name)
+    counts = np.zeros(enc.n_vocab, dtype=np.int64)
+    for token in range(enc.n_vocab):
+        try:
+            token_bytes = enc.decode_single_token_bytes(token)
+        except KeyError:
+            continue
+        counts[token] = sum(1 for b in token_bytes if not 0x80 <= b < 0xC0)
+    return counts
+
+
+def count_tokens(text, model_name=EMBEDDING_MODEL_NAME):
+    """텍스트의 토큰 수를 계산합니다."""
+    return len(get_encoding(model_name).encode_ordinary(text))
+
+
+def _boundary_token_indices(text, char_offsets, boundaries=None):
+    """경계 후보 문자 오프셋을 토큰 경계 인덱스로 변환합니다."""
+    if boundaries is None:
+        positions = [m.end() for m in SENTENCE_BOUNDARY_PATTERN.finditer(text)]
+    else:
+        positions = boundaries
+    if not positions:
+        return np.empty(0, dtype=np.int64)
+    indices = np.searchsorted(char_offsets, np.asarray(positions, dtype=np.int64), side='left')
+    return np.unique(indices)
+
+
+def split_text(text, max_tokens=8000, overlap=0, boundaries=None, snap=True, model_name=EMBEDDING_MODEL_NAME):
+    """
+    텍스트를 토큰 배열 슬라이싱으로 청크로 나눕니다.
+
+    :param text: 나눌 텍스트
+    :param max_tokens: 청크당 최대 토큰 수
+    :param overlap: 이웃한 청크가 겹치는 토큰 수
+    :param boundaries: 경계로 선호하는 문자 오프셋 목록 (예: 자막 구간 시작 위치). 없으면 문장 끝을 사용합니다.
+    :param snap: 청크 끝을 가장 가까운 경계 후보에 맞출지 여부
+    :return: text, token_count, char_start, char_end, token_start, token_end 키를 가진 딕셔너리 목록
+    """
+    if max_tokens <= 0:
+        raise ValueError("max_tokens는 0보다 커야 합니다.")
+    if not 0 <= overlap < max_tokens:
+        raise ValueError("overlap은 0 이상, max_tokens 미만이어야 합니다.")
+    if not text:
+        return []
+
+    enc = get_encoding(model_name)
+    tokens = np.asarray(enc.encode_ordinary(text), dtype=np.int64)
+    n_tokens = len(tokens)
+
+    # char_offsets[i]는 i번째 토큰 경계의 문자 오프셋 (길이 n_tokens + 1)
+    char_offsets = np.zeros(n_tokens + 1, dtype=np.int64)
+    np.cumsum(_token_char_counts(model_name)[tokens], out=char_offsets[1:])
+
+    candidates = _boundary_token_indices(text, char_offsets, boundaries) if snap else np.empty(0, dtype=np.int64)
+    # 경계에 맞추더라도 청크가 너무 짧아지지 않도록 최소 길이를 보장
+    min_tokens = max(1, max_tokens // 2)
+
+    chunks = []
+    start = 0
+    while start < n_tokens:
+        end = min(start + max_tokens, n_tokens)
+        if end < n_tokens and candidates.size:
+            idx = np.searchsorted(candidates, end, side='right') - 1
+            if idx >= 0 and candidates[idx] >= start + min_tokens:
+                end = int(candidates[idx])
+
+        char_start, char_end = int(char_offsets[start]), int(char_offsets[end])
+        chunks.append({
+            "text": text[char_start:char_end],
+            "token_count": end - start,
+            "char_start": char_start,
+            "char_end": char_end,
+            "token_start": start,
+            "token_end": end,
+        })
+
+        if end >= n_tokens:
+            break
+        start = max(end - overlap, start + 1)
+
+    return chunks
+
+
+def split_passages(text):
+    """검색용 패시지 설정(CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS)으로 텍스트를 나눕니다."""
+    return split_text(text, max_tokens=CHUNK_MAX_TOKENS, overlap=CHUNK_OVERLAP_TOKENS)
@@ -0,0 +1,29 @@
+import functools
+
+import certifi
+import google.generativeai as genai
+from openai import OpenAI
+from pymongo import MongoClient
+from pymongo.server_api import ServerApi
+
+from config import MONGODB_URI, OPENAI_API_KEY, GEMINI_API_KEY
+
+# 외부 서비스 클라이언트는 연결 풀을 갖고 있으므로 프로세스당 하나를 만들어 모든 모듈과 세션이 공유합니다.
+# (Streamlit 앱과 작업자(worker.py) 모두에서 쓰이므로 st.cache_resource 대신 프로세스 단위 캐시를 사용)
+
+
+@functools.lru_cache(maxsize=None)
+def get_mongo_client():
+    return MongoClient(MONGODB_URI, server_api=ServerApi('1'), tlsCAFile=certifi.where())
+
+
+@functools.lru_cache(maxsize=None)
+def get_openai_client():
+    """OpenAI 클라이언트 (재시도는 rate_limit에서 처리)"""
+    return OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+
+
+@functools.lru_cache(maxsize=None)
+def get_gemini_model(model_name):
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai.GenerativeModel(model_name=model_name)
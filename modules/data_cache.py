@@ -0,0 +1,61 @@
+"""
+화면에서 반복되는 DB 조회 결과 캐시
+
+Streamlit은 위젯을 바꿀 때마다 페이지 전체를 다시 실행하므로 같은 조회가 반복됩니다.
+조회 결과를 사용자별 키와 짧은 TTL로 st.cache_data에 보관하고, 키에 사용자 데이터 버전을 넣어
+비디오 처리나 태그 변경으로 버전이 오르면(database.bump_user_versions) 이전 결과를 바로 쓰지 않게 합니다.
+"""
+import streamlit as st
+
+from config import DATA_CACHE_TTL, DATA_CACHE_MAX_ENTRIES
+from modules import database
+
+
+def _cached(func):
+    # 밑줄로 시작하는 인자(_user_id)는 캐시 키에서 빠지므로 user_key(문자열)와 version으로 구분
+    return st.cache_data(ttl=DATA_CACHE_TTL, max_entries=DATA_CACHE_MAX_ENTRIES, show_spinner=False)(func)
+
+
+@_cached
+def _get_all_tags(_user_id, user_key, version):
+    return database.get_all_tags(_user_id)
+
+
+@_cached
+def _get_all_channels(_user_id, user_key, version):
+    return database.get_all_channels(_user_id)
+
+
+@_cached
+def _list_user_videos(_user_id, user_key, version, **filters):
+    return database.list_user_videos(_user_id, **filters)
+
+
+@_cached
+def _list_user_videos_page(_user_id, user_key, version, **options):
+    return database.list_user_videos_page(_user_id, **options)
+
+
+@_cached
+def _list_videos_by_tags(tags, _user_id, user_key, version):
+    return database.list_videos_by_tags(tags, _user_id)
+
+
+def get_all_tags(user_id):
+    return _get_all_tags(user_id, str(user_id), database.get_user_version(user_id))
+
+
+def get_all_channels(user_id):
+    return _get_all_channels(user_id, str(user_id), database.get_user_version(user_id))
+
+
+def list_user_videos(user_id, **filters):
+    return _list_user_videos(user_id, str(user_id), database.get_user_version(user_id), **filters)
+
+
+def list_user_videos_page(user_id, **options):
+    return _list_user_videos_page(user_id, str(user_id), database.get_user_version(user_id), **options)
+
+
+def list_videos_by_tags(tags, user_id):
+    return _list_videos_by_tags(list(tags), user_id, str(user_id), database.get_user_version(user_id))
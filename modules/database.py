@@ -1,19 +1,316 @@
-from pymongo import MongoClient
-from pymongo.server_api import ServerApi
-import certifi
-from config import MONGODB_URI
-from datetime import datetime
+from pymongo import ReturnDocument, ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+import json
+import logging
+import numpy as np
+import zstandard
+from config import EMBEDDING_STORAGE_DTYPE, VIDEO_LIST_PAGE_SIZE, DB_EXPLAIN_QUERIES
+from datetime import datetime, timedelta
+from bson.binary import Binary, BinaryVectorDtype
 from bson.objectid import ObjectId  # Add this import
+from modules import clients
+
+logger = logging.getLogger(__name__)
 
 
 # MongoDB 연결 설정
-client = MongoClient(MONGODB_URI, server_api=ServerApi('1'), tlsCAFile=certifi.where())
+client = clients.get_mongo_client()
 db = client['youtube_transcripts']
 users_collection = db['users']
 videos_collection = db['videos']
+chunks_collection = db['video_chunks']
+jobs_collection = db['jobs']
+video_metadata_collection = db['video_metadata']
+imports_collection = db['imports']
+subscriptions_collection = db['subscriptions']
+transcripts_collection = db['transcripts']
+# 사용자별 태그/채널 -> 비디오 수 (필터 목록을 문서 하나로 읽기 위해 쓰기 경로에서 갱신)
+user_facets_collection = db['user_facets']
+# 사용자별 데이터 버전: 라이브러리(비디오, 태그)가 바뀔 때마다 올려 화면 캐시(data_cache)를 무효화
+cache_versions_collection = db['cache_versions']
+
+# 트랜스크립트 압축 (zstd 압축/해제 객체는 스레드 간 공유하지 않음)
+TRANSCRIPT_CODEC = "zstd"
+TRANSCRIPT_COMPRESSION_LEVEL = 10
+
+
+def encode_embedding(vector, dtype=EMBEDDING_STORAGE_DTYPE):
+    """
+    임베딩을 BSON Binary 벡터로 변환합니다. (double 배열 대비 float32는 1/2, int8은 1/8 크기)
+
+    :return: 문서에 넣을 필드 딕셔너리. int8이면 복원용 embedding_scale을 함께 저장
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    if dtype == "int8":
+        scale = float(np.abs(vector).max()) / 127 if vector.size else 0.0
+        quantized = np.round(vector / scale).astype(np.int8) if scale > 0 else np.zeros(vector.shape, np.int8)
+        return {"embedding": Binary.from_vector(quantized.tolist(), BinaryVectorDtype.INT8),
+                "embedding_scale": scale}
+    if dtype != "float32":
+        raise ValueError(f"지원하지 않는 임베딩 저장 형식입니다: {dtype}")
+    return {"embedding": Binary.from_vector(vector, BinaryVectorDtype.FLOAT32)}
+
+
+def decode_embedding(doc):
+    """문서의 임베딩을 float32 배열로 복원합니다. (기존 double 배열 형식도 지원)"""
+    value = doc.get("embedding")
+    if value is None:
+        return None
+    if not isinstance(value, Binary):
+        return np.asarray(value, dtype=np.float32)
+    # BSON 벡터: 1바이트 자료형 + 1바이트 패딩 뒤에 값이 이어짐
+    if value[0] == BinaryVectorDtype.INT8.value[0]:
+        return np.frombuffer(value, dtype=np.int8, offset=2).astype(np.float32) * doc.get("embedding_scale", 1.0)
+    return np.frombuffer(value, dtype=np.float32, offset=2).copy()
+
+
+def save_transcript(video_id, transcript, segments=None):
+    """트랜스크립트(와 타임스탬프 세그먼트)를 압축하여 별도 컬렉션에 저장합니다."""
+    compressor = zstandard.ZstdCompressor(level=TRANSCRIPT_COMPRESSION_LEVEL)
+    doc = {
+        "codec": TRANSCRIPT_CODEC,
+        "data": Binary(compressor.compress(transcript.encode("utf-8"))),
+        "segments": Binary(compressor.compress(json.dumps(segments, ensure_ascii=False).encode("utf-8")))
+        if segments else None,
+        "length": len(transcript),
+        "updated_at": datetime.utcnow(),
+    }
+    transcripts_collection.update_one({"_id": video_id}, {"$set": doc}, upsert=True)
+
+
+def _decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+
+
+def get_transcripts(video_ids):
+    """
+    여러 비디오의 트랜스크립트를 {video_id: 텍스트}로 불러옵니다.
+
+    아직 이전하지 않은 비디오는 videos 문서의 transcript 필드를 사용합니다.
+    """
+    query = {"_id": {"$in": list(video_ids)}}
+    _explain_in_dev(transcripts_collection, query)
+    transcripts = {doc["_id"]: _decompress(doc["data"]) for doc in transcripts_collection.find(query, {"data": 1})}
+    missing = [video_id for video_id in video_ids if video_id not in transcripts]
+    if missing:
+        legacy_query = {"video_id": {"$in": missing}, "transcript": {"$exists": True}}
+        _explain_in_dev(videos_collection, legacy_query)
+        for video in videos_collection.find(legacy_query, {"video_id": 1, "transcript": 1}):
+            transcripts[video["video_id"]] = video["transcript"]
+    return transcripts
+
+
+def get_transcript(video_id):
+    """비디오 하나의 트랜스크립트. 없으면 빈 문자열"""
+    return get_transcripts([video_id]).get(video_id, "")
+
+
+def get_transcript_segments(video_id):
+    """비디오의 타임스탬프 세그먼트 목록. 없으면 None"""
+    query = {"_id": video_id}
+    _explain_in_dev(transcripts_collection, query)
+    doc = transcripts_collection.find_one(query, {"segments": 1})
+    if doc and doc.get("segments"):
+        return json.loads(_decompress(doc["segments"]))
+    legacy_query = {"video_id": video_id}
+    _explain_in_dev(videos_collection, legacy_query)
+    video = videos_collection.find_one(legacy_query, {"transcript_segments": 1})
+    return video.get("transcript_segments") if video else None
+
+
+# 목록/필터 조회에서 제외할 큰 필드 (이전 전 문서의 트랜스크립트, 임베딩 포함)
+HEAVY_FIELDS_PROJECTION = {"transcript": 0, "transcript_segments": 0, "embedding": 0, "embedding_scale": 0}
+
+# 목록/선택 화면에 표시하는 필드만 가져오는 프로젝션 (트랜스크립트와 임베딩은 질문할 비디오만 따로 조회)
+VIDEO_LIST_FIELDS = ("video_id", "title", "channel", "duration", "tags", "processed_at", "updated_at",
+                     "transcript_length", "source")
+VIDEO_LIST_PROJECTION = {field: 1 for field in VIDEO_LIST_FIELDS}
+
+
+# 비디오 문서 상태: 처리 중인 자리 표시 문서와 처리 완료 문서 (status가 없는 기존 문서는 완료로 간주)
+VIDEO_STATUS_PROCESSING = "processing"
+VIDEO_STATUS_READY = "ready"
+READY_VIDEO_FILTER = {"status": {"$ne": VIDEO_STATUS_PROCESSING}}
+
+# 목록 화면에서 Mongo 정렬을 지원하는 필드 (각각 user_ids와의 복합 인덱스가 있음)
+VIDEO_SORT_FIELDS = ("processed_at", "duration")
+
+_video_list_indexes_ready = False
+
+
+def ensure_video_list_indexes():
+    """사용자별 목록 정렬/페이지네이션용 복합 인덱스를 한 번 생성합니다. (역방향 정렬도 같은 인덱스를 사용)"""
+    global _video_list_indexes_ready
+    if not _video_list_indexes_ready:
+        for sort_field in VIDEO_SORT_FIELDS:
+            videos_collection.create_index([("user_ids", 1), (sort_field, -1), ("_id", -1)])
+        _video_list_indexes_ready = True
+
+
+# 자주 쓰는 조회를 받치는 인덱스: 컬렉션 이름 -> [(키, 옵션)]
+# videos의 목록 정렬용 복합 인덱스(user_ids+processed_at 등)는 위 함수에서 생성
+INDEXES = {
+    videos_collection.name: [
+        # 동시 인제스트 선점이 중복 문서를 만들지 않도록 보장. 기존 중복은 scripts/dedupe_videos.py로 먼저 정리
+        ([("video_id", 1)], {"unique": True}),
+        ([("tags", 1)], {}),  # 배열 필드라 멀티키 인덱스가 됨
+        ([("user_ids", 1), ("channel", 1)], {}),  # 사용자별 채널 필터와 distinct("channel")
+    ],
+    users_collection.name: [
+        ([("email", 1)], {"unique": True}),
+    ],
+    chunks_collection.name: [
+        ([("video_id", 1), ("chunk_index", 1)], {}),
+    ],
+    jobs_collection.name: [
+        ([("status", 1), ("created_at", 1)], {}),  # 대기 작업 선점, 중단된 작업 확인
+        ([("user_id", 1), ("created_at", -1)], {}),
+    ],
+    subscriptions_collection.name: [
+        ([("channel_id", 1)], {"unique": True}),
+        ([("user_ids", 1)], {}),
+        ([("next_poll_at", 1)], {}),
+    ],
+}
+
+_indexes_ready = False
+
+
+def ensure_indexes():
+    """
+    조회에 필요한 인덱스를 모두 생성합니다. 이미 있는 인덱스는 그대로 두므로 시작할 때마다 호출해도 됩니다.
+
+    기존 데이터에 중복 값이 있어 고유 인덱스를 만들 수 없으면 오류를 기록하고 나머지 인덱스는 계속 생성합니다.
+    """
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    try:
+        ensure_video_list_indexes()
+    except PyMongoError as e:
+        logger.error(f"인덱스 생성 실패 (ensure_video_list_indexes): {str(e)}")
+    for collection_name, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                db[collection_name].create_index(keys, **options)
+            except PyMongoError as e:
+                hint = " 중복 값이 있으면 정리 스크립트를 먼저 실행하세요." if options.get("unique") else ""
+                logger.error(f"인덱스 생성 실패 ({collection_name} {keys}): {str(e)}{hint}")
+    _indexes_ready = True
+
+
+def _plan_stages(plan):
+    """실행 계획에 포함된 모든 stage 이름"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+
+def _explain_in_dev(collection, query, sort=None, distinct_key=None):
+    """개발 모드(DB_EXPLAIN_QUERIES)에서 조회의 실행 계획을 확인하고 컬렉션 전체 스캔이면 경고합니다."""
+    if not DB_EXPLAIN_QUERIES:
+        return
+    if distinct_key is not None:
+        command = {"distinct": collection.name, "key": distinct_key, "query": query}
+    else:
+        command = {"find": collection.name, "filter": query}
+        if sort:
+            command["sort"] = dict(sort)
+    try:
+        result = db.command({"explain": command, "verbosity": "queryPlanner"})
+    except Exception as e:
+        # 실행 계획 확인이 실패해도 실제 조회는 그대로 진행
+        logger.debug(f"실행 계획 확인 실패 ({collection.name}): {str(e)}")
+        return
+    if "COLLSCAN" in set(_plan_stages(result.get("queryPlanner", {}).get("winningPlan", {}))):
+        logger.warning(f"컬렉션 전체 스캔(COLLSCAN): {collection.name} {command}")
+
+
+def claim_video_ingest(video_id, user_id, owner, lease_seconds):
+    """
+    비디오 처리를 선점합니다.
+
+    처리 중 자리 표시 문서를 넣어 선점에 성공하거나, 기한이 지난 다른 처리의 선점을 넘겨받습니다.
+    선점하지 못하면 기존 문서에 사용자를 추가합니다.
+    자리 표시 문서는 문서가 없을 때만 넣는 upsert로 만들므로, 기존 중복 때문에 video_id 고유 인덱스를
+    만들지 못한 경우에도 이미 있는 비디오를 다시 선점하지 않습니다. (고유 인덱스가 있어야 동시 선점이 완전히 배제됨)
+    :return: (선점 여부, 문서, 사용자가 새로 추가되었는지 여부). 그 사이 문서가 삭제되었으면 문서는 None
+    """
+    now = datetime.utcnow()
+    lease_expires_at = now + timedelta(seconds=lease_seconds)
+    placeholder = {
+        "video_id": video_id,
+        "user_ids": [user_id],
+        "status": VIDEO_STATUS_PROCESSING,
+        "owner": owner,
+        "lease_expires_at": lease_expires_at,
+        "created_at": now,
+        "updated_at": now,
+    }
+    try:
+        existing = videos_collection.find_one_and_update(
+            {"video_id": video_id},
+            {"$setOnInsert": {key: value for key, value in placeholder.items() if key != "video_id"}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+        if existing is None:
+            return True, placeholder, True
+    except DuplicateKeyError:
+        pass
+
+    # 처리하던 작업자가 중단되어 기한이 지난 선점은 넘겨받음
+    taken_over = videos_collection.find_one_and_update(
+        {"video_id": video_id, "status": VIDEO_STATUS_PROCESSING, "lease_expires_at": {"$lt": now}},
+        {"$set": {"owner": owner, "lease_expires_at": lease_expires_at, "updated_at": now},
+         "$addToSet": {"user_ids": user_id}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if taken_over:
+        return True, taken_over, True
+
+    before = videos_collection.find_one_and_update(
+        {"video_id": video_id},
+        {"$addToSet": {"user_ids": user_id}},
+        return_document=ReturnDocument.BEFORE,
+    )
+    return False, before, before is not None and user_id not in before.get("user_ids", [])
+
+
+def renew_video_lease(video_id, owner, lease_seconds):
+    """선점 기한을 연장합니다. 선점을 잃었으면 False"""
+    result = videos_collection.update_one(
+        {"video_id": video_id, "status": VIDEO_STATUS_PROCESSING, "owner": owner},
+        {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=lease_seconds)}}
+    )
+    return result.matched_count > 0
+
+
+def complete_video_ingest(video_id, owner, video_data):
+    """선점한 자리 표시 문서를 처리 결과로 채우고 완료 상태로 바꿉니다. 대기 중 추가된 사용자는 유지됩니다."""
+    fields = {key: value for key, value in video_data.items() if key not in ("video_id", "user_ids")}
+    fields["status"] = VIDEO_STATUS_READY
+    return videos_collection.find_one_and_update(
+        {"video_id": video_id, "status": VIDEO_STATUS_PROCESSING, "owner": owner},
+        {"$set": fields,
+         "$addToSet": {"user_ids": {"$each": video_data.get("user_ids", [])}},
+         "$unset": {"owner": "", "lease_expires_at": ""}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def release_video_claim(video_id, owner):
+    """처리에 실패하면 자리 표시 문서를 지워 다른 요청이 다시 처리할 수 있게 합니다."""
+    videos_collection.delete_one({"video_id": video_id, "status": VIDEO_STATUS_PROCESSING, "owner": owner})
 
 
 def find_user_by_email(email):
+    _explain_in_dev(users_collection, {"email": email})
     return users_collection.find_one({"email": email})
 
 def create_user(email, name, picture):
@@ -28,53 +325,101 @@ def create_user(email, name, picture):
     return users_collection.find_one({"_id": result.inserted_id})
 
 
+def get_existing_video(video_id):
+    """처리 완료된 비디오 문서. 없거나 처리 중이면 None"""
+    query = {"video_id": video_id, **READY_VIDEO_FILTER}
+    _explain_in_dev(videos_collection, query)
+    return videos_collection.find_one(query)
+
+
 def get_video_tags(video_id):
     """비디오에 대한 태그 정보 조회"""
-    video = videos_collection.find_one({"video_id": video_id})
+    query = {"video_id": video_id, **READY_VIDEO_FILTER}
+    _explain_in_dev(videos_collection, query)
+    video = videos_collection.find_one(query, {"tags": 1})
     return video.get("tags", []) if video else []
 
 
-def get_video_info_from_db(video_ids):
-    """데이터베이스에서 여러 비디오 정보 조회"""
-    return list(videos_collection.find({"video_id": {"$in": video_ids}}))
-
-def get_user_videos(user_id, selected_tags=None, start_date=None, end_date=None, show_no_tags=False, selected_channels=None):
-    """사용자의 처리된 비디오 목록 가져오기 (필터링 포함)"""
-    query = {"user_ids": user_id}
-
-    if show_no_tags:
-        query["$or"] = [{"tags": {"$exists": False}}, {"tags": []}]
-    elif selected_tags:
-        query["tags"] = {"$in": selected_tags}
-
-    if start_date and end_date:
-        query["processed_at"] = {
-            "$gte": start_date,
-            "$lte": end_date
+def get_processed_video_ids(video_ids):
+    """주어진 ID 중 이미 처리된 비디오 ID 집합 (한 번의 $in 조회)"""
+    query = {"video_id": {"$in": list(video_ids)}, **READY_VIDEO_FILTER}
+    _explain_in_dev(videos_collection, query)
+    cursor = videos_collection.find(query, {"video_id": 1})
+    return {video["video_id"] for video in cursor}
+
+
+def get_video_info_from_db(video_ids, with_transcript=False):
+    """데이터베이스에서 여러 비디오 정보 조회 (with_transcript면 압축 저장된 트랜스크립트를 함께 불러옴)"""
+    query = {"video_id": {"$in": video_ids}, **READY_VIDEO_FILTER}
+    _explain_in_dev(videos_collection, query)
+    videos = list(videos_collection.find(query, HEAVY_FIELDS_PROJECTION))
+    if with_transcript:
+        transcripts = get_transcripts([video["video_id"] for video in videos])
+        for video in videos:
+            if video["video_id"] in transcripts:
+                video["transcript"] = transcripts[video["video_id"]]
+    return videos
+
+def insert_video_chunks(video_id, chunks, embeddings):
+    """비디오의 청크(패시지)와 청크별 임베딩을 한 번의 벌크 삽입으로 저장합니다."""
+    if not chunks:
+        return []
+    now = datetime.utcnow()
+    chunk_docs = [
+        {
+            "video_id": video_id,
+            "chunk_index": i,
+            "text": chunk["text"],
+            "token_count": chunk["token_count"],
+            "char_start": chunk["char_start"],
+            "char_end": chunk["char_end"],
+            **encode_embedding(vector),
+            "created_at": now,
         }
-
-    if selected_channels:
-        query["channel"] = {"$in": selected_channels}
-
-    return list(videos_collection.find(query))
-
-
-def remove_tag_from_video(video_id, tag):
-    """비디오에서 태그 제거"""
-    try:
-        result = videos_collection.update_one(
-            {"video_id": video_id},
-            {"$pull": {"tags": tag}}
-        )
-        if result.modified_count > 0:
-            logger.info(f"태그 '{tag}'가 비디오 ID {video_id}에서 성공적으로 제거되었습니다.")
-            return True
-        else:
-            logger.warning(f"태그 '{tag}'를 비디오 ID {video_id}에서 제거하지 못했습니다. 태그가 존재하지 않을 수 있습니다.")
-            return False
-    except Exception as e:
-        logger.error(f"태그 제거 중 오류 발생: {str(e)}")
-        return False
+        for i, (chunk, vector) in enumerate(zip(chunks, embeddings))
+    ]
+    result = chunks_collection.insert_many(chunk_docs, ordered=False)
+    return result.inserted_ids
+
+
+def get_video_chunks(video_ids, with_embeddings=False):
+    """여러 비디오의 청크를 비디오, 청크 순서대로 조회합니다. 임베딩은 float32 배열로 복원합니다."""
+    projection = None if with_embeddings else {"embedding": 0, "embedding_scale": 0}
+    _explain_in_dev(chunks_collection, {"video_id": {"$in": video_ids}}, sort=[("video_id", 1), ("chunk_index", 1)])
+    cursor = chunks_collection.find({"video_id": {"$in": video_ids}}, projection)
+    chunks = list(cursor.sort([("video_id", 1), ("chunk_index", 1)]))
+    if with_embeddings:
+        for chunk in chunks:
+            chunk["embedding"] = decode_embedding(chunk)
+    return chunks
+
+
+def get_chunks_by_keys(chunk_keys):
+    """(video_id, chunk_index) 목록에 해당하는 청크만 조회합니다. (임베딩 제외)"""
+    indexes_by_video = {}
+    for video_id, chunk_index in chunk_keys:
+        indexes_by_video.setdefault(video_id, []).append(chunk_index)
+    if not indexes_by_video:
+        return []
+    query = {"$or": [
+        {"video_id": video_id, "chunk_index": {"$in": indexes}}
+        for video_id, indexes in indexes_by_video.items()
+    ]}
+    _explain_in_dev(chunks_collection, query)
+    return list(chunks_collection.find(query, {"embedding": 0, "embedding_scale": 0}))
+
+
+def delete_video_chunks(video_id):
+    """비디오의 청크를 모두 삭제합니다."""
+    chunks_collection.delete_many({"video_id": video_id})
+
+
+def get_video_titles(video_ids):
+    """여러 비디오의 제목을 video_id -> 제목 딕셔너리로 조회합니다."""
+    query = {"video_id": {"$in": video_ids}, **READY_VIDEO_FILTER}
+    _explain_in_dev(videos_collection, query)
+    videos = videos_collection.find(query, {"video_id": 1, "title": 1})
+    return {video["video_id"]: video.get("title", "") for video in videos}
 
 def save_feedback(user_id, feedback):
     """피드백을 데이터베이스에 저장합니다."""
@@ -86,51 +431,250 @@ def save_feedback(user_id, feedback):
     db['feedback'].insert_one(feedback_data)
 
 
-def add_tag_to_video(video_id, new_tag):
-    video = videos_collection.find_one({"_id": ObjectId(video_id)})
-    if not video:
-        return False, "영상을 찾을 수 없습니다."
-
-    current_tags = video.get('tags', [])
-    if len(current_tags) >= 3:
-        return False, "태그는 최대 3개까지만 추가할 수 있습니다."
+# 비디오 하나에 붙일 수 있는 최대 태그 수
+MAX_VIDEO_TAGS = 3
+
+
+def _normalize_tag_diff(add, remove):
+    """추가/삭제 목록의 중복을 없애고, 양쪽에 모두 있는 태그는 추가로 봅니다."""
+    add = list(dict.fromkeys(tag for tag in add if tag))
+    remove = [tag for tag in dict.fromkeys(remove) if tag not in add]
+    return add, remove
+
+def _tag_diff_pipeline(add, remove):
+    """
+    태그 변경 결과를 계산하는 식과 업데이트 파이프라인
+
+    기존 순서를 유지한 채 remove를 빼고, 아직 없는 add를 뒤에 붙입니다.
+    사용자가 입력한 태그는 $literal로 감싸 '$'로 시작해도 필드 경로나 연산자로 해석되지 않게 합니다.
+    """
+    current = {"$ifNull": ["$tags", []]}
+    add, remove = {"$literal": list(add)}, {"$literal": list(remove)}
+    new_tags = {"$concatArrays": [
+        {"$filter": {"input": current, "cond": {"$not": {"$in": ["$$this", remove]}}}},
+        {"$filter": {"input": add, "cond": {"$not": {"$in": ["$$this", current]}}}},
+    ]}
+    return new_tags, [{"$set": {"tags": new_tags}}]
+
+def _tag_diff_filter(video_filter, new_tags):
+    # 결과 태그 수가 한도를 넘으면 문서가 일치하지 않아 변경되지 않음 (조회와 갱신 사이 경쟁 없음)
+    return {**video_filter, "$expr": {"$lte": [{"$size": new_tags}, MAX_VIDEO_TAGS]}}
+
+def _apply_tag_facet_changes(user_ids, before_tags, after_tags):
+    added = [tag for tag in after_tags if tag not in before_tags]
+    removed = [tag for tag in before_tags if tag not in after_tags]
+    update_tag_facets(user_ids, added, 1)
+    update_tag_facets(user_ids, removed, -1)
+    if added or removed:
+        bump_user_versions(user_ids)
+
+def _update_tags(video_filter, add=(), remove=()):
+    """
+    태그 추가/삭제를 조건부 업데이트 한 번으로 적용합니다.
+
+    :return: (성공 여부, 메시지, 변경 전 태그 목록 또는 None)
+    """
+    add, remove = _normalize_tag_diff(add, remove)
+    if not add and not remove:
+        return True, "변경된 태그가 없습니다.", None
+    new_tags, pipeline = _tag_diff_pipeline(add, remove)
+    before = videos_collection.find_one_and_update(
+        _tag_diff_filter(video_filter, new_tags),
+        pipeline,
+        projection={"tags": 1, "user_ids": 1},
+    )
+    if before is None:
+        if videos_collection.count_documents(video_filter, limit=1) == 0:
+            return False, "영상을 찾을 수 없습니다.", None
+        return False, f"태그는 최대 {MAX_VIDEO_TAGS}개까지만 추가할 수 있습니다.", None
+
+    before_tags = before.get("tags") or []
+    after_tags = [tag for tag in before_tags if tag not in remove] + [tag for tag in add if tag not in before_tags]
+    _apply_tag_facet_changes(before.get("user_ids", []), before_tags, after_tags)
+    return True, "태그가 변경되었습니다.", before_tags
+
+def update_video_tags(video_id, add=(), remove=()):
+    """
+    비디오(문서 _id)의 태그 변경분(추가/삭제)을 한 번의 원자적 업데이트로 적용합니다.
+
+    결과 태그 수가 MAX_VIDEO_TAGS를 넘으면 아무것도 바꾸지 않습니다.
+    :return: (성공 여부, 메시지)
+    """
+    success, message, _ = _update_tags({"_id": ObjectId(video_id)}, add, remove)
+    return success, message
+
+def bulk_update_video_tags(tag_diffs):
+    """
+    여러 비디오의 태그 변경분을 bulk_write 한 번으로 적용합니다.
+
+    각 업데이트는 _update_tags와 같은 조건(태그 수 한도)에 읽어 둔 변경 전 태그를 더해 걸고,
+    적용되면 이번 호출의 updated_at을 남깁니다. 모두 적용되지 않았으면 그 표시로 적용된 비디오만 다시 읽습니다.
+    :param tag_diffs: {비디오 문서 _id: (추가할 태그 목록, 삭제할 태그 목록)}
+    :return: {비디오 문서 _id: 적용 여부}. 없는 비디오, 태그 수 한도를 넘거나 그 사이 태그가 바뀐 비디오는 False
+    """
+    diffs = {ObjectId(video_id): _normalize_tag_diff(add, remove) for video_id, (add, remove) in tag_diffs.items()}
+    diffs = {video_id: diff for video_id, diff in diffs.items() if diff[0] or diff[1]}
+    if not diffs:
+        return {}
+
+    before = {video["_id"]: video for video in
+              videos_collection.find({"_id": {"$in": list(diffs)}}, {"tags": 1, "user_ids": 1})}
+    # Mongo의 날짜는 밀리초 단위이므로 맞춰서 저장해야 다시 읽을 때 일치함
+    now = datetime.utcnow()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    operations = []
+    operation_ids = []
+    for video_id, (add, remove) in diffs.items():
+        if video_id not in before:
+            continue
+        new_tags, pipeline = _tag_diff_pipeline(add, remove)
+        pipeline[0]["$set"]["updated_at"] = now
+        before_tags = before[video_id].get("tags") or []
+        video_filter = {"_id": video_id, "tags": before_tags if before_tags else {"$in": [None, []]}}
+        operations.append(UpdateOne(_tag_diff_filter(video_filter, new_tags), pipeline))
+        operation_ids.append(video_id)
+
+    applied = {video_id: False for video_id in diffs}
+    if not operations:
+        return applied
+    result = videos_collection.bulk_write(operations, ordered=False)
+    if result.matched_count == len(operations):
+        applied_ids = operation_ids
+    else:
+        applied_ids = [video["_id"] for video in videos_collection.find(
+            {"_id": {"$in": operation_ids}, "updated_at": now}, {"_id": 1})]
+
+    for video_id in applied_ids:
+        add, remove = diffs[video_id]
+        before_tags = before[video_id].get("tags") or []
+        after_tags = [tag for tag in before_tags if tag not in remove] + [tag for tag in add if tag not in before_tags]
+        applied[video_id] = True
+        _apply_tag_facet_changes(before[video_id].get("user_ids", []), before_tags, after_tags)
+    return applied
 
-    if new_tag in current_tags:
+def add_tag_to_video(video_id, new_tag):
+    success, message, before_tags = _update_tags({"_id": ObjectId(video_id)}, add=[new_tag])
+    if not success:
+        return False, message
+    if before_tags is not None and new_tag in before_tags:
         return False, "이미 존재하는 태그입니다."
-
-    videos_collection.update_one(
-        {"_id": ObjectId(video_id)},
-        {"$push": {"tags": new_tag}}
-    )
-    print(f"Added tag {new_tag} to video ID {video_id}")
     return True, "태그가 성공적으로 추가되었습니다."
 
 
 def remove_tag_from_video(video_id, tag):
-    """비디오에서 태그 제거"""
-    videos_collection.update_one(
-        {"video_id": video_id},
-        {"$pull": {"tags": tag}}
-    )
-
+    """비디오에서 태그 제거. 비디오가 없으면 False"""
+    success, _, _ = _update_tags({"video_id": video_id}, remove=[tag])
+    return success
+
+
+def bump_user_versions(user_ids):
+    """사용자들의 데이터 버전을 올립니다. 이전 버전으로 캐시된 조회 결과는 더 이상 쓰이지 않습니다."""
+    operations = [UpdateOne({"_id": user_id}, {"$inc": {"version": 1}}, upsert=True)
+                  for user_id in dict.fromkeys(user_ids)]
+    if operations:
+        cache_versions_collection.bulk_write(operations, ordered=False)
+
+def get_user_version(user_id):
+    query = {"_id": user_id}
+    _explain_in_dev(cache_versions_collection, query)
+    version = cache_versions_collection.find_one(query, {"version": 1})
+    return version["version"] if version else 0
+
+def _facet_key(value):
+    """태그/채널 이름을 필드 이름으로 쓸 수 있게 '.'과 '$'를 이스케이프합니다."""
+    return value.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+def _facet_value(key):
+    return key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+def _facet_increments(tags=(), channels=(), amount=1):
+    increments = {f"tags.{_facet_key(tag)}": amount for tag in tags if tag}
+    increments.update({f"channels.{_facet_key(channel)}": amount for channel in channels if channel})
+    return increments
+
+def _apply_facet_increments(user_ids, increments):
+    # 패싯 문서가 아직 없는 사용자는 처음 읽을 때 비디오 목록에서 새로 만드므로 여기서는 만들지 않음
+    if user_ids and increments:
+        user_facets_collection.update_many(
+            {"_id": {"$in": list(user_ids)}},
+            {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}}
+        )
 
-def get_all_tags():
-    """모든 고유 태그 가져오기"""
-    all_tags = videos_collection.distinct("tags")
-    return [tag for tag in all_tags if tag is not None]  # None 값 제거
+def update_tag_facets(user_ids, tags, amount):
+    """비디오의 태그가 바뀌면 그 비디오를 가진 사용자들의 태그 수를 amount만큼 바꿉니다."""
+    _apply_facet_increments(user_ids, _facet_increments(tags=tags, amount=amount))
+
+def add_video_to_user_facets(user_ids, video):
+    """사용자 라이브러리에 처리 완료된 비디오가 추가되면 그 비디오의 태그/채널 수를 늘리고 데이터 버전을 올립니다."""
+    channels = [video["channel"]] if video.get("channel") else []
+    _apply_facet_increments(user_ids, _facet_increments(video.get("tags") or [], channels))
+    bump_user_versions(user_ids)
+
+def rebuild_user_facets(user_id=None):
+    """
+    비디오 문서에서 사용자별 태그/채널 수를 다시 계산해 패싯 문서를 덮어씁니다.
+
+    user_id가 없으면 모든 사용자를 다시 계산하고 비디오가 없는 사용자의 패싯 문서는 지웁니다.
+    :return: 다시 만든 패싯 문서 수
+    """
+    match = dict(READY_VIDEO_FILTER)
+    if user_id is not None:
+        match["user_ids"] = user_id
+    pipeline = [{"$match": match}, {"$unwind": "$user_ids"}]
+    if user_id is not None:
+        pipeline.append({"$match": {"user_ids": user_id}})
+
+    facets = {} if user_id is None else {user_id: {"tags": {}, "channels": {}}}
+    for field, facet in (("tags", "tags"), ("channel", "channels")):
+        stages = pipeline + ([{"$unwind": "$tags"}] if field == "tags" else []) + [
+            {"$match": {field: {"$nin": [None, ""]}}},
+            {"$group": {"_id": {"user_id": "$user_ids", "value": f"${field}"}, "count": {"$sum": 1}}},
+        ]
+        for row in videos_collection.aggregate(stages):
+            user_facets = facets.setdefault(row["_id"]["user_id"], {"tags": {}, "channels": {}})
+            user_facets[facet][_facet_key(row["_id"]["value"])] = row["count"]
+
+    now = datetime.utcnow()
+    operations = [ReplaceOne({"_id": facet_user_id}, {**user_facets, "updated_at": now}, upsert=True)
+                  for facet_user_id, user_facets in facets.items()]
+    if operations:
+        user_facets_collection.bulk_write(operations, ordered=False)
+        bump_user_versions(list(facets))
+    if user_id is None:
+        user_facets_collection.delete_many({"_id": {"$nin": list(facets)}})
+    return len(operations)
+
+def get_user_facets(user_id):
+    """사용자의 태그/채널 수 문서. 없으면 비디오 목록에서 만듭니다."""
+    query = {"_id": user_id}
+    _explain_in_dev(user_facets_collection, query)
+    facets = user_facets_collection.find_one(query)
+    if facets is None:
+        rebuild_user_facets(user_id)
+        facets = user_facets_collection.find_one({"_id": user_id})
+    return facets
+
+def _facet_names(counts):
+    return sorted(_facet_value(key) for key, count in (counts or {}).items() if count > 0)
+
+def get_all_tags(user_id):
+    """사용자 라이브러리의 고유 태그 가져오기"""
+    return _facet_names(get_user_facets(user_id).get("tags"))
 
 def get_videos_by_tags(tags):
     """태그 리스트에 해당하는 비디오 정보 가져오기"""
-    return list(videos_collection.find({"tags": {"$in": tags}}))
+    query = {"tags": {"$in": tags}, **READY_VIDEO_FILTER}
+    _explain_in_dev(videos_collection, query)
+    return list(videos_collection.find(query, HEAVY_FIELDS_PROJECTION))
 
 def get_all_channels(user_id):
     """사용자가 업로드한 비디오들의 채널 목록 가져오기"""
-    channels = videos_collection.distinct("channel", {"user_ids": user_id})
-    return channels
+    return _facet_names(get_user_facets(user_id).get("channels"))
 
-def get_user_videos(user_id, selected_tags=None, start_date=None, end_date=None, show_no_tags=False, selected_channels=None):
-    """사용자의 처리된 비디오 목록 가져오기 (필터링 포함)"""
-    query = {"user_ids": user_id}
+def _user_videos_query(user_id, selected_tags=None, start_date=None, end_date=None, show_no_tags=False,
+                       selected_channels=None):
+    """사용자 비디오 목록 필터를 Mongo 쿼리로 만듭니다."""
+    query = {"user_ids": user_id, **READY_VIDEO_FILTER}
 
     if show_no_tags:
         query["$or"] = [{"tags": {"$exists": False}}, {"tags": []}]
@@ -147,4 +691,73 @@ def get_user_videos(user_id, selected_tags=None, start_date=None, end_date=None,
     if selected_channels:
         query["channel"] = {"$in": selected_channels}
 
-    return list(videos_collection.find(query))
+    return query
+
+def get_user_videos(user_id, selected_tags=None, start_date=None, end_date=None, show_no_tags=False, selected_channels=None):
+    """사용자의 처리된 비디오 목록 가져오기 (필터링 포함)"""
+    query = _user_videos_query(user_id, selected_tags, start_date, end_date, show_no_tags, selected_channels)
+    _explain_in_dev(videos_collection, query)
+    return list(videos_collection.find(query, HEAVY_FIELDS_PROJECTION))
+
+def list_user_videos(user_id, selected_tags=None, start_date=None, end_date=None, show_no_tags=False,
+                     selected_channels=None):
+    """목록/선택 화면용: 사용자의 처리된 비디오를 표시 필드만 담아 가져오기 (필터링 포함)"""
+    query = _user_videos_query(user_id, selected_tags, start_date, end_date, show_no_tags, selected_channels)
+    _explain_in_dev(videos_collection, query)
+    return list(videos_collection.find(query, VIDEO_LIST_PROJECTION))
+
+def list_user_videos_page(user_id, selected_tags=None, start_date=None, end_date=None, show_no_tags=False,
+                          selected_channels=None, sort_field="processed_at", sort_direction=-1,
+                          page_size=VIDEO_LIST_PAGE_SIZE, cursor=None):
+    """
+    목록 화면용: 사용자의 처리된 비디오를 Mongo에서 정렬해 한 페이지씩 가져오기 (키셋 페이지네이션)
+
+    정렬 기준이 같은 문서는 _id로 순서를 정하고, 다음 페이지는 이전 페이지 마지막 문서의 (정렬 값, _id) 다음부터 읽습니다.
+    :param sort_field: VIDEO_SORT_FIELDS 중 하나
+    :param sort_direction: 1(오름차순) 또는 -1(내림차순)
+    :param cursor: 이전 호출이 반환한 next_cursor. None이면 첫 페이지
+    :return: (비디오 목록, 다음 페이지 커서 또는 마지막 페이지면 None)
+    """
+    if sort_field not in VIDEO_SORT_FIELDS:
+        raise ValueError(f"지원하지 않는 정렬 기준입니다: {sort_field}")
+    if sort_direction not in (1, -1):
+        raise ValueError(f"정렬 방향은 1 또는 -1이어야 합니다: {sort_direction}")
+    ensure_video_list_indexes()
+
+    query = _user_videos_query(user_id, selected_tags, start_date, end_date, show_no_tags, selected_channels)
+    if cursor is not None:
+        query = {"$and": [query, _keyset_after(sort_field, sort_direction, cursor)]}
+
+    sort = [(sort_field, sort_direction), ("_id", sort_direction)]
+    _explain_in_dev(videos_collection, query, sort=sort)
+    # 다음 페이지가 있는지 알기 위해 하나 더 읽음
+    videos = list(videos_collection.find(query, VIDEO_LIST_PROJECTION)
+                  .sort(sort)
+                  .limit(page_size + 1))
+    next_cursor = None
+    if len(videos) > page_size:
+        videos = videos[:page_size]
+        last = videos[-1]
+        next_cursor = {"value": last.get(sort_field), "id": last["_id"]}
+    return videos, next_cursor
+
+def _keyset_after(sort_field, sort_direction, cursor):
+    """정렬 순서에서 커서 (정렬 값, _id) 뒤에 오는 문서 조건"""
+    value, last_id = cursor["value"], cursor["id"]
+    op = "$gt" if sort_direction == 1 else "$lt"
+    if value is None:
+        # 정렬 값이 없는 문서는 오름차순에서 맨 앞, 내림차순에서 맨 뒤
+        same_value = {sort_field: None, "_id": {op: last_id}}
+        return {"$or": [{sort_field: {"$ne": None}}, same_value]} if sort_direction == 1 else same_value
+    after = [{sort_field: {op: value}}, {sort_field: value, "_id": {op: last_id}}]
+    if sort_direction == -1:
+        after.append({sort_field: None})
+    return {"$or": after}
+
+def list_videos_by_tags(tags, user_id=None):
+    """목록/선택 화면용: 태그 리스트에 해당하는 비디오를 표시 필드만 담아 가져오기 (user_id가 있으면 그 사용자의 비디오만)"""
+    query = {"tags": {"$in": tags}, **READY_VIDEO_FILTER}
+    if user_id is not None:
+        query["user_ids"] = user_id
+    _explain_in_dev(videos_collection, query)
+    return list(videos_collection.find(query, VIDEO_LIST_PROJECTION))
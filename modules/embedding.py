@@ -0,0 +1,99 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import EMBEDDING_MODEL, EMBEDDING_MAX_WORKERS
+from modules import chunking, clients, rate_limit
+
+# OpenAI 클라이언트 (프로세스 공유, 재시도는 rate_limit에서 처리)
+client = clients.get_openai_client()
+
+logger = logging.getLogger(__name__)
+
+# 임베딩 API 요청당 제한 (입력 개수, 요청 전체 토큰 수)
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 300000
+
+
+def make_batches(token_counts, max_inputs=MAX_INPUTS_PER_REQUEST, max_tokens=MAX_TOKENS_PER_REQUEST):
+    """입력 순서를 유지하면서 요청 제한에 맞게 (시작, 끝) 인덱스 구간으로 묶습니다."""
+    batches = []
+    start = 0
+    batch_tokens = 0
+    for i, count in enumerate(token_counts):
+        if i > start and (i - start >= max_inputs or batch_tokens + count > max_tokens):
+            batches.append((start, i))
+            start = i
+            batch_tokens = 0
+        batch_tokens += count
+    if start < len(token_counts):
+        batches.append((start, len(token_counts)))
+    return batches
+
+
+def _embed_batch(texts, token_count=0):
+    """하나의 임베딩 요청으로 여러 텍스트를 임베딩합니다."""
+    response = rate_limit.call("openai_embeddings", client.embeddings.create, input=texts, model=EMBEDDING_MODEL,
+                               tokens=token_count)
+    # 응답 순서가 입력 순서와 다를 수 있으므로 index 기준으로 정렬
+    data = sorted(response.data, key=lambda item: item.index)
+    return np.asarray([item.embedding for item in data], dtype=np.float32)
+
+
+def embed_texts(texts, token_counts=None, max_workers=EMBEDDING_MAX_WORKERS):
+    """
+    여러 텍스트를 배치 요청으로 묶어 동시에 임베딩합니다.
+
+    :param texts: 임베딩할 텍스트 목록 (각 텍스트는 모델의 입력 토큰 제한 이하)
+    :param token_counts: 텍스트별 토큰 수 (청크 단계에서 계산된 값이 있으면 재토큰화를 생략)
+    :param max_workers: 동시에 보낼 최대 요청 수
+    :return: (텍스트 수, 차원) 형태의 float32 배열
+    """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    if token_counts is None:
+        token_counts = [chunking.count_tokens(text) for text in texts]
+
+    batches = make_batches(token_counts)
+    logger.info(f"임베딩 요청: 텍스트 {len(texts)}개, 배치 {len(batches)}개")
+
+    if len(batches) == 1:
+        return _embed_batch(list(texts), sum(token_counts))
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+        results = executor.map(lambda batch: _embed_batch(list(texts[batch[0]:batch[1]]),
+                                                          sum(token_counts[batch[0]:batch[1]])), batches)
+        return np.vstack(list(results))
+
+
+def embed_documents(documents, max_workers=EMBEDDING_MAX_WORKERS):
+    """
+    여러 문서(비디오)의 청크를 한꺼번에 배치로 임베딩합니다.
+
+    :param documents: 문서별 청크 목록. 각 청크는 chunking.split_text가 반환하는 딕셔너리입니다.
+    :return: 문서별 (청크 수, 차원) 배열 목록
+    """
+    texts = [chunk["text"] for chunks in documents for chunk in chunks]
+    token_counts = [chunk["token_count"] for chunks in documents for chunk in chunks]
+    vectors = embed_texts(texts, token_counts, max_workers=max_workers)
+
+    results = []
+    offset = 0
+    for chunks in documents:
+        results.append(vectors[offset:offset + len(chunks)])
+        offset += len(chunks)
+    return results
+
+
+def mean_embedding(vectors, normalize=True):
+    """청크 임베딩의 평균 벡터를 계산하고 필요하면 단위 길이로 정규화합니다."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.size == 0:
+        return np.empty(0, dtype=np.float32)
+    mean = vectors.mean(axis=0)
+    if normalize:
+        norm = np.linalg.norm(mean)
+        if norm > 0:
+            mean /= norm
+    return mean
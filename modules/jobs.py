@@ -0,0 +1,196 @@
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+
+from config import JOB_WORKER_THREADS, JOB_STALE_SECONDS, JOB_HEARTBEAT_INTERVAL
+from modules import bulk_import, video_processing
+from modules.database import jobs_collection
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+ACTIVE_STATUSES = [STATUS_QUEUED, STATUS_RUNNING]
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# 웹 프로세스 안에서 작업을 실행하는 스레드 풀 (Streamlit 재실행과 무관하게 프로세스당 하나)
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKER_THREADS, thread_name_prefix="ingest-job") \
+    if JOB_WORKER_THREADS > 0 else None
+
+
+class JobProgress:
+    """
+    process_video의 progress_bar 자리에 넘겨 진행 상황을 jobs 컬렉션에 기록합니다.
+
+    기록은 이 작업자가 가져온 실행(worker, attempts)일 때만 하며, 그 사이 작업이 중단된 것으로 처리되어
+    다른 작업자에게 넘어갔으면 ValueError로 처리를 멈춥니다.
+    """
+
+    def __init__(self, job_id, attempt=None):
+        self.job_id = ObjectId(job_id)
+        self.attempt = attempt
+        self._last_write = time.monotonic()
+
+    def _update(self, fields):
+        query = {"_id": self.job_id, "status": STATUS_RUNNING, "worker": WORKER_ID}
+        if self.attempt is not None:
+            query["attempts"] = self.attempt
+        result = jobs_collection.update_one(query, {"$set": fields})
+        self._last_write = time.monotonic()
+        if result.matched_count == 0:
+            raise ValueError(f"작업 {self.job_id}이(가) 다른 작업자에게 넘어가 처리를 중단합니다.")
+
+    def progress(self, value, text=None):
+        update = {"progress": value, "updated_at": datetime.utcnow()}
+        if text:
+            update["stage"] = text
+        self._update(update)
+
+    def heartbeat(self):
+        """진행 상황 변화 없이 오래 기다리는 동안 작업이 살아 있음을 기록합니다. (JOB_HEARTBEAT_INTERVAL마다 한 번)"""
+        if time.monotonic() - self._last_write >= JOB_HEARTBEAT_INTERVAL:
+            self._update({"updated_at": datetime.utcnow()})
+
+
+def submit_ingest_job(video_url, user_id, title=None, video_info=None, additional_user_ids=None):
+    """
+    비디오 처리 작업을 대기열에 넣고 작업 ID를 반환합니다. title은 작업 목록 표시에 사용합니다.
+
+    video_info로 이미 조회한 (제목, 채널, 길이)를 넘기면 작업 실행 시 YouTube API를 다시 호출하지 않습니다.
+    additional_user_ids의 사용자는 처리가 끝난 뒤 비디오의 user_ids에 추가됩니다. (채널 구독 등)
+    """
+    now = datetime.utcnow()
+    if video_info is not None and title is None:
+        title = video_info[0]
+    job = {
+        "type": "ingest",
+        "video_url": video_url,
+        "title": title or video_url,
+        "video_info": list(video_info) if video_info is not None else None,
+        "user_id": user_id,
+        "additional_user_ids": list(additional_user_ids or []),
+        "status": STATUS_QUEUED,
+        "stage": "대기 중",
+        "progress": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    job_id = jobs_collection.insert_one(job).inserted_id
+    logger.info(f"작업 등록: {job_id} ({video_url})")
+
+    if _executor is not None:
+        # 특정 작업이 아니라 가장 오래된 대기 작업을 실행하여, 재시작 등으로 남은 작업도 함께 처리
+        _executor.submit(run_job)
+    return str(job_id)
+
+
+def submit_import_job(url, user_id):
+    """재생목록/채널 가져오기 작업을 대기열에 넣고 작업 ID를 반환합니다."""
+    import_id = bulk_import.create_import(url, user_id)
+    now = datetime.utcnow()
+    job = {
+        "type": "import",
+        "video_url": url,
+        "import_id": import_id,
+        "title": f"재생목록/채널 가져오기: {url}",
+        "user_id": user_id,
+        "status": STATUS_QUEUED,
+        "stage": "대기 중",
+        "progress": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    job_id = jobs_collection.insert_one(job).inserted_id
+    logger.info(f"가져오기 작업 등록: {job_id} ({url})")
+
+    if _executor is not None:
+        _executor.submit(run_job)
+    return str(job_id)
+
+
+def claim_job(job_id=None):
+    """대기 중인 작업 하나를 원자적으로 가져와 실행 상태로 바꿉니다. 없으면 None"""
+    query = {"status": STATUS_QUEUED}
+    if job_id is not None:
+        query["_id"] = ObjectId(job_id)
+    now = datetime.utcnow()
+    return jobs_collection.find_one_and_update(
+        query,
+        {"$set": {"status": STATUS_RUNNING, "worker": WORKER_ID, "started_at": now, "updated_at": now},
+         "$inc": {"attempts": 1}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def run_job(job_id=None):
+    """작업을 가져와 실행합니다. job_id가 없으면 가장 오래된 대기 작업을 실행합니다."""
+    job = claim_job(job_id)
+    if job is None:
+        return None
+
+    # 중단된 것으로 처리되어 다른 작업자가 다시 가져간 뒤에는 그 실행의 상태를 덮어쓰지 않음
+    owned = {"_id": job["_id"], "worker": WORKER_ID, "attempts": job["attempts"]}
+    try:
+        if job.get("type") == "import":
+            # 중단 후 다시 실행되면 가져오기 문서에 기록된 남은 항목부터 이어서 처리
+            bulk_import.run_import(job["import_id"], JobProgress(job["_id"], job["attempts"]))
+            result_id = job["import_id"]
+        else:
+            video_info = tuple(job["video_info"]) if job.get("video_info") else None
+            result_id = video_processing.process_video(job["video_url"], job["user_id"],
+                                                       JobProgress(job["_id"], job["attempts"]),
+                                                       video_info=video_info)
+            _, video_id = video_processing.normalize_video_input(job["video_url"])
+            for additional_user_id in job.get("additional_user_ids") or []:
+                video_processing.update_user_for_video(video_id, additional_user_id)
+        jobs_collection.update_one(
+            owned,
+            {"$set": {"status": STATUS_COMPLETED, "progress": 100, "stage": "완료",
+                      "result_id": str(result_id), "finished_at": datetime.utcnow(),
+                      "updated_at": datetime.utcnow()}}
+        )
+        logger.info(f"작업 완료: {job['_id']}")
+    except Exception as e:
+        logger.error(f"작업 실패: {job['_id']} - {str(e)}")
+        jobs_collection.update_one(
+            owned,
+            {"$set": {"status": STATUS_FAILED, "stage": "실패", "error": str(e),
+                      "finished_at": datetime.utcnow(), "updated_at": datetime.utcnow()}}
+        )
+    return job["_id"]
+
+
+def requeue_stale_jobs():
+    """작업자가 중단되어 오래 갱신되지 않은 실행 중 작업을 다시 대기열로 돌립니다."""
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    result = jobs_collection.update_many(
+        {"status": STATUS_RUNNING, "updated_at": {"$lt": cutoff}},
+        {"$set": {"status": STATUS_QUEUED, "stage": "재시도 대기 중", "updated_at": datetime.utcnow()},
+         "$unset": {"worker": ""}}
+    )
+    if result.modified_count:
+        logger.warning(f"중단된 작업 {result.modified_count}개를 다시 대기열에 넣었습니다.")
+    return result.modified_count
+
+
+def get_job(job_id):
+    return jobs_collection.find_one({"_id": ObjectId(job_id)})
+
+
+def get_user_jobs(user_id, limit=10):
+    """사용자의 최근 작업 목록"""
+    return list(jobs_collection.find({"user_id": user_id}).sort("created_at", -1).limit(limit))
+
+
+def has_active_jobs(user_id):
+    return jobs_collection.count_documents({"user_id": user_id, "status": {"$in": ACTIVE_STATUSES}}, limit=1) > 0
@@ -0,0 +1,163 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from config import LEXICAL_INDEX_DIR
+from modules import chunking, database
+
+logger = logging.getLogger(__name__)
+
+# 한국어는 형태소 분석 없이도 잘 맞도록 문자 2~3-gram을 사용.
+# 해싱 방식이라 어휘 사전이 필요 없으므로 비디오별로 따로 만든 행렬을 그대로 합칠 수 있음
+vectorizer = HashingVectorizer(
+    analyzer='char_wb',
+    ngram_range=(2, 3),
+    n_features=2 ** 20,
+    alternate_sign=False,
+    norm=None,
+    dtype=np.float32,
+)
+
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 합쳐진(태그/사용자 단위) 인덱스의 프로세스 내 캐시
+MERGED_CACHE_SIZE = 32
+_merged_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class LexicalIndex:
+    """여러 비디오의 패시지 term frequency 행렬을 합친 BM25 인덱스"""
+
+    def __init__(self, matrices, video_ids):
+        self.video_ids = list(video_ids)
+        self.postings = sp.vstack(matrices, format='csr').tocsc() if matrices else sp.csc_matrix((0, vectorizer.n_features))
+        counts = [m.shape[0] for m in matrices]
+        # 행 번호 -> (video_id, chunk_index)
+        self.row_video = np.repeat(np.arange(len(counts)), counts)
+        self.row_chunk = np.concatenate([np.arange(c) for c in counts]) if counts else np.empty(0, dtype=np.int64)
+        self.doc_lengths = np.asarray(self.postings.sum(axis=1)).ravel()
+        self.avg_doc_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+
+    @property
+    def num_passages(self):
+        return self.postings.shape[0]
+
+    def score(self, query):
+        """질의에 포함된 term의 posting만 읽어 모든 패시지의 BM25 점수를 계산합니다."""
+        scores = np.zeros(self.num_passages, dtype=np.float32)
+        if self.num_passages == 0:
+            return scores
+
+        query_vector = vectorizer.transform([query])
+        terms, query_tf = query_vector.indices, query_vector.data
+        if len(terms) == 0:
+            return scores
+
+        postings = self.postings[:, terms]
+        df = np.diff(postings.indptr)
+        idf = np.log1p((self.num_passages - df + 0.5) / (df + 0.5))
+
+        rows = postings.indices
+        tf = postings.data
+        term_of_entry = np.repeat(np.arange(len(terms)), df)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[rows] / self.avg_doc_length)
+        weights = (idf * query_tf)[term_of_entry] * tf * (BM25_K1 + 1) / (tf + norm)
+        return np.bincount(rows, weights=weights, minlength=self.num_passages).astype(np.float32)
+
+    def search(self, query, k=10):
+        """점수가 높은 패시지를 video_id, chunk_index, score 딕셔너리 목록으로 반환합니다."""
+        scores = self.score(query)
+        if not len(scores):
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "video_id": self.video_ids[self.row_video[row]],
+                "chunk_index": int(self.row_chunk[row]),
+                "score": float(scores[row]),
+            }
+            for row in top if scores[row] > 0
+        ]
+
+    def rank_videos(self, query):
+        """비디오별 최고 패시지 점수로 비디오를 정렬해 video_id 목록을 반환합니다."""
+        scores = self.score(query)
+        video_scores = np.zeros(len(self.video_ids), dtype=np.float32)
+        np.maximum.at(video_scores, self.row_video, scores)
+        return [self.video_ids[i] for i in np.argsort(-video_scores, kind='stable')]
+
+
+def _path(video_id):
+    return os.path.join(LEXICAL_INDEX_DIR, f"{video_id}.npz")
+
+
+def build_video_index(video_id, chunks):
+    """인제스트 시 비디오의 패시지 term frequency 행렬을 만들어 저장합니다."""
+    matrix = vectorizer.transform([chunk["text"] for chunk in chunks]).tocsr()
+    _drop_merged(video_id)
+    try:
+        os.makedirs(LEXICAL_INDEX_DIR, exist_ok=True)
+        # save_npz는 확장자를 자동으로 붙이므로 임시 파일도 .npz로 끝나게 지정
+        tmp_path = _path(video_id) + ".tmp.npz"
+        sp.save_npz(tmp_path, matrix)
+        os.replace(tmp_path, _path(video_id))
+    except OSError as e:
+        logger.warning(f"어휘 인덱스 저장 중 오류 발생 (video: {video_id}): {str(e)}")
+    return matrix
+
+
+def _load_video_index(video_id):
+    """저장된 비디오 행렬을 읽고, 없으면 DB의 청크(또는 트랜스크립트)로 다시 만듭니다."""
+    path = _path(video_id)
+    if os.path.exists(path):
+        return sp.load_npz(path).tocsr()
+
+    chunks = database.get_video_chunks([video_id])
+    if not chunks:
+        # 청크 저장 이전에 처리된 비디오는 같은 설정으로 트랜스크립트를 다시 나눔
+        chunks = chunking.split_passages(database.get_transcript(video_id))
+    logger.info(f"어휘 인덱스 재구축: {video_id} ({len(chunks)}개 청크)")
+    return build_video_index(video_id, chunks)
+
+
+def get_index(video_ids):
+    """비디오 집합(태그/사용자 단위)의 합쳐진 인덱스를 반환합니다. 같은 집합은 질문 간에 재사용됩니다."""
+    key = tuple(sorted(set(video_ids)))
+    with _cache_lock:
+        index = _merged_cache.get(key)
+        if index is not None:
+            _merged_cache.move_to_end(key)
+            return index
+
+    index = LexicalIndex([_load_video_index(video_id) for video_id in key], key)
+
+    with _cache_lock:
+        _merged_cache[key] = index
+        while len(_merged_cache) > MERGED_CACHE_SIZE:
+            _merged_cache.popitem(last=False)
+    return index
+
+
+def _drop_merged(video_id):
+    with _cache_lock:
+        for key in [key for key in _merged_cache if video_id in key]:
+            del _merged_cache[key]
+
+
+def invalidate_video(video_id):
+    """비디오의 트랜스크립트가 바뀌었을 때 저장된 행렬과 이를 포함한 합쳐진 인덱스를 버립니다."""
+    try:
+        os.remove(_path(video_id))
+    except FileNotFoundError:
+        pass
+    _drop_merged(video_id)
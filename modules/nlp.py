@@ -1,39 +1,65 @@
-from openai import OpenAI
 import google.generativeai as genai
-from config import OPENAI_API_KEY, GEMINI_API_KEY
 import textwrap
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+import logging
+from modules import answer_cache, chunking, clients, database, embedding, lexical_index, rate_limit, retrieval
 
-# OpenAI 클라이언트 초기화
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
+
+# OpenAI 클라이언트 (프로세스 공유, 재시도는 rate_limit에서 처리)
+openai_client = clients.get_openai_client()
+
+# Gemini 모델 설정
+GEMINI_MODEL_NAME = "models/gemini-1.5-pro-latest"
+
+BLOCKED_PROMPT_MESSAGE = "죄송합니다. 이 질문에 대한 응답을 생성할 수 없습니다. 다른 방식으로 질문을 표현해 보시겠습니까?"
 
-# Gemini API 설정
-genai.configure(api_key=GEMINI_API_KEY)
 
 def transcribe_audio(file_path):
     """오디오 파일을 텍스트로 변환"""
-    with open(file_path, "rb") as audio_file:
-        transcript = openai_client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file
-        )
-    return transcript.text
+    def request():
+        with open(file_path, "rb") as audio_file:
+            return openai_client.audio.transcriptions.create(
+                model="whisper-1",
+                file=audio_file
+            )
+    return rate_limit.call("openai_whisper", request).text
 
 def embed_text(text):
     """텍스트를 벡터로 임베딩"""
-    response = openai_client.embeddings.create(input=[text], model="text-embedding-ada-002")
+    response = rate_limit.call("openai_embeddings", openai_client.embeddings.create, input=[text],
+                               model="text-embedding-ada-002", tokens=chunking.count_tokens(text))
     return response.data[0].embedding
 
 
-def generate_response(query, transcripts):
-    """여러 트랜스크립트를 기반으로 질문에 대한 응답 생성"""
-    model = genai.GenerativeModel(model_name="models/gemini-1.5-pro-latest")
-
-    relevant_parts = process_multiple_transcripts(query, transcripts)
-    combined_transcript = "\n\n".join(relevant_parts)
-
+def build_context(query, transcripts=None, video_ids=None, user_id=None, query_vector=None):
+    """
+    프롬프트에 넣을 비디오 내용을 만듭니다.
+
+    video_ids가 주어지면 관련 패시지만 골라 토큰 예산 안에서 출처와 함께 구성하고,
+    없으면 관련성 높은 트랜스크립트 전체를 이어 붙입니다.
+    transcripts가 None이면 패시지를 찾지 못했을 때만 video_ids의 트랜스크립트를 불러옵니다.
+    """
+    if video_ids:
+        passages = retrieval.retrieve_passages(query, video_ids, user_id=user_id, query_vector=query_vector)
+        if passages:
+            return retrieval.format_context(retrieval.pack_context(passages))
+        if transcripts is None:
+            transcript_by_id = database.get_transcripts(video_ids)
+            video_ids = [video_id for video_id in video_ids if video_id in transcript_by_id]
+            transcripts = [transcript_by_id[video_id] for video_id in video_ids]
+
+    # video_ids와 transcripts가 같은 순서로 짝지어져 있을 때만 어휘 인덱스로 순위를 매김
+    transcripts = transcripts or []
+    ranked_ids = video_ids if video_ids and len(video_ids) == len(transcripts) else None
+    relevant_parts = process_multiple_transcripts(query, transcripts, ranked_ids)
+    return "\n\n".join(relevant_parts)
+
+
+def build_prompt(query, combined_transcript):
+    """비디오 내용과 질문으로 Gemini 프롬프트를 만듭니다."""
     prompt = textwrap.dedent(f"""
     다음은 여러 YouTube 비디오의 관련 내용입니다:
 
@@ -46,25 +72,106 @@ def generate_response(query, transcripts):
     1. 주어진 내용에서 직접적으로 관련된 정보를 찾아 상세하게 답변하세요.
     2. 필요한 경우 풍부한 설명과 예시를 포함하여 답변하세요.
     3. 정보가 부족하거나 관련이 없는 경우, "제공된 내용에는 이 질문에 답할 만한 충분한 정보가 없습니다."라고 명시한 후, 기존 지식을 활용하여 일반적인 수준의 추가 정보를 제공하세요.
-    4. 관련 부분을 직접 인용하여 답변의 근거를 제시하세요. 인용 시 큰따옴표를 사용하고 출처를 명시하세요.
+    4. 관련 부분을 직접 인용하여 답변의 근거를 제시하세요. 인용 시 큰따옴표를 사용하고 출처를 명시하세요. 내용에 [출처 번호]가 있으면 해당 번호와 영상 제목을 함께 적어주세요.
     5. 의학적 조언이나 전문적인 내용을 다룰 때는 "영상에서 언급된 바에 따르면"이라는 문구로 시작하고, 추가적인 전문가 상담을 권고하세요.
     6. 긴 답변을 제공하는 경우 마지막 문잔에 주요 포인트를 요약하고, 추가 학습이나 탐구를 위한 제안을 포함하세요.
     7. 답변의 깊이, 양이 구체적으로 명시되지 않은 질문에 대해서는 기본적으로 10줄 이상의 구체적 답변을 하세요.
 
     답변:
     """)
+    return prompt
 
+
+def _embed_query(query):
+    """질문 임베딩 (캐시의 유사 질문 매칭과 벡터 검색에 함께 사용). 실패하면 None"""
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return embedding.embed_texts([query])[0]
+    except Exception as e:
+        logger.warning(f"질문 임베딩 중 오류 발생: {str(e)}")
+        return None
+
+
+def _stream_gemini(prompt):
+    """Gemini 스트리밍 응답에서 텍스트 조각을 꺼냅니다."""
+    model = clients.get_gemini_model(GEMINI_MODEL_NAME)
+    # 한도 초과는 스트림을 여는 요청에서 발생하므로 여는 단계만 재시도
+    response = rate_limit.call("gemini", model.generate_content, prompt, stream=True,
+                               tokens=chunking.count_tokens(prompt))
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # 안전 필터 등으로 텍스트가 없는 조각은 건너뜀
+            continue
+        if text:
+            yield text
+
+
+def generate_response_stream(query, transcripts=None, video_ids=None, user_id=None):
+    """
+    질문에 대한 응답을 생성되는 대로 조각 단위로 반환하는 제너레이터
+
+    video_ids가 주어지면 같은(또는 충분히 비슷한) 질문의 캐시된 답변을 바로 반환하고,
+    같은 질문이 동시에 들어오면 하나의 요청만 Gemini를 호출하고 나머지는 그 결과를 기다립니다.
+    """
+    query_vector = None
+    flight = None
+    if video_ids:
+        query_vector = _embed_query(query)
+        cached = answer_cache.cache.lookup(video_ids, query, query_vector)
+        if cached is not None:
+            yield cached
+            return
+
+        flight, is_leader = answer_cache.cache.begin(video_ids, query)
+        if not is_leader:
+            answer = flight.wait()
+            if answer is not None:
+                yield answer
+                return
+            # 먼저 시작한 요청이 실패했으면 직접 생성 (결과는 캐시하지 않음)
+            flight = None
+
+    parts = []
+    completed = False
+    try:
+        prompt = build_prompt(query, build_context(query, transcripts, video_ids, user_id, query_vector))
+        for text in _stream_gemini(prompt):
+            parts.append(text)
+            yield text
+        completed = True
     except genai.types.generation_types.BlockedPromptException:
-        return "죄송합니다. 이 질문에 대한 응답을 생성할 수 없습니다. 다른 방식으로 질문을 표현해 보시겠습니까?"
+        yield BLOCKED_PROMPT_MESSAGE
     except Exception as e:
-        return f"응답 생성 중 오류 발생: {str(e)}"
+        yield f"응답 생성 중 오류 발생: {str(e)}"
+    finally:
+        if flight is not None:
+            answer = "".join(parts) if completed and parts else None
+            if answer is not None:
+                answer_cache.cache.store(video_ids, query, answer, query_vector)
+            answer_cache.cache.finish(flight, answer)
+
+
+def generate_response(query, transcripts=None, video_ids=None, user_id=None):
+    """여러 트랜스크립트를 기반으로 질문에 대한 응답 생성"""
+    return "".join(generate_response_stream(query, transcripts, video_ids, user_id))
+
+
+def process_multiple_transcripts(query, transcripts, video_ids=None):
+    """
+    여러 트랜스크립트에서 질문과 관련성 높은 부분 선별
+
+    video_ids가 주어지면 인제스트 시 만들어 둔 어휘 인덱스로 순위를 매기고,
+    없으면 질문마다 TF-IDF를 새로 학습합니다.
+    """
+    if len(transcripts) <= 1:
+        return transcripts
 
+    if video_ids:
+        ranked_ids = lexical_index.get_index(video_ids).rank_videos(query)
+        transcript_by_id = dict(zip(video_ids, transcripts))
+        return [transcript_by_id[video_id] for video_id in ranked_ids[:5]]
 
-def process_multiple_transcripts(query, transcripts):
-    """여러 트랜스크립트에서 질문과 관련성 높은 부분 선별"""
     vectorizer = TfidfVectorizer()
     tfidf_matrix = vectorizer.fit_transform(transcripts + [query])
 
@@ -0,0 +1,227 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from config import RATE_LIMITS, RATE_LIMIT_MAX_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# 재시도 대기 시간 (지수 백오프 + full jitter)
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30
+# 버킷 용량: 분당 한도 중 몇 초 분량까지 한꺼번에 보낼 수 있는지
+BURST_SECONDS = 10
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# 상태 코드가 없는 예외 중 재시도할 예외 이름 (연결 오류, 자막 API의 요청 과다 등)
+RETRYABLE_EXCEPTION_NAMES = {"APIConnectionError", "APITimeoutError", "ConnectionError", "Timeout",
+                             "ReadTimeout", "ConnectTimeout", "ResourceExhausted", "ServiceUnavailable",
+                             "InternalServerError", "TooManyRequests"}
+THROTTLE_EXCEPTION_NAMES = {"RateLimitError", "ResourceExhausted", "TooManyRequests"}
+
+
+class TokenBucket:
+    """초당 rate만큼 채워지고 최대 capacity까지 쌓이는 토큰 버킷"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """amount만큼의 토큰을 얻을 때까지 기다리고 기다린 시간(초)을 반환합니다."""
+        # 한 번에 버킷 용량보다 많이 요청하면 가득 찼을 때 통과시킴 (음수 잔량은 이후 요청이 갚음)
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self, amount):
+        """서버가 한도를 알려 오면 버킷을 비워 다른 요청도 잠시 멈추게 합니다."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, -amount)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD 방식의 동시 요청 수 제한
+
+    성공하면 동시 요청 한도를 조금씩(한도당 +1/한도) 늘리고, 한도 초과(429) 응답을 받으면 절반으로 줄입니다.
+    """
+
+    def __init__(self, initial, minimum=1, maximum=64):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled=False):
+        with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+class ProviderLimiter:
+    """외부 API 제공자 하나의 요청/토큰 한도, 동시 요청 수, 재시도와 지표를 관리합니다."""
+
+    def __init__(self, name, requests_per_minute, tokens_per_minute=None, max_concurrency=8,
+                 max_retries=RATE_LIMIT_MAX_RETRIES):
+        self.name = name
+        self.request_bucket = TokenBucket(requests_per_minute / 60, max(1, requests_per_minute * BURST_SECONDS / 60))
+        self.token_bucket = TokenBucket(tokens_per_minute / 60, tokens_per_minute * BURST_SECONDS / 60) \
+            if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrency(max(1, max_concurrency // 2), maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.metrics_lock = threading.Lock()
+        self.metrics = {"requests": 0, "succeeded": 0, "throttled": 0, "retries": 0, "failed": 0,
+                        "tokens": 0, "wait_seconds": 0.0}
+
+    def _count(self, **values):
+        with self.metrics_lock:
+            for key, value in values.items():
+                self.metrics[key] += value
+
+    def call(self, func, *args, tokens=0, **kwargs):
+        """
+        한도에 맞춰 func(*args, **kwargs)를 호출하고, 한도 초과나 일시적 오류는 백오프 후 재시도합니다.
+
+        :param tokens: 이 요청이 사용할 (예상) 토큰 수
+        """
+        for attempt in range(self.max_retries + 1):
+            waited = self.request_bucket.acquire()
+            if self.token_bucket is not None and tokens:
+                waited += self.token_bucket.acquire(tokens)
+            self.concurrency.acquire()
+            self._count(requests=1, tokens=tokens, wait_seconds=waited)
+
+            throttled = False
+            try:
+                result = func(*args, **kwargs)
+                self._count(succeeded=1)
+                return result
+            except Exception as e:
+                retryable, throttled, retry_after = classify_error(e)
+                if not retryable or attempt == self.max_retries:
+                    self._count(failed=1, throttled=int(throttled))
+                    raise
+                delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                if throttled:
+                    # 같은 제공자로 가는 다른 요청도 대기 시간 동안 멈추도록 버킷을 비움
+                    self.request_bucket.penalize(self.request_bucket.rate * delay)
+                self._count(retries=1, throttled=int(throttled))
+                logger.warning(f"{self.name} 요청 실패 ({type(e).__name__}), {delay:.1f}초 후 재시도 "
+                               f"({attempt + 1}/{self.max_retries})")
+            finally:
+                self.concurrency.release(throttled)
+            time.sleep(delay)
+
+    def snapshot(self):
+        with self.metrics_lock:
+            metrics = dict(self.metrics)
+        metrics["concurrency_limit"] = int(self.concurrency.limit)
+        metrics["in_flight"] = self.concurrency.in_flight
+        return metrics
+
+
+def _original_error(exc):
+    """yt-dlp의 DownloadError/ExtractorError가 감싼 원래 예외 (HTTP 오류 등)"""
+    for _ in range(5):
+        inner = getattr(exc, "cause", None) or (getattr(exc, "exc_info", None) or (None, None))[1]
+        if not isinstance(inner, Exception) or inner is exc:
+            break
+        exc = inner
+    return exc
+
+
+def _status_code(exc):
+    for source in (exc, getattr(exc, "response", None)):
+        for attribute in ("status_code", "code", "status"):
+            value = getattr(source, attribute, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def _retry_after(exc):
+    """Retry-After 헤더(초 또는 HTTP 날짜)를 초 단위로 읽습니다."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def classify_error(exc):
+    """
+    예외를 분류합니다.
+
+    :return: (재시도 여부, 한도 초과 여부, Retry-After 초 또는 None)
+    """
+    exc = _original_error(exc)
+    name = type(exc).__name__
+    status = _status_code(exc)
+    throttled = status == 429 or name in THROTTLE_EXCEPTION_NAMES
+    retryable = throttled or status in RETRYABLE_STATUS_CODES or name in RETRYABLE_EXCEPTION_NAMES
+    return retryable, throttled, _retry_after(exc)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider):
+    """제공자별 제한기 (프로세스당 하나). 한도는 config.RATE_LIMITS에서 읽습니다."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            if provider not in RATE_LIMITS:
+                raise ValueError(f"알 수 없는 API 제공자입니다: {provider}")
+            _limiters[provider] = ProviderLimiter(provider, **RATE_LIMITS[provider])
+        return _limiters[provider]
+
+
+def call(provider, func, *args, tokens=0, **kwargs):
+    """제공자의 한도에 맞춰 외부 API를 호출합니다."""
+    return get_limiter(provider).call(func, *args, tokens=tokens, **kwargs)
+
+
+def get_metrics():
+    """제공자별 요청/한도 초과/재시도/대기 시간 등의 지표"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
@@ -0,0 +1,145 @@
+import logging
+
+import numpy as np
+
+from config import RETRIEVAL_CANDIDATES, CONTEXT_TOKEN_BUDGET
+from modules import chunking, database, embedding, lexical_index, vector_index
+
+logger = logging.getLogger(__name__)
+
+# Reciprocal Rank Fusion 상수 (순위 차이가 점수에 미치는 영향을 완화)
+RRF_K = 60
+
+
+def _vector_hits(query, video_ids, user_id, k, query_vector=None):
+    """질의 임베딩과 가까운 패시지를 찾습니다. 사용자 인덱스가 모든 비디오를 포함하면 FAISS를 사용합니다."""
+    if query_vector is None:
+        query_vector = embedding.embed_texts([query])[0]
+
+    if user_id is not None:
+        library_key = vector_index.user_library_key(user_id)
+        if all(vector_index.has_video(library_key, video_id) for video_id in video_ids):
+            return vector_index.search(library_key, query_vector, k=k, video_ids=video_ids)
+
+    # 인덱스에 없는 비디오가 있으면 DB의 청크 임베딩으로 직접 계산
+    chunks = database.get_video_chunks(video_ids, with_embeddings=True)
+    if not chunks:
+        return []
+    vectors = np.asarray([chunk["embedding"] for chunk in chunks], dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    scores = vectors @ (query_vector / max(np.linalg.norm(query_vector), 1e-12))
+    top = np.argsort(-scores)[:k]
+    return [
+        {"video_id": chunks[i]["video_id"], "chunk_index": chunks[i]["chunk_index"], "score": float(scores[i])}
+        for i in top
+    ]
+
+
+def _load_passages(chunk_keys):
+    """(video_id, chunk_index)에 해당하는 패시지 본문과 위치 정보를 불러옵니다."""
+    passages = {(chunk["video_id"], chunk["chunk_index"]): chunk for chunk in database.get_chunks_by_keys(chunk_keys)}
+
+    # 청크 저장 이전에 처리된 비디오는 트랜스크립트를 같은 설정으로 다시 나눔
+    missing_videos = sorted({video_id for video_id, chunk_index in chunk_keys} - {key[0] for key in passages})
+    transcripts = database.get_transcripts(missing_videos) if missing_videos else {}
+    for video_id, transcript in transcripts.items():
+        for chunk_index, chunk in enumerate(chunking.split_passages(transcript)):
+            passages[(video_id, chunk_index)] = dict(chunk, video_id=video_id, chunk_index=chunk_index)
+    return passages
+
+
+def retrieve_passages(query, video_ids, user_id=None, k=RETRIEVAL_CANDIDATES, query_vector=None):
+    """
+    어휘(BM25)와 벡터 검색 결과를 Reciprocal Rank Fusion으로 합쳐 관련 패시지를 고릅니다.
+
+    :param query: 질문
+    :param video_ids: 검색 대상 비디오 ID 목록
+    :param user_id: 지정하면 사용자 라이브러리의 벡터 인덱스를 사용
+    :param k: 각 검색에서 가져올 후보 수
+    :param query_vector: 미리 계산한 질의 임베딩 (없으면 새로 임베딩)
+    :return: 점수 내림차순의 패시지 목록 (video_id, chunk_index, text, token_count, char_start, char_end, score)
+    """
+    if not video_ids:
+        return []
+
+    ranked_lists = [lexical_index.get_index(video_ids).search(query, k=k)]
+    try:
+        ranked_lists.append(_vector_hits(query, video_ids, user_id, k, query_vector))
+    except Exception as e:
+        # 임베딩 API 오류 등으로 벡터 검색이 불가능하면 어휘 검색 결과만 사용
+        logger.warning(f"벡터 검색 중 오류 발생, 어휘 검색 결과만 사용합니다: {str(e)}")
+
+    fused = {}
+    for hits in ranked_lists:
+        for rank, hit in enumerate(hits):
+            key = (hit["video_id"], hit["chunk_index"])
+            fused[key] = fused.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+    passages = _load_passages(list(fused))
+    results = []
+    for key, score in sorted(fused.items(), key=lambda item: item[1], reverse=True):
+        passage = passages.get(key)
+        if passage is None:
+            continue
+        results.append({
+            "video_id": key[0],
+            "chunk_index": key[1],
+            "text": passage["text"],
+            "token_count": passage["token_count"],
+            "char_start": passage["char_start"],
+            "char_end": passage["char_end"],
+            "score": score,
+        })
+    return results
+
+
+def _overlap_ratio(a, b):
+    overlap = min(a["char_end"], b["char_end"]) - max(a["char_start"], b["char_start"])
+    shorter = min(a["char_end"] - a["char_start"], b["char_end"] - b["char_start"])
+    return overlap / shorter if shorter > 0 else 0.0
+
+
+def pack_context(passages, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    점수가 높은 패시지부터 토큰 예산 안에서 선택하고, 같은 비디오에서 겹치는 패시지는 하나로 합칩니다.
+
+    선택 단계에서는 인제스트 시 계산된 패시지 토큰 수를 그대로 사용합니다.
+    :return: 비디오와 위치 순으로 정렬된 패시지 목록
+    """
+    selected = []
+    used_tokens = 0
+    for passage in passages:
+        # 이미 고른 패시지와 절반 이상 겹치면 중복으로 보고 건너뜀
+        if any(p["video_id"] == passage["video_id"] and _overlap_ratio(p, passage) > 0.5 for p in selected):
+            continue
+        if used_tokens + passage["token_count"] > token_budget:
+            continue
+        selected.append(dict(passage))
+        used_tokens += passage["token_count"]
+
+    # 같은 비디오에서 이어지거나 겹치는 패시지는 겹친 부분을 한 번만 넣도록 병합
+    selected.sort(key=lambda p: (p["video_id"], p["char_start"]))
+    merged = []
+    for passage in selected:
+        last = merged[-1] if merged else None
+        if last and last["video_id"] == passage["video_id"] and passage["char_start"] <= last["char_end"]:
+            if passage["char_end"] > last["char_end"]:
+                last["text"] += passage["text"][last["char_end"] - passage["char_start"]:]
+                last["char_end"] = passage["char_end"]
+                # 병합된 패시지만 다시 셈 (합친 결과는 항상 두 패시지 토큰 수의 합 이하)
+                last["token_count"] = chunking.count_tokens(last["text"])
+            last["score"] = max(last["score"], passage["score"])
+            continue
+        merged.append(passage)
+    return merged
+
+
+def format_context(passages):
+    """패시지를 출처(비디오 제목, video_id, 위치)와 함께 프롬프트용 텍스트로 만듭니다."""
+    titles = database.get_video_titles(sorted({p["video_id"] for p in passages}))
+    blocks = []
+    for i, passage in enumerate(passages, start=1):
+        title = titles.get(passage["video_id"], "")
+        header = f"[출처 {i}] {title} (video_id: {passage['video_id']}, 위치: {passage['char_start']}-{passage['char_end']}자)"
+        blocks.append(f"{header}\n{passage['text']}")
+    return "\n\n".join(blocks)
@@ -0,0 +1,169 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+import isodate
+from pymongo import ReturnDocument
+
+from config import MAX_VIDEO_DURATION, SUBSCRIPTION_POLL_INTERVAL
+from modules import bulk_import, jobs, video_processing, youtube_api
+from modules.database import subscriptions_collection
+
+logger = logging.getLogger(__name__)
+
+# 업로드 재생목록 페이지당 항목 수 (playlistItems 최대값)
+PAGE_SIZE = 50
+
+
+def _parse_published_at(value):
+    """RFC 3339 시각을 Mongo에 저장하는 naive UTC datetime으로 변환합니다."""
+    return isodate.parse_datetime(value).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def resolve_channel(channel_url):
+    """채널 URL을 (채널 ID, 채널 이름, 업로드 재생목록 ID)로 변환합니다."""
+    parsed = bulk_import.parse_collection_url(channel_url)
+    if parsed is None or parsed[0] not in ("channel", "handle"):
+        raise ValueError("채널 URL(/channel/UC... 또는 /@핸들)만 구독할 수 있습니다.")
+
+    kind, value = parsed
+    params = {"part": "snippet,contentDetails"}
+    params["id" if kind == "channel" else "forHandle"] = value
+    data, _ = youtube_api.api_get("channels", params)
+    items = data.get("items", [])
+    if not items:
+        raise ValueError(f"채널을 찾을 수 없습니다: {value}")
+    channel = items[0]
+    return channel["id"], channel["snippet"]["title"], channel["contentDetails"]["relatedPlaylists"]["uploads"]
+
+
+def _fetch_uploads_page(uploads_playlist_id, etag=None, page_token=None):
+    params = {"part": "contentDetails", "playlistId": uploads_playlist_id, "maxResults": PAGE_SIZE}
+    if page_token:
+        params["pageToken"] = page_token
+    return youtube_api.api_get("playlistItems", params, etag=etag)
+
+
+def _item_published_at(item):
+    published_at = item["contentDetails"].get("videoPublishedAt")
+    # 비공개/삭제된 비디오는 게시 시각이 없음
+    return _parse_published_at(published_at) if published_at else None
+
+
+def subscribe(user_id, channel_url):
+    """
+    채널을 구독합니다. 같은 채널의 구독 문서는 하나이며 구독한 사용자는 user_ids에 추가됩니다.
+
+    처음 구독하면 현재 가장 최근 업로드 시각을 기준점(watermark)으로 삼아 이후 업로드만 처리합니다.
+    """
+    channel_id, channel_title, uploads_playlist_id = resolve_channel(channel_url)
+    existing = subscriptions_collection.find_one_and_update(
+        {"channel_id": channel_id},
+        {"$addToSet": {"user_ids": user_id}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if existing:
+        return existing
+
+    data, etag = _fetch_uploads_page(uploads_playlist_id)
+    published = [p for p in (_item_published_at(item) for item in data.get("items", [])) if p]
+    now = datetime.utcnow()
+    subscriptions_collection.update_one(
+        {"channel_id": channel_id},
+        {"$setOnInsert": {"channel_title": channel_title, "uploads_playlist_id": uploads_playlist_id,
+                          "watermark": max(published) if published else now, "etag": etag,
+                          "created_at": now, "next_poll_at": now + timedelta(seconds=SUBSCRIPTION_POLL_INTERVAL)},
+         "$addToSet": {"user_ids": user_id}},
+        upsert=True
+    )
+    return subscriptions_collection.find_one({"channel_id": channel_id})
+
+
+def unsubscribe(user_id, channel_id):
+    """구독을 해제합니다. 구독자가 없는 채널은 더 이상 확인하지 않습니다."""
+    subscriptions_collection.update_one({"channel_id": channel_id}, {"$pull": {"user_ids": user_id}})
+    subscriptions_collection.delete_one({"channel_id": channel_id, "user_ids": {"$size": 0}})
+
+
+def get_user_subscriptions(user_id):
+    return list(subscriptions_collection.find({"user_ids": user_id}).sort("channel_title", 1))
+
+
+def find_new_uploads(subscription):
+    """
+    기준점 이후에 게시된 업로드를 찾습니다.
+
+    playlistItems는 publishedAfter를 지원하지 않으므로 첫 페이지는 ETag로 조건부 요청하고(변경이 없으면 304),
+    게시 시각을 기준점과 비교해 새 항목만 고릅니다. 한 페이지가 모두 새 항목이면 다음 페이지도 확인합니다.
+    :return: (새 비디오 ID 목록(오래된 순), 새 기준점, 새 ETag). 변경이 없으면 ([], 기존 기준점, 기존 ETag)
+    """
+    watermark = subscription["watermark"]
+    data, etag = _fetch_uploads_page(subscription["uploads_playlist_id"], etag=subscription.get("etag"))
+    if data is None:
+        return [], watermark, etag
+
+    new_uploads = []
+    while True:
+        items = data.get("items", [])
+        page_new = [(published_at, item["contentDetails"]["videoId"]) for item, published_at
+                    in ((item, _item_published_at(item)) for item in items)
+                    if published_at and published_at > watermark]
+        new_uploads.extend(page_new)
+        if not data.get("nextPageToken") or len(page_new) < len(items):
+            break
+        data, _ = _fetch_uploads_page(subscription["uploads_playlist_id"], page_token=data["nextPageToken"])
+
+    new_uploads.sort()
+    new_watermark = max([watermark] + [published_at for published_at, _ in new_uploads])
+    return [video_id for _, video_id in new_uploads], new_watermark, etag
+
+
+def enqueue_uploads(video_ids, user_ids):
+    """새 업로드를 처리 작업으로 등록합니다. 길이 제한을 넘는 비디오는 건너뜁니다."""
+    metadata = youtube_api.get_videos_metadata(video_ids)
+    job_ids = []
+    for video_id in video_ids:
+        info = metadata.get(video_id)
+        if info is None or info[2] > MAX_VIDEO_DURATION:
+            continue
+        # 첫 구독자로 처리하고 나머지 구독자는 처리 후 user_ids에 추가
+        job_ids.append(jobs.submit_ingest_job(video_id, user_ids[0], video_info=info,
+                                              additional_user_ids=user_ids[1:]))
+    return job_ids
+
+
+def poll_subscription(subscription):
+    """구독 하나를 확인하고 새 업로드를 등록합니다. 등록한 작업 ID 목록을 반환합니다."""
+    video_ids, watermark, etag = find_new_uploads(subscription)
+    job_ids = enqueue_uploads(video_ids, subscription["user_ids"]) if video_ids else []
+    subscriptions_collection.update_one(
+        {"_id": subscription["_id"]},
+        {"$set": {"watermark": watermark, "etag": etag, "last_polled_at": datetime.utcnow()}}
+    )
+    if job_ids:
+        logger.info(f"채널 {subscription.get('channel_title')}: 새 업로드 {len(job_ids)}개 등록")
+    return job_ids
+
+
+def claim_due_subscription():
+    """확인할 때가 된 구독 하나를 원자적으로 가져오며 다음 확인 시각을 미룹니다. (여러 작업자 간 중복 방지)"""
+    now = datetime.utcnow()
+    return subscriptions_collection.find_one_and_update(
+        {"next_poll_at": {"$lte": now}, "user_ids.0": {"$exists": True}},
+        {"$set": {"next_poll_at": now + timedelta(seconds=SUBSCRIPTION_POLL_INTERVAL)}},
+        sort=[("next_poll_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def poll_due_subscriptions():
+    """확인할 때가 된 구독을 모두 확인하고 확인한 구독 수를 반환합니다."""
+    polled = 0
+    while True:
+        subscription = claim_due_subscription()
+        if subscription is None:
+            return polled
+        try:
+            poll_subscription(subscription)
+        except Exception as e:
+            logger.error(f"채널 구독 확인 중 오류 발생 ({subscription['channel_id']}): {str(e)}")
+        polled += 1
@@ -0,0 +1,70 @@
+import html
+import re
+import xml.etree.ElementTree as ET
+
+# WebVTT 큐 시간 줄 (예: 00:01:02.345 --> 00:01:04.000 align:start position:0%)
+VTT_TIMING_PATTERN = re.compile(r'((?:\d+:)?\d{2}:\d{2}\.\d{3})\s+-->\s+((?:\d+:)?\d{2}:\d{2}\.\d{3})')
+# 자동 자막의 단어별 타이밍 태그(<00:00:01.000>, <c>...</c>) 등 인라인 태그
+VTT_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+def _parse_vtt_timestamp(value):
+    seconds = 0.0
+    for part in value.split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_vtt(content):
+    """
+    WebVTT 자막을 start/end/text 세그먼트 목록으로 변환합니다.
+
+    자동 생성 자막은 이전 큐의 줄을 다음 큐에서 반복하므로, 직전에 나온 줄과 같은 줄은 건너뜁니다.
+    """
+    segments = []
+    last_line = None
+    for block in re.split(r'\n{2,}', content.replace('\r\n', '\n')):
+        lines = block.strip().split('\n')
+        timing_index = next((i for i, line in enumerate(lines) if VTT_TIMING_PATTERN.search(line)), None)
+        if timing_index is None:
+            continue
+        match = VTT_TIMING_PATTERN.search(lines[timing_index])
+        texts = []
+        for line in lines[timing_index + 1:]:
+            text = html.unescape(VTT_TAG_PATTERN.sub('', line)).strip()
+            if not text or text == last_line:
+                continue
+            texts.append(text)
+            last_line = text
+        if texts:
+            segments.append({
+                "start": _parse_vtt_timestamp(match.group(1)),
+                "end": _parse_vtt_timestamp(match.group(2)),
+                "text": ' '.join(texts),
+            })
+    return segments
+
+
+def parse_srv3(content):
+    """YouTube SRV3(timedtext XML) 자막을 start/end/text 세그먼트 목록으로 변환합니다."""
+    root = ET.fromstring(content)
+    segments = []
+    for p in root.iter('p'):
+        text = ' '.join(''.join(p.itertext()).split())
+        if not text:
+            continue
+        start = int(p.get('t', 0)) / 1000
+        segments.append({"start": start, "end": start + int(p.get('d', 0)) / 1000, "text": text})
+    return segments
+
+
+# yt-dlp 자막 형식별 파서 (앞에 있을수록 선호)
+PARSERS = {
+    "srv3": parse_srv3,
+    "vtt": parse_vtt,
+}
+
+
+def segments_to_text(segments):
+    """세그먼트 텍스트를 하나의 트랜스크립트로 합칩니다."""
+    return ' '.join(segment["text"] for segment in segments)
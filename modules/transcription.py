@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from config import AUDIO_SEGMENT_SECONDS, AUDIO_SEGMENT_OVERLAP_SECONDS, \
+    TRANSCRIPTION_MAX_WORKERS
+from modules import clients, rate_limit
+
+# OpenAI 클라이언트 (프로세스 공유, 재시도는 rate_limit에서 처리)
+client = clients.get_openai_client()
+
+logger = logging.getLogger(__name__)
+
+WHISPER_MODEL = "whisper-1"
+
+# 음성 인식에 충분한 모노 16kHz 저비트레이트 Opus (30분 ≈ 5MB, Whisper 업로드 제한 25MB)
+TRANSCODE_ARGS = ["-vn", "-ac", "1", "-ar", "16000", "-c:a", "libopus", "-b:a", "24k", "-application", "voip"]
+AUDIO_EXTENSION = ".ogg"
+
+
+def _run_ffmpeg(args):
+    """ffmpeg을 실행하고 실패하면 ValueError를 발생시킵니다."""
+    try:
+        subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"] + args,
+                       check=True, capture_output=True, text=True)
+    except FileNotFoundError:
+        raise ValueError("오디오 변환에 필요한 ffmpeg을 찾을 수 없습니다.")
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"오디오 변환 중 오류 발생: {e.stderr.strip()}")
+
+
+def probe_duration(file_path):
+    """ffprobe로 오디오 길이(초)를 구합니다."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", file_path],
+            check=True, capture_output=True, text=True
+        )
+        return float(json.loads(result.stdout)["format"]["duration"])
+    except (FileNotFoundError, subprocess.CalledProcessError, KeyError, ValueError) as e:
+        raise ValueError(f"오디오 길이를 확인할 수 없습니다: {str(e)}")
+
+
+def transcode_audio(source_path, output_path):
+    """원본 오디오를 모노 저비트레이트 Opus로 변환합니다."""
+    _run_ffmpeg(["-i", source_path] + TRANSCODE_ARGS + [output_path])
+    return output_path
+
+
+def plan_windows(duration, window=AUDIO_SEGMENT_SECONDS, overlap=AUDIO_SEGMENT_OVERLAP_SECONDS):
+    """
+    오디오를 고정 길이 구간으로 나눕니다. 이웃한 구간은 overlap초 겹쳐 경계에서 잘린 단어를 보완합니다.
+
+    :return: (시작, 끝) 초 단위 구간 목록
+    """
+    if window <= overlap:
+        raise ValueError("구간 길이는 겹치는 길이보다 길어야 합니다.")
+    windows = []
+    start = 0.0
+    while start < duration:
+        end = min(start + window, duration)
+        windows.append((start, end))
+        if end >= duration:
+            break
+        start = end - overlap
+    return windows
+
+
+def split_audio(audio_path, windows, output_dir):
+    """변환된 오디오를 재인코딩 없이 구간별 파일로 자릅니다."""
+    paths = []
+    for i, (start, end) in enumerate(windows):
+        segment_path = os.path.join(output_dir, f"segment_{i:03d}{AUDIO_EXTENSION}")
+        _run_ffmpeg(["-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", audio_path, "-c", "copy", segment_path])
+        paths.append(segment_path)
+    return paths
+
+
+def _request_transcription(segment_path):
+    # 재시도 시 파일을 처음부터 다시 보내도록 요청마다 새로 엶
+    with open(segment_path, "rb") as audio_file:
+        return client.audio.transcriptions.create(
+            model=WHISPER_MODEL,
+            file=audio_file,
+            response_format="verbose_json"
+        )
+
+
+def _transcribe_segment(segment_path):
+    """한 구간을 Whisper로 변환하고 구간 내 타임스탬프가 있는 세그먼트를 반환합니다."""
+    response = rate_limit.call("openai_whisper", _request_transcription, segment_path)
+    segments = getattr(response, "segments", None) or []
+    if not segments:
+        return [{"start": 0.0, "end": 0.0, "text": response.text.strip()}] if response.text.strip() else []
+    return [
+        {"start": float(_get(segment, "start")), "end": float(_get(segment, "end")),
+         "text": _get(segment, "text").strip()}
+        for segment in segments
+    ]
+
+
+def _get(segment, key):
+    # SDK 버전에 따라 세그먼트가 객체 또는 딕셔너리로 반환됨
+    return segment[key] if isinstance(segment, dict) else getattr(segment, key)
+
+
+def stitch_segments(windows, window_segments):
+    """
+    구간별 세그먼트를 절대 시간으로 옮겨 순서대로 합칩니다.
+
+    겹치는 부분에서는 앞 구간의 세그먼트를 우선하고, 뒤 구간에서는 중간 지점이
+    이미 합친 마지막 세그먼트의 끝 이후인 세그먼트만 이어 붙입니다.
+    """
+    stitched = []
+    for (start, _), segments in zip(windows, window_segments):
+        for segment in segments:
+            segment_start, segment_end = start + segment["start"], start + segment["end"]
+            if not segment["text"]:
+                continue
+            if stitched and (segment_start + segment_end) / 2 <= stitched[-1]["end"]:
+                continue
+            stitched.append({
+                "start": round(segment_start, 2),
+                "end": round(segment_end, 2),
+                "text": segment["text"],
+            })
+    return stitched
+
+
+def transcribe_audio_file(file_path, duration=None, max_workers=TRANSCRIPTION_MAX_WORKERS):
+    """
+    오디오 파일을 압축 변환 후 구간으로 나누어 동시에 Whisper로 변환합니다.
+
+    :param file_path: 원본 오디오 파일 경로
+    :param duration: 오디오 길이(초). 없으면 ffprobe로 확인
+    :param max_workers: 동시에 보낼 최대 Whisper 요청 수
+    :return: (전체 텍스트, start/end/text 키를 가진 세그먼트 목록)
+    """
+    work_dir = tempfile.mkdtemp(prefix="transcription_")
+    try:
+        compact_path = transcode_audio(file_path, os.path.join(work_dir, "audio" + AUDIO_EXTENSION))
+        if duration is None:
+            duration = probe_duration(compact_path)
+        windows = plan_windows(duration)
+        segment_paths = split_audio(compact_path, windows, work_dir)
+        logger.info(f"오디오 변환 요청: {duration:.0f}초, 구간 {len(windows)}개")
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(segment_paths)))) as executor:
+            window_segments = list(executor.map(_transcribe_segment, segment_paths))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    segments = stitch_segments(windows, window_segments)
+    return " ".join(segment["text"] for segment in segments), segments
@@ -1,5 +1,6 @@
 import streamlit as st
-from modules import auth, video_processing, database, nlp
+from config import MAX_VIDEO_DURATION
+from modules import auth, video_processing, data_cache, database, nlp
 import time
 import logging
 import os
@@ -125,7 +126,7 @@ def show_login_form():
 
 def show_video_processing_form():
     st.header("새 YouTube 영상 처리")
-    st.warning(f"주의: 현재 {video_processing.MAX_VIDEO_DURATION // 60}분 이하의 영상만 처리 가능합니다.")
+    st.warning(f"주의: 현재 {MAX_VIDEO_DURATION // 60}분 이하의 영상만 처리 가능합니다.")
 
     video_url = st.text_input("YouTube 영상 URL 입력")
     if st.button("영상 처리", key="process_video_button"):
@@ -146,7 +147,7 @@ def show_video_processing_form():
 
             if existing_video:
                 st.info(f"이 영상는 이미 처리되었습니다. 기존 데이터를 사용합니다.")
-                video_processing.update_user_for_video(existing_video['_id'], user_id)
+                video_processing.update_user_for_video(existing_video['video_id'], user_id)
                 video_id = existing_video['_id']
             else:
                 progress_bar = st.progress(0, text="영상 처리 중... 🏃")
@@ -203,7 +204,7 @@ def show_question_form():
 
 
 def show_individual_video_question(user_id):
-    user_videos = database.get_user_videos(user_id)
+    user_videos = data_cache.list_user_videos(user_id)
     if user_videos:
         video_options = {f"{v['title']} - {v['channel']}": v['video_id'] for v in user_videos}
         selected_video_title = st.selectbox("영상 선택", list(video_options.keys()), key="individual_video_selector")
@@ -214,9 +215,10 @@ def show_individual_video_question(user_id):
             if question:
                 with st.spinner("답변 생성 중..."):
                     try:
-                        video_data = database.get_video_info_from_db([selected_video_id])
-                        if video_data and 'transcript' in video_data[0]:
-                            response = nlp.generate_response(question, [video_data[0]['transcript']])
+                        transcript = database.get_transcript(selected_video_id)
+                        if transcript:
+                            response = nlp.generate_response_stream(question, [transcript],
+                                                                    [selected_video_id], user_id)
                             display_response(question, response)
                         else:
                             st.error("선택한 영상의 트랜스크립트를 찾을 수 없습니다.")
@@ -229,7 +231,7 @@ def show_individual_video_question(user_id):
 
 
 def show_tag_based_question(user_id):
-    all_tags = database.get_all_tags()
+    all_tags = data_cache.get_all_tags(user_id)
     selected_tags = st.multiselect("태그 선택", all_tags, key="tag_selector")
 
     if selected_tags:
@@ -244,10 +246,9 @@ def show_tag_based_question(user_id):
                 if question:
                     with st.spinner("답변 생성 중..."):
                         try:
-                            video_data = database.get_video_info_from_db([v['video_id'] for v in videos])
-                            if video_data:
-                                transcripts = [v['transcript'] for v in video_data if 'transcript' in v]
-                                response = nlp.generate_response(question, transcripts)
+                            video_ids = [v['video_id'] for v in videos if v.get('transcript_length', 1)]
+                            if video_ids:
+                                response = nlp.generate_response_stream(question, None, video_ids, user_id)
                                 display_response(question, response)
                             else:
                                 st.error("선택한 영상의 트랜스크립트를 찾을 수 없습니다.")
@@ -266,9 +267,13 @@ def display_response(question, response):
     st.write(question)
     st.divider()
     st.markdown("### 답변:")
-    st.write(response)
+    # 스트림이면 생성되는 대로 이어서 표시
+    if isinstance(response, str):
+        st.write(response)
+    else:
+        st.write_stream(response)
 def select_videos_by_tags(tags):
-    return database.get_videos_by_tags(tags)
+    return database.list_videos_by_tags(tags)
 
 
 def show_processed_videos():
@@ -284,7 +289,7 @@ def show_processed_videos():
     st.subheader("필터 옵션")
     col1, col2, col3 = st.columns(3)
     with col1:
-        all_tags = database.get_all_tags()
+        all_tags = data_cache.get_all_tags(user_id)
         logger.info(f"All tags: {all_tags}")
         selected_tags = st.multiselect("태그 선택", all_tags)
     with col2:
@@ -312,8 +317,8 @@ def show_processed_videos():
     logger.info(f"Date range: {start_date} to {end_date}")
 
     # 모든 영상를 가져옴 (필터 적용)
-    valid_videos = database.get_user_videos(user_id, selected_tags=selected_tags, start_date=start_date,
-                                            end_date=end_date, show_no_tags=show_no_tags)
+    valid_videos = data_cache.list_user_videos(user_id, selected_tags=selected_tags, start_date=start_date,
+                                               end_date=end_date, show_no_tags=show_no_tags)
 
     # 최신 데이터 순으로 정렬
     valid_videos = sorted(valid_videos, key=lambda x: x['updated_at'], reverse=True)
@@ -409,11 +414,12 @@ def show_chat_page():
                 if question:
                     with st.spinner("답변 생성 중..."):
                         try:
-                            response = nlp.generate_response(question, [video.get('transcript', '')])
+                            response = nlp.generate_response_stream(question, None,
+                                                                    [video['video_id']], st.session_state.user['_id'])
                             st.markdown("### 질문:")
                             st.write(question)
                             st.markdown("### 답변:")
-                            st.write(response)
+                            st.write_stream(response)
                         except Exception as e:
                             st.error(f"답변 생성 중 오류가 발생했습니다: {str(e)}")
                 else:
@@ -432,21 +438,20 @@ def show_chat_page():
 def delete_tag(video_id, tag):
     """태그 삭제 함수"""
     try:
-        database.remove_tag_from_video(video_id, tag)
-        return True
+        return database.remove_tag_from_video(video_id, tag)
     except Exception as e:
         logger.error(f"태그 삭제 중 오류 발생: {str(e)}")
         return False
 
 def get_valid_videos(user_id):
-    all_videos = database.get_user_videos(user_id)
+    all_videos = data_cache.list_user_videos(user_id)
     return [video for video in all_videos if video.get('title') and video.get('channel')]
 
 def show_full_transcript():
     st.header("영상 전체 내용보기")
     if st.session_state.selected_video_id:
         # selected_video_id를 리스트로 감싸서 전달
-        video_data = database.get_video_info_from_db([st.session_state.selected_video_id])
+        video_data = database.get_video_info_from_db([st.session_state.selected_video_id], with_transcript=True)
         if video_data and len(video_data) > 0:
             video = video_data[0]  # 첫 번째 (유일한) 결과를 사용
             st.markdown(f'<span style="font-size: 24px;">**{video.get("title", "Unknown")}**</span>', unsafe_allow_html=True)
@@ -464,7 +469,7 @@ def show_full_transcript():
         st.rerun()
 
 def update_processed_videos(user_id):
-    st.session_state.processed_videos = database.get_user_videos(user_id)
+    st.session_state.processed_videos = data_cache.list_user_videos(user_id)
 
 def show_feedback_form():
     st.header("피드백 남기기")
@@ -0,0 +1,226 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import faiss
+import numpy as np
+
+from config import VECTOR_INDEX_DIR
+from modules import database
+
+logger = logging.getLogger(__name__)
+
+# 읽기 전용으로 메모리 매핑해 둔 인덱스 캐시: library_key -> (파일 수정 시각, 인덱스, 벡터 ID 역참조, 비디오별 벡터 ID)
+_loaded_indexes = {}
+_lock = threading.Lock()
+
+
+def user_library_key(user_id):
+    """
+    사용자 라이브러리의 인덱스 키
+
+    태그로 고른 비디오에 대한 질문도 이 인덱스를 search(video_ids=...)로 좁혀 검색하므로 태그별 인덱스는 따로 두지 않습니다.
+    """
+    return f"user_{user_id}"
+
+
+def _paths(library_key):
+    base = os.path.join(VECTOR_INDEX_DIR, library_key)
+    return base + ".faiss", base + ".json", base + ".lock"
+
+
+def _vector_id(video_id, chunk_index):
+    """(video_id, chunk_index)에 대한 고정 64비트 벡터 ID"""
+    digest = hashlib.blake2b(f"{video_id}:{chunk_index}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') & 0x7FFFFFFFFFFFFFFF
+
+
+@contextmanager
+def _file_lock(library_key):
+    """같은 라이브러리를 갱신하는 여러 프로세스 사이의 쓰기 잠금"""
+    os.makedirs(VECTOR_INDEX_DIR, exist_ok=True)
+    with open(_paths(library_key)[2], 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _normalize(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _read_for_update(library_key, dim=None):
+    """갱신용으로 인덱스와 비디오별 벡터 ID 목록을 메모리로 읽습니다."""
+    index_path, meta_path, _ = _paths(library_key)
+    if os.path.exists(index_path) and os.path.exists(meta_path):
+        index = faiss.read_index(index_path)
+        with open(meta_path, encoding='utf-8') as f:
+            library_videos = json.load(f)["videos"]
+        return index, library_videos
+    if dim is None:
+        return None, {}
+    # 정규화한 벡터의 내적 = 코사인 유사도
+    return faiss.IndexIDMap2(faiss.IndexFlatIP(dim)), {}
+
+
+def _write(library_key, index, library_videos):
+    """임시 파일에 쓴 뒤 교체하여 읽는 쪽이 중간 상태를 보지 않도록 저장합니다."""
+    index_path, meta_path, _ = _paths(library_key)
+    faiss.write_index(index, index_path + ".tmp")
+    with open(meta_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"dim": index.d, "videos": library_videos}, f)
+    os.replace(meta_path + ".tmp", meta_path)
+    os.replace(index_path + ".tmp", index_path)
+    with _lock:
+        _loaded_indexes.pop(library_key, None)
+
+
+def _load_for_search(library_key):
+    """
+    검색용 인덱스를 메모리 매핑으로 불러오고, 파일이 바뀌지 않았다면 캐시를 재사용합니다.
+
+    :return: (인덱스, 벡터 ID -> (video_id, chunk_index), video_id -> 벡터 ID 목록). 인덱스가 없으면 None
+    """
+    index_path, meta_path, _ = _paths(library_key)
+    if not os.path.exists(index_path) or not os.path.exists(meta_path):
+        return None
+    mtime = os.stat(index_path).st_mtime_ns
+
+    with _lock:
+        cached = _loaded_indexes.get(library_key)
+    if cached and cached[0] == mtime:
+        return cached[1:]
+
+    index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    with open(meta_path, encoding='utf-8') as f:
+        library_videos = json.load(f)["videos"]
+    id_lookup = {
+        vector_id: (video_id, chunk_index)
+        for video_id, vector_ids in library_videos.items()
+        for chunk_index, vector_id in enumerate(vector_ids)
+    }
+
+    with _lock:
+        _loaded_indexes[library_key] = (mtime, index, id_lookup, library_videos)
+    return index, id_lookup, library_videos
+
+
+def add_video(library_key, video_id, embeddings):
+    """비디오의 청크 임베딩을 라이브러리 인덱스에 추가합니다. 이미 있으면 교체합니다."""
+    vectors = _normalize(embeddings)
+    if vectors.size == 0:
+        return
+    ids = np.asarray([_vector_id(video_id, i) for i in range(len(vectors))], dtype=np.int64)
+
+    with _file_lock(library_key):
+        index, library_videos = _read_for_update(library_key, dim=vectors.shape[1])
+        if index.d != vectors.shape[1]:
+            raise ValueError(f"임베딩 차원이 인덱스와 다릅니다. (인덱스: {index.d}, 입력: {vectors.shape[1]})")
+        if video_id in library_videos:
+            index.remove_ids(np.asarray(library_videos[video_id], dtype=np.int64))
+        index.add_with_ids(vectors, ids)
+        library_videos[video_id] = ids.tolist()
+        _write(library_key, index, library_videos)
+    logger.info(f"벡터 인덱스 {library_key}에 비디오 {video_id} 추가 ({len(ids)}개 청크)")
+
+
+def remove_video(library_key, video_id):
+    """라이브러리 인덱스에서 비디오의 청크를 제거합니다."""
+    with _file_lock(library_key):
+        index, library_videos = _read_for_update(library_key)
+        if index is None or video_id not in library_videos:
+            return False
+        index.remove_ids(np.asarray(library_videos.pop(video_id), dtype=np.int64))
+        _write(library_key, index, library_videos)
+    logger.info(f"벡터 인덱스 {library_key}에서 비디오 {video_id} 제거")
+    return True
+
+
+def has_video(library_key, video_id):
+    """라이브러리 인덱스에 비디오가 포함되어 있는지 확인합니다."""
+    loaded = _load_for_search(library_key)
+    return loaded is not None and video_id in loaded[2]
+
+
+def search(library_key, query_embedding, k=10, video_ids=None):
+    """
+    라이브러리 인덱스에서 질의와 가까운 청크를 찾습니다.
+
+    :param library_key: 검색할 라이브러리 키
+    :param query_embedding: 질의 임베딩
+    :param k: 반환할 최대 청크 수
+    :param video_ids: 지정하면 해당 비디오들의 청크만 검색 (예: 태그로 고른 비디오)
+    :return: video_id, chunk_index, score 키를 가진 딕셔너리 목록 (점수 내림차순)
+    """
+    loaded = _load_for_search(library_key)
+    if loaded is None:
+        return []
+    index, id_lookup, library_videos = loaded
+    if index.ntotal == 0:
+        return []
+
+    params = None
+    if video_ids is not None:
+        allowed = [vector_id for video_id in video_ids for vector_id in library_videos.get(video_id, [])]
+        if not allowed:
+            return []
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(np.asarray(allowed, dtype=np.int64)))
+
+    scores, ids = index.search(_normalize(query_embedding), min(k, index.ntotal), params=params)
+    results = []
+    for score, vector_id in zip(scores[0], ids[0]):
+        # -1은 결과 부족, 역참조에 없는 ID는 갱신 도중 읽은 경우
+        location = id_lookup.get(int(vector_id))
+        if location is None:
+            continue
+        results.append({"video_id": location[0], "chunk_index": location[1], "score": float(score)})
+    return results
+
+
+def add_video_to_user_library(user_id, video_id, embeddings=None):
+    """
+    사용자 라이브러리 인덱스에 비디오를 추가합니다.
+
+    임베딩이 주어지지 않으면 video_chunks 컬렉션에 저장된 청크 임베딩을 사용합니다.
+    인덱스는 DB에서 다시 만들 수 있는 파생 데이터이므로 실패해도 예외를 전파하지 않습니다.
+    """
+    try:
+        if embeddings is None:
+            chunks = database.get_video_chunks([video_id], with_embeddings=True)
+            embeddings = [chunk["embedding"] for chunk in chunks]
+        if len(embeddings) == 0:
+            return
+        add_video(user_library_key(user_id), video_id, embeddings)
+    except Exception as e:
+        logger.warning(f"벡터 인덱스 갱신 중 오류 발생 (user: {user_id}, video: {video_id}): {str(e)}")
+
+
+def rebuild_library(library_key, video_ids):
+    """DB의 청크 임베딩으로 라이브러리 인덱스를 처음부터 다시 만듭니다."""
+    chunks = database.get_video_chunks(video_ids, with_embeddings=True)
+    if not chunks:
+        return 0
+
+    vectors = _normalize([chunk["embedding"] for chunk in chunks])
+    ids = np.asarray([_vector_id(chunk["video_id"], chunk["chunk_index"]) for chunk in chunks], dtype=np.int64)
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+    index.add_with_ids(vectors, ids)
+
+    library_videos = {}
+    for chunk, vector_id in zip(chunks, ids.tolist()):
+        library_videos.setdefault(chunk["video_id"], []).append(vector_id)
+
+    with _file_lock(library_key):
+        _write(library_key, index, library_videos)
+    logger.info(f"벡터 인덱스 {library_key} 재구축 완료 (비디오 {len(library_videos)}개, 청크 {len(ids)}개)")
+    return len(ids)
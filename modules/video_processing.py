@@ -4,72 +4,60 @@ from datetime import datetime
 import re
 from urllib.parse import urlparse, parse_qs
 import requests
-import isodate
 import yt_dlp
 import time
-from config import MAX_VIDEO_DURATION, YOUTUBE_API_KEY
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config import MAX_VIDEO_DURATION, INGEST_LEASE_SECONDS, INGEST_WAIT_TIMEOUT, \
+    INGEST_POLL_INTERVAL, INGEST_LOOKUP_THREADS
 from modules.database import videos_collection
 from modules.nlp import embed_text  # transcribe_audio는 그대로 사용
-from openai import OpenAI
-import tiktoken
-from config import OPENAI_API_KEY
+from modules import answer_cache, chunking, database, embedding, lexical_index, subtitles, transcription, \
+    rate_limit, vector_index, youtube_api
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound, \
     CouldNotRetrieveTranscript
 
-# OpenAI 클라이언트 초기화
-client = OpenAI(api_key=OPENAI_API_KEY)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 인제스트 앞단의 독립적인 네트워크 조회(DB 확인, 메타데이터, 자막)를 동시에 실행하는 스레드 풀
+_lookup_executor = ThreadPoolExecutor(max_workers=INGEST_LOOKUP_THREADS, thread_name_prefix="ingest-lookup")
+
 
 def chunk_text(text, max_tokens=8000):
     """텍스트를 지정된 최대 토큰 수로 나눕니다."""
-    enc = tiktoken.encoding_for_model("text-embedding-ada-002")
-    tokens = enc.encode(text)
-    chunks = []
-    current_chunk = []
-    current_chunk_tokens = 0
+    return [chunk["text"] for chunk in chunking.split_text(text, max_tokens=max_tokens)]
 
-    for token in tokens:
-        if current_chunk_tokens + 1 > max_tokens:
-            chunks.append(enc.decode(current_chunk))
-            current_chunk = []
-            current_chunk_tokens = 0
-        current_chunk.append(token)
-        current_chunk_tokens += 1
 
-    if current_chunk:
-        chunks.append(enc.decode(current_chunk))
+def embed_text(text):
+    """텍스트를 청크로 나누고 각 청크를 임베딩한 뒤 평균 벡터를 반환합니다."""
+    chunks = chunking.split_text(text)
+    if not chunks:
+        return []
 
-    return chunks
+    vectors = embedding.embed_texts([chunk["text"] for chunk in chunks],
+                                    [chunk["token_count"] for chunk in chunks])
+    return embedding.mean_embedding(vectors).tolist()
 
 
-def embed_text(text):
-    """텍스트를 청크로 나누고 각 청크를 임베딩합니다."""
-    chunks = chunk_text(text)
-    embeddings = []
-
-    for chunk in chunks:
-        response = client.embeddings.create(input=[chunk], model="text-embedding-ada-002")
-        embeddings.append(response.data[0].embedding)
-
-    # 모든 청크의 임베딩 평균을 계산
-    if embeddings:
-        avg_embedding = [sum(x) / len(embeddings) for x in zip(*embeddings)]
-        return avg_embedding
-    else:
-        return []
+def embed_transcript_chunks(transcript):
+    """트랜스크립트를 검색용 패시지로 나누고 패시지별 임베딩을 계산합니다."""
+    chunks = chunking.split_passages(transcript)
+    if not chunks:
+        return [], []
+
+    vectors = embedding.embed_texts([chunk["text"] for chunk in chunks],
+                                    [chunk["token_count"] for chunk in chunks])
+    return chunks, vectors
 
 
 def transcribe_audio(file_path):
-    """오디오 파일을 텍스트로 변환"""
-    with open(file_path, "rb") as audio_file:
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file
-        )
-    return transcript.text
+    """오디오 파일을 텍스트로 변환 (구간별 동시 변환)"""
+    transcript, _ = transcription.transcribe_audio_file(file_path)
+    return transcript
 
 
 def extract_video_id_and_process(url):
@@ -137,22 +125,10 @@ def get_video_info(video_url):
         mobile_url, video_id = extract_video_id_and_process(video_url)
         logger.info(f"API 요청을 위한 비디오 ID: {video_id}")
 
-        url = f"https://www.googleapis.com/youtube/v3/videos?part=snippet,contentDetails&id={video_id}&key={YOUTUBE_API_KEY}"
-        logger.debug(f"YouTube API 요청 URL: {url}")
-
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-
-        if "items" in data and len(data["items"]) > 0:
-            video_data = data["items"][0]
-            title = video_data["snippet"]["title"]
-            channel = video_data["snippet"]["channelTitle"]
-            duration = parse_duration(video_data["contentDetails"]["duration"])
-            logger.info(f"비디오 정보 추출 성공 - 제목: {title}, 채널: {channel}, 길이: {duration}초")
-            return title, channel, duration
-        else:
-            raise ValueError(f"비디오를 찾을 수 없습니다. 비디오 ID: {video_id}")
+        # 캐시(메모리/Mongo)를 먼저 확인하고, 없으면 공유 세션으로 YouTube API 요청
+        title, channel, duration = youtube_api.get_video_metadata(video_id)
+        logger.info(f"비디오 정보 추출 성공 - 제목: {title}, 채널: {channel}, 길이: {duration}초")
+        return title, channel, duration
 
     except requests.exceptions.RequestException as e:
         logger.error(f"YouTube API 요청 중 오류 발생: {e}")
@@ -167,41 +143,57 @@ def get_video_info(video_url):
 
 def parse_duration(duration):
     """YouTube API의 duration 문자열을 초 단위로 변환합니다."""
-    return int(isodate.parse_duration(duration).total_seconds())
+    return youtube_api.parse_duration(duration)
 
 
-def get_video_captions(video_url, languages=['ko', 'en']):
+# 트랜스크립트 출처 (video_data의 source 필드). 앞의 세 단계는 미디어를 내려받지 않음
+SOURCE_CAPTION = "caption"  # youtube-transcript-api 자막
+SOURCE_YTDLP_SUBTITLES = "ytdlp_subtitles"  # yt-dlp 수동 자막
+SOURCE_YTDLP_AUTO_CAPTIONS = "ytdlp_auto_captions"  # yt-dlp 자동 생성 자막
+SOURCE_AUDIO = "audio_transcription"  # 오디오 다운로드 후 Whisper 변환 (최후 수단)
+
+
+def _caption_entry_value(entry, key):
+    # youtube-transcript-api 버전에 따라 자막 항목이 딕셔너리 또는 객체로 반환됨
+    return entry[key] if isinstance(entry, dict) else getattr(entry, key)
+
+
+def fetch_transcript_api_segments(video_id, languages=['ko', 'en']):
     """
-    youtube-transcript-api를 사용하여 자막을 다운로드합니다.
+    youtube-transcript-api로 자막을 가져와 start/end/text 세그먼트 목록으로 반환합니다.
 
-    :param video_url: YouTube 비디오 URL
-    :param languages: 자막 언어 코드 목록 (우선 순위에 따라 정렬)
-    :return: 자막 텍스트 또는 None
+    :return: 세그먼트 목록 또는 None
     """
     try:
-        # 비디오 ID 추출
-        _, video_id = extract_video_id_and_process(video_url)
+        def request():
+            # 자막 목록 가져오기
+            transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
 
-        # 자막 목록 가져오기
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+            # 원하는 언어의 자막 찾기
+            transcript = transcript_list.find_transcript(languages)
 
-        # 원하는 언어의 자막 찾기
-        transcript = transcript_list.find_transcript(languages)
+            # 자막 데이터 가져오기
+            return transcript.fetch()
 
-        # 자막 데이터 가져오기
-        transcript_data = transcript.fetch()
+        transcript_data = rate_limit.call("youtube_transcript", request)
 
-        # 자막을 하나의 문자열로 변환
-        transcript_text = ' '.join([entry['text'] for entry in transcript_data])
+        segments = []
+        for entry in transcript_data:
+            start = float(_caption_entry_value(entry, 'start'))
+            segments.append({
+                "start": start,
+                "end": start + float(_caption_entry_value(entry, 'duration')),
+                "text": _caption_entry_value(entry, 'text'),
+            })
 
         logger.info(f"자막 다운로드 성공: {video_id}")
-        return transcript_text
+        return segments
 
     except TranscriptsDisabled:
-        logger.warning(f"비디오 {video_url}에 자막이 비활성화되어 있습니다.")
+        logger.warning(f"비디오 {video_id}에 자막이 비활성화되어 있습니다.")
         return None
     except NoTranscriptFound:
-        logger.warning(f"비디오 {video_url}에 자막이 존재하지 않습니다.")
+        logger.warning(f"비디오 {video_id}에 자막이 존재하지 않습니다.")
         return None
     except CouldNotRetrieveTranscript as e:
         logger.error(f"자막을 가져오는 중 오류 발생: {str(e)}")
@@ -211,81 +203,320 @@ def get_video_captions(video_url, languages=['ko', 'en']):
         return None
 
 
-def process_video(video_url, user_id, progress_bar=None):
+def get_video_captions(video_url, languages=['ko', 'en']):
+    """
+    youtube-transcript-api를 사용하여 자막을 다운로드합니다.
+
+    :param video_url: YouTube 비디오 URL
+    :param languages: 자막 언어 코드 목록 (우선 순위에 따라 정렬)
+    :return: 자막 텍스트 또는 None
+    """
+    try:
+        _, video_id = extract_video_id_and_process(video_url)
+    except ValueError:
+        return None
+    segments = fetch_transcript_api_segments(video_id, languages)
+    return subtitles.segments_to_text(segments) if segments else None
+
+
+def list_ytdlp_caption_tracks(video_url):
+    """
+    yt-dlp로 미디어를 내려받지 않고 자막 트랙 목록을 가져옵니다.
+
+    :return: (수동 자막, 자동 생성 자막) 딕셔너리. 각각 {언어: [{ext, url, ...}]} 형태
+    """
+    ydl_opts = {
+        'skip_download': True,
+        'writesubtitles': True,
+        'writeautomaticsub': True,
+        'noplaylist': True,
+        'quiet': True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = rate_limit.call("ytdlp", ydl.extract_info, video_url, download=False)
+    return info.get('subtitles') or {}, info.get('automatic_captions') or {}
+
+
+def _select_caption_track(tracks, languages):
+    """선호 언어 순서와 파싱 가능한 형식(srv3 우선) 순서로 자막 트랙을 고릅니다."""
+    for language in languages:
+        # 자동 자막은 'en', 'en-orig'처럼 원본/지역 코드가 붙기도 하므로 접두어로 찾음
+        candidates = [key for key in tracks if key == language or key.startswith(f"{language}-")]
+        for key in sorted(candidates, key=lambda k: (k != language, k)):
+            formats = {track.get('ext'): track for track in tracks[key] if track.get('url')}
+            for ext in subtitles.PARSERS:
+                if ext in formats:
+                    return ext, formats[ext]['url']
+    return None
+
+
+def _download_caption(url):
+    # 429/5xx는 HTTPError로 올려 rate_limit이 재시도하도록 함
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    return response
+
+
+def fetch_ytdlp_caption_segments(tracks, languages=['ko', 'en']):
+    """선택한 yt-dlp 자막 트랙을 내려받아 세그먼트 목록으로 변환합니다. 실패하면 None"""
+    selected = _select_caption_track(tracks, languages)
+    if selected is None:
+        return None
+    ext, url = selected
+    try:
+        response = rate_limit.call("ytdlp", _download_caption, url)
+        return subtitles.PARSERS[ext](response.text) or None
+    except Exception as e:
+        logger.error(f"yt-dlp 자막 다운로드 중 오류 발생: {str(e)}")
+        return None
+
+
+def get_caption_transcript(video_url, video_id, languages=['ko', 'en'], cancel_event=None):
+    """
+    미디어를 내려받지 않는 자막 출처를 비용이 낮은 순서대로 시도합니다.
+
+    youtube-transcript-api → yt-dlp 수동 자막 → yt-dlp 자동 생성 자막
+    :param cancel_event: 설정되면 다음 단계로 넘어가지 않고 중단 (threading.Event)
+    :return: (트랜스크립트, 세그먼트 목록, 출처). 모두 실패하거나 취소되면 (None, None, None)
+    """
+    segments = fetch_transcript_api_segments(video_id, languages)
+    if segments:
+        return subtitles.segments_to_text(segments), segments, SOURCE_CAPTION
+
+    if cancel_event is not None and cancel_event.is_set():
+        return None, None, None
     try:
-        # URL인지 비디오 ID인지 확인
-        if 'youtube.com' in video_url or 'youtu.be' in video_url:
-            # URL 정규화 및 비디오 ID 추출
-            normalized_url, video_id = extract_video_id_and_process(video_url)
-        else:
-            # 입력이 이미 비디오 ID인 경우
-            video_id = video_url
-            normalized_url = f"https://www.youtube.com/watch?v={video_id}"
+        manual_tracks, automatic_tracks = list_ytdlp_caption_tracks(video_url)
+    except Exception as e:
+        logger.error(f"yt-dlp 자막 목록 조회 중 오류 발생: {str(e)}")
+        return None, None, None
 
+    for source, tracks in ((SOURCE_YTDLP_SUBTITLES, manual_tracks), (SOURCE_YTDLP_AUTO_CAPTIONS, automatic_tracks)):
+        if cancel_event is not None and cancel_event.is_set():
+            return None, None, None
+        segments = fetch_ytdlp_caption_segments(tracks, languages)
+        if segments:
+            logger.info(f"yt-dlp 자막 다운로드 성공 ({source}): {video_id}")
+            return subtitles.segments_to_text(segments), segments, source
+
+    return None, None, None
+
+
+class CaptionPrefetch:
+    """자막 조회를 미리 시작해 두고, 필요 없어지면 남은 단계를 건너뛰도록 취소합니다."""
+
+    def __init__(self, video_url, video_id, languages=['ko', 'en']):
+        self.cancel_event = threading.Event()
+        self.future = _lookup_executor.submit(get_caption_transcript, video_url, video_id, languages,
+                                              self.cancel_event)
+
+    def result(self):
+        return self.future.result()
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.future.cancel()
+
+
+def normalize_video_input(video_url):
+    """URL 또는 비디오 ID 입력을 (정규화된 URL, 비디오 ID)로 변환합니다."""
+    # URL인지 비디오 ID인지 확인
+    if 'youtube.com' in video_url or 'youtu.be' in video_url:
+        # URL 정규화 및 비디오 ID 추출
+        return extract_video_id_and_process(video_url)
+    # 입력이 이미 비디오 ID인 경우
+    return f"https://www.youtube.com/watch?v={video_url}", video_url
+
+
+def lookup_video(video_url):
+    """
+    기존 처리 여부와 비디오 정보를 동시에 조회합니다.
+
+    :return: (비디오 ID, 기존 비디오 문서 또는 None, (제목, 채널, 길이))
+    """
+    normalized_url, video_id = normalize_video_input(video_url)
+    existing_future = _lookup_executor.submit(get_existing_video, video_id)
+    video_info = get_video_info(normalized_url)
+    return video_id, existing_future.result(), video_info
+
+
+def process_video(video_url, user_id, progress_bar=None, video_info=None):
+    """
+    비디오를 처리하여 DB에 저장하고 비디오 문서의 _id를 반환합니다.
+
+    :param video_info: 이미 조회한 (제목, 채널, 길이). 주어지면 YouTube API를 다시 호출하지 않음
+    """
+    captions = None
+    try:
+        normalized_url, video_id = normalize_video_input(video_url)
         logger.info(f"처리할 비디오 ID: {video_id}")
 
+        # 기존 비디오 확인, 비디오 정보, 자막 조회를 동시에 시작
+        existing_future = _lookup_executor.submit(get_existing_video, video_id)
+        info_future = _lookup_executor.submit(get_video_info, normalized_url) if video_info is None else None
+        captions = CaptionPrefetch(normalized_url, video_id)
+
         # 기존 처리된 비디오 확인
-        existing_video = get_existing_video(video_id)
+        existing_video = existing_future.result()
         if existing_video:
             logger.info(f"비디오 ID {video_id}는 이미 처리되었습니다. 기존 데이터를 사용합니다.")
-            update_user_for_video(existing_video['_id'], user_id)
+            captions.cancel()
+            update_user_for_video(existing_video['video_id'], user_id)
             return existing_video['_id']
 
         # 새 비디오 처리 로직
-        title, channel, duration = get_video_info(normalized_url)
+        title, channel, duration = video_info if video_info is not None else info_future.result()
 
         if duration > MAX_VIDEO_DURATION:
             raise ValueError(f"비디오 길이가 {MAX_VIDEO_DURATION // 60}분을 초과합니다.")
 
-        # 자막 데이터 가져오기 시도 (youtube-transcript-api 사용)
-        caption_text = get_video_captions(video_url, languages=['ko', 'en'])
-        if progress_bar:
-            if caption_text:
-                progress_bar.progress(20, text="자막 다운로드 성공! 🥳")
-            else:
-                progress_bar.progress(20, text="자막 다운로드 실패 😔 오디오 변환 시도 중...")
+        # 같은 비디오를 동시에 처리하지 않도록 선점. 이미 다른 요청이 처리 중이면 그 결과를 기다림
+        owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        finished_video = claim_or_wait(video_id, user_id, owner, progress_bar)
+        if finished_video is not None:
+            captions.cancel()
+            return finished_video['_id']
+    except Exception as e:
+        logger.error(f"비디오 처리 중 오류 발생: {str(e)}")
+        if captions is not None:
+            captions.cancel()
+        raise
+
+    try:
+        return _ingest_claimed_video(video_id, normalized_url, user_id, owner,
+                                     title, channel, duration, captions, progress_bar)
+    except Exception as e:
+        logger.error(f"비디오 처리 중 오류 발생: {str(e)}")
+        database.release_video_claim(video_id, owner)
+        raise
 
+
+def _heartbeat(progress_bar):
+    """작업(jobs.JobProgress)으로 실행 중이면 진행 상황 변화 없이 기다리는 동안에도 작업이 살아 있음을 기록"""
+    if hasattr(progress_bar, "heartbeat"):
+        progress_bar.heartbeat()
+
+
+def claim_or_wait(video_id, user_id, owner, progress_bar=None):
+    """
+    비디오 처리를 선점하거나, 다른 요청이 처리 중이면 사용자를 추가한 뒤 완료될 때까지 기다립니다.
+
+    :return: 선점에 성공하면 None, 이미 처리된(또는 기다리는 동안 처리가 끝난) 비디오면 해당 문서
+    """
+    deadline = time.monotonic() + INGEST_WAIT_TIMEOUT
+    while True:
+        claimed, video, newly_added = database.claim_video_ingest(video_id, user_id, owner, INGEST_LEASE_SECONDS)
+        if claimed:
+            return None
+
+        if video is not None and video.get("status") != database.VIDEO_STATUS_PROCESSING:
+            if newly_added:
+                vector_index.add_video_to_user_library(user_id, video_id)
+                database.add_video_to_user_facets([user_id], video)
+            return video
+
+        # 다른 요청이 처리 중: 완료되면 그 요청이 추가된 사용자들의 라이브러리에도 반영함
+        if video is not None:
+            logger.info(f"비디오 ID {video_id}는 다른 요청에서 처리 중입니다. 완료를 기다립니다.")
+            if progress_bar:
+                progress_bar.progress(10, text="같은 영상을 처리 중인 요청이 있어 완료를 기다리는 중... ⏳")
+        while video is not None and video.get("status") == database.VIDEO_STATUS_PROCESSING:
+            if time.monotonic() > deadline:
+                raise ValueError(f"비디오 {video_id}의 처리가 끝나기를 기다리는 중 시간이 초과되었습니다.")
+            if video["lease_expires_at"] < datetime.utcnow():
+                # 처리하던 요청이 중단된 것으로 보고 다시 선점 시도
+                break
+            time.sleep(INGEST_POLL_INTERVAL)
+            _heartbeat(progress_bar)
+            video = videos_collection.find_one({"video_id": video_id})
+
+        if video is not None and video.get("status") != database.VIDEO_STATUS_PROCESSING:
+            return video
+        # 처리 실패로 자리 표시 문서가 지워졌거나 선점이 만료되었으면 잠시 뒤 다시 선점 시도
+        # (선점과 조회 사이에 문서가 지워진 경우에도 바로 반복해 DB를 두드리지 않도록 매번 기다림)
+        if time.monotonic() > deadline:
+            raise ValueError(f"비디오 {video_id}의 처리가 끝나기를 기다리는 중 시간이 초과되었습니다.")
+        time.sleep(INGEST_POLL_INTERVAL)
+        _heartbeat(progress_bar)
+
+
+def _renew_lease(video_id, owner):
+    """오래 걸리는 단계 전에 선점 기한을 연장합니다. 선점을 잃었으면 중단합니다."""
+    if not database.renew_video_lease(video_id, owner, INGEST_LEASE_SECONDS):
+        raise ValueError(f"비디오 {video_id}의 처리 선점을 잃어 처리를 중단합니다.")
+
+
+def _ingest_claimed_video(video_id, normalized_url, user_id, owner, title, channel, duration, captions,
+                          progress_bar=None):
+    """선점한 비디오의 자막/오디오 변환, 임베딩, 저장을 수행합니다."""
+    # 미리 시작한 자막 조회 결과 (youtube-transcript-api, yt-dlp 수동/자동 자막 순)
+    caption_text, caption_segments, source = captions.result()
+    if progress_bar:
         if caption_text:
-            logger.info("자막 데이터를 성공적으로 가져왔습니다.")
-            transcript = caption_text
+            progress_bar.progress(20, text="자막 다운로드 성공! 🥳")
         else:
-            logger.info("자막을 가져올 수 없어 오디오 변환을 시도합니다.")
-            if progress_bar:
-                progress_bar.progress(30, text="영상 다운로드 중... 🌎")
-            audio_file = download_and_process_audio(normalized_url, video_id)
-            if progress_bar:
-                progress_bar.progress(45, text="영상을 텍스트로 변환 중... 💬")
-            transcript = transcribe_audio(audio_file)
-            os.remove(audio_file)
+            progress_bar.progress(20, text="자막 다운로드 실패 😔 오디오 변환 시도 중...")
 
+    if caption_text:
+        logger.info("자막 데이터를 성공적으로 가져왔습니다.")
+        transcript = caption_text
+        transcript_segments = caption_segments
+    else:
+        logger.info("자막을 가져올 수 없어 오디오 변환을 시도합니다.")
         if progress_bar:
-            progress_bar.progress(90, text="텍스트 임베딩 중... 🤖")
-        embedding = embed_text(transcript)
-
-        video_data = {
-            "video_id": video_id,
-            "user_ids": [user_id],
-            "title": title,
-            "channel": channel,
-            "duration": duration,
-            "transcript": transcript,
-            "embedding": embedding,
-            "source": "caption" if caption_text else "audio_transcription",
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow(),
-            "processed_at": datetime.utcnow(),
-            "transcript_length": len(transcript),
-            "tags": []  # 새로운 필드: 태그 (빈 리스트로 초기화)
-        }
-
+            progress_bar.progress(30, text="영상 다운로드 중... 🌎")
+        audio_file = download_and_process_audio(normalized_url, video_id)
         if progress_bar:
-            progress_bar.progress(100, text="DB 저장 완료! ✅")  # 진행률 100%로 설정
-        result = videos_collection.insert_one(video_data)
-        return result.inserted_id
+            progress_bar.progress(45, text="영상을 텍스트로 변환 중... 💬")
+        _renew_lease(video_id, owner)
+        source = SOURCE_AUDIO
+        try:
+            transcript, transcript_segments = transcription.transcribe_audio_file(audio_file, duration)
+        finally:
+            os.remove(audio_file)
 
-    except Exception as e:
-        logger.error(f"비디오 처리 중 오류 발생: {str(e)}")
-        raise
+    if progress_bar:
+        progress_bar.progress(90, text="텍스트 임베딩 중... 🤖")
+    _renew_lease(video_id, owner)
+    chunks, chunk_vectors = embed_transcript_chunks(transcript)
+    video_embedding = embedding.mean_embedding(chunk_vectors)
+
+    video_data = {
+        "video_id": video_id,
+        "user_ids": [user_id],
+        "title": title,
+        "channel": channel,
+        "duration": duration,
+        **database.encode_embedding(video_embedding),
+        "source": source,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+        "processed_at": datetime.utcnow(),
+        "transcript_length": len(transcript),
+        "chunk_count": len(chunks),
+        "tags": []  # 새로운 필드: 태그 (빈 리스트로 초기화)
+    }
+
+    # 트랜스크립트와 구간별 타임스탬프(start/end/text)는 압축하여 별도 컬렉션에 저장
+    database.save_transcript(video_id, transcript, transcript_segments)
+    # 같은 video_id로 이전에 만든 어휘 인덱스와 트랜스크립트 기반 답변은 더 이상 유효하지 않음
+    lexical_index.invalidate_video(video_id)
+    answer_cache.cache.invalidate_video(video_id)
+    # 패시지 단위 임베딩은 별도 컬렉션에 한 번에 저장 (재시도 시 남은 청크는 먼저 정리)
+    database.delete_video_chunks(video_id)
+    database.insert_video_chunks(video_id, chunks, chunk_vectors)
+    lexical_index.build_video_index(video_id, chunks)
+
+    if progress_bar:
+        progress_bar.progress(100, text="DB 저장 완료! ✅")  # 진행률 100%로 설정
+    saved_video = database.complete_video_ingest(video_id, owner, video_data)
+    if saved_video is None:
+        raise ValueError(f"비디오 {video_id}의 처리 선점이 만료되어 결과를 저장하지 못했습니다.")
+    # 처리 중에 대기하며 추가된 사용자들의 라이브러리 인덱스와 태그/채널 수에도 반영
+    for library_user_id in saved_video.get("user_ids", []):
+        vector_index.add_video_to_user_library(library_user_id, video_id, chunk_vectors)
+    database.add_video_to_user_facets(saved_video.get("user_ids", []), saved_video)
+    return saved_video["_id"]
 
 
 def download_and_process_audio(url, video_id):
@@ -302,7 +533,7 @@ def download_and_process_audio(url, video_id):
         }
 
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
+            info = rate_limit.call("ytdlp", ydl.extract_info, url, download=True)
             filename = ydl.prepare_filename(info)
 
         return filename
@@ -314,15 +545,22 @@ def download_and_process_audio(url, video_id):
 
 
 def update_user_for_video(video_id, user_id):
-    videos_collection.update_one(
-        {"video_id": video_id},
-        {"$addToSet": {"user_ids": user_id}}
+    """기존 비디오에 사용자를 추가하고, 새로 추가된 경우 사용자 라이브러리 인덱스와 태그/채널 수에도 반영합니다."""
+    video = videos_collection.find_one_and_update(
+        {"video_id": video_id, "user_ids": {"$ne": user_id}},
+        {"$addToSet": {"user_ids": user_id}},
+        projection={"channel": 1, "tags": 1, "status": 1}
     )
+    if video is not None:
+        vector_index.add_video_to_user_library(user_id, video_id)
+        # 처리 중인 비디오는 완료될 때 추가된 사용자 모두에게 반영됨
+        if video.get("status") != database.VIDEO_STATUS_PROCESSING:
+            database.add_video_to_user_facets([user_id], video)
 
 
 def get_existing_video(video_id):
     """데이터베이스에서 기존 처리된 비디오를 찾습니다."""
-    return videos_collection.find_one({"video_id": video_id})
+    return database.get_existing_video(video_id)
 
 
 def format_time(seconds):
@@ -0,0 +1,150 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+
+import isodate
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import YOUTUBE_API_KEY, YOUTUBE_API_BASE_URL, VIDEO_METADATA_TTL
+from modules import cache, rate_limit
+from modules.database import video_metadata_collection
+
+logger = logging.getLogger(__name__)
+
+# videos.list 요청당 최대 ID 수
+MAX_IDS_PER_REQUEST = 50
+
+# 연결을 재사용하는 HTTP 세션 (프로세스당 하나, 동시 요청 수만큼 연결 풀 유지)
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# 공유 캐시(modules.cache) 키: video_id -> [제목, 채널, 길이]
+METADATA_CACHE_KEY = "video_metadata:{}"
+
+
+def parse_duration(duration):
+    """YouTube API의 duration 문자열을 초 단위로 변환합니다."""
+    return int(isodate.parse_duration(duration).total_seconds())
+
+
+def api_get(resource, params, etag=None, timeout=10):
+    """
+    YouTube Data API GET 요청을 보냅니다.
+
+    :param resource: 리소스 경로 (예: "videos", "playlistItems")
+    :param etag: 이전 응답의 ETag. 주어지면 If-None-Match로 보내 변경이 없으면 본문 없이 304를 받음
+    :return: (응답 JSON 또는 변경이 없으면 None, 응답 ETag)
+    """
+    headers = {"If-None-Match": etag} if etag else {}
+
+    def request():
+        response = session.get(f"{YOUTUBE_API_BASE_URL}/{resource}", params=dict(params, key=YOUTUBE_API_KEY),
+                               headers=headers, timeout=timeout)
+        if response.status_code != 304:
+            # 429/5xx는 rate_limit에서 백오프 후 재시도
+            response.raise_for_status()
+        return response
+
+    response = rate_limit.call("youtube_data", request)
+    if response.status_code == 304:
+        return None, etag
+    data = response.json()
+    return data, response.headers.get("ETag") or data.get("etag")
+
+
+def _batch_key(video_ids):
+    """같은 ID 묶음으로 다시 요청할 때만 ETag를 재사용하기 위한 키"""
+    return hashlib.sha1(",".join(sorted(video_ids)).encode("utf-8")).hexdigest()
+
+
+def _remember(metadata_by_id, ttl):
+    store = cache.get_cache()
+    for video_id, metadata in metadata_by_id.items():
+        store.set(METADATA_CACHE_KEY.format(video_id), list(metadata), ttl)
+
+
+def _fetch_batch(video_ids, stale_docs, ttl):
+    """최대 50개 ID를 한 번의 videos.list 요청으로 조회하고 Mongo 캐시를 갱신합니다."""
+    batch_key = _batch_key(video_ids)
+    # 같은 ID 묶음의 이전 응답이 모두 남아 있으면 조건부 요청
+    etags = {doc.get("etag") for doc in stale_docs.values() if doc.get("batch_key") == batch_key}
+    etag = etags.pop() if len(stale_docs) == len(video_ids) and len(etags) == 1 else None
+
+    data, response_etag = api_get("videos", {"part": "snippet,contentDetails", "id": ",".join(video_ids),
+                                             "maxResults": MAX_IDS_PER_REQUEST}, etag=etag)
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+
+    if data is None:
+        # 304: 변경 없음. 저장된 값의 만료 시각만 연장
+        video_metadata_collection.update_many({"_id": {"$in": video_ids}},
+                                              {"$set": {"expires_at": expires_at, "fetched_at": now}})
+        logger.info(f"비디오 정보 변경 없음 (304): {len(video_ids)}개")
+        return {video_id: (doc["title"], doc["channel"], doc["duration"]) for video_id, doc in stale_docs.items()}
+
+    results = {}
+    for item in data.get("items", []):
+        metadata = (item["snippet"]["title"], item["snippet"]["channelTitle"],
+                    parse_duration(item["contentDetails"]["duration"]))
+        results[item["id"]] = metadata
+        video_metadata_collection.update_one(
+            {"_id": item["id"]},
+            {"$set": {"title": metadata[0], "channel": metadata[1], "duration": metadata[2],
+                      "channel_id": item["snippet"].get("channelId"),
+                      "published_at": item["snippet"].get("publishedAt"),
+                      "etag": response_etag, "batch_key": batch_key,
+                      "fetched_at": now, "expires_at": expires_at}},
+            upsert=True
+        )
+    return results
+
+
+def get_videos_metadata(video_ids, ttl=VIDEO_METADATA_TTL):
+    """
+    여러 비디오의 (제목, 채널, 길이)를 조회합니다.
+
+    공유 캐시(프로세스 내 → 프로세스/서버 간) → Mongo 캐시(video_metadata) → YouTube API(50개씩 묶음) 순으로 찾습니다.
+    만료된 항목은 ETag로 조건부 요청하여 변경이 없으면 할당량을 거의 쓰지 않습니다.
+    :return: {video_id: (제목, 채널, 길이)}. 존재하지 않는 비디오는 포함되지 않음
+    """
+    video_ids = list(dict.fromkeys(video_ids))
+    cached = cache.get_cache().get_many([METADATA_CACHE_KEY.format(video_id) for video_id in video_ids])
+    results = {}
+    for video_id in video_ids:
+        metadata = cached.get(METADATA_CACHE_KEY.format(video_id))
+        if metadata is not None:
+            results[video_id] = tuple(metadata)
+
+    missing = [video_id for video_id in video_ids if video_id not in results]
+    if not missing:
+        return results
+
+    stale_docs = {}
+    fresh = {}
+    utc_now = datetime.utcnow()
+    for doc in video_metadata_collection.find({"_id": {"$in": missing}}):
+        if doc["expires_at"] > utc_now:
+            fresh[doc["_id"]] = (doc["title"], doc["channel"], doc["duration"])
+        else:
+            stale_docs[doc["_id"]] = doc
+    _remember(fresh, ttl)
+    results.update(fresh)
+
+    to_fetch = [video_id for video_id in missing if video_id not in fresh]
+    for start in range(0, len(to_fetch), MAX_IDS_PER_REQUEST):
+        batch = to_fetch[start:start + MAX_IDS_PER_REQUEST]
+        fetched = _fetch_batch(batch, {video_id: stale_docs[video_id] for video_id in batch if video_id in stale_docs},
+                               ttl)
+        _remember(fetched, ttl)
+        results.update(fetched)
+    return results
+
+
+def get_video_metadata(video_id, ttl=VIDEO_METADATA_TTL):
+    """비디오 하나의 (제목, 채널, 길이)를 조회합니다. 없으면 ValueError"""
+    metadata = get_videos_metadata([video_id], ttl).get(video_id)
+    if metadata is None:
+        raise ValueError(f"비디오를 찾을 수 없습니다. 비디오 ID: {video_id}")
+    return metadata
@@ -1,18 +1,18 @@
 import streamlit as st
-from modules import video_processing, database
-import time
+from config import MAX_VIDEO_DURATION
+from modules import video_processing, database, jobs, bulk_import, subscriptions
+import logging
 
-st.set_page_config(page_title="동영상 처리 - 유튜브 질문하기", page_icon="🎥", layout="wide")
+logger = logging.getLogger(__name__)
 
+st.set_page_config(page_title="동영상 처리 - 유튜브 질문하기", page_icon="🎥", layout="wide")
 
-# Update the maximum video duration to 30 minutes
-video_processing.MAX_VIDEO_DURATION = 30 * 60  # 30 minutes in seconds
 
 def show_video_processing_form():
     st.header("새 YouTube 동영상 처리")
-    st.warning(f"참고: 현재 30분 미만의 동영상만 처리할 수 있습니다.")
+    st.warning(f"참고: 현재 {MAX_VIDEO_DURATION // 60}분 이하의 동영상만 처리할 수 있습니다.")
 
-    video_url = st.text_input("YouTube 동영상 URL 입력")
+    video_url = st.text_input("YouTube 동영상 URL 입력 (재생목록/채널 URL도 가능)")
     if st.button("동영상 처리", key="process_video_button"):
         if not video_url:
             st.error("YouTube 동영상 URL을 입력해주세요.")
@@ -20,35 +20,32 @@ def show_video_processing_form():
 
         try:
             user_id = st.session_state.user['_id']
+            if bulk_import.is_collection_url(video_url):
+                # 재생목록/채널은 동영상 목록을 펼쳐 백그라운드에서 한꺼번에 처리
+                job_id = jobs.submit_import_job(video_url, user_id)
+                st.success("재생목록/채널 가져오기 작업이 등록되었습니다. 길이 제한을 넘거나 이미 처리된 동영상은 건너뜁니다. 🏃")
+                logger.info(f"가져오기 작업 등록: {job_id}")
+                return
+
             with st.spinner("동영상 정보 가져오는 중... ⏳"):
-                title, channel, duration = video_processing.get_video_info(video_url)
-                if duration > video_processing.MAX_VIDEO_DURATION:
-                    st.error(f"이 동영상은 {duration // 60}분 길이입니다. 30분 미만의 동영상만 처리할 수 있습니다.")
+                # 비디오 정보와 기존 처리 여부를 동시에 조회
+                _, existing_video, video_info = video_processing.lookup_video(video_url)
+                title, channel, duration = video_info
+                if duration > MAX_VIDEO_DURATION:
+                    st.error(f"이 동영상은 {duration // 60}분 길이입니다. {MAX_VIDEO_DURATION // 60}분 이하의 동영상만 처리할 수 있습니다.")
                     return
                 estimated_time = (duration // 600) * 60 + (duration % 600) // 10  # Calculation based on 60 seconds per 10 minutes
                 st.info(f"**{title}** ({channel}) - 예상 처리 시간: 약 {estimated_time}초 ⏰")
 
-            # Check if the video has been processed before
-            _, video_id = video_processing.extract_video_id_and_process(video_url)
-            existing_video = video_processing.get_existing_video(video_id)
-
-            is_new_video = False
             if existing_video:
                 st.info(f"이 동영상은 이미 처리되었습니다. 기존 데이터를 사용합니다.")
-                video_processing.update_user_for_video(existing_video['_id'], user_id)
-                video_id = existing_video['_id']
+                video_processing.update_user_for_video(existing_video['video_id'], user_id)
+                st.session_state.last_processed_video_id = existing_video['_id']
             else:
-                is_new_video = True
-                progress_bar = st.progress(0, text="동영상 처리 중... 🏃")
-                start_time = time.time()
-
-                video_id = video_processing.process_video(video_url, user_id, progress_bar)
-
-                end_time = time.time()
-                elapsed_time = end_time - start_time
-                st.success(f"동영상 처리 완료! 🎉 (소요 시간: {video_processing.format_time(elapsed_time)})")
-
-            st.session_state.last_processed_video_id = video_id
+                # 처리는 백그라운드 작업으로 실행하고, 진행 상황은 아래 작업 목록에서 확인
+                job_id = jobs.submit_ingest_job(video_url, user_id, title, video_info)
+                st.success("동영상 처리 작업이 등록되었습니다. 다른 페이지로 이동해도 처리는 계속됩니다. 🏃")
+                logger.info(f"작업 등록: {job_id}")
 
             st.write("다음으로 무엇을 하시겠습니까?")
             col1, col2 = st.columns(2)
@@ -60,6 +57,61 @@ def show_video_processing_form():
         except Exception as e:
             st.error(f"오류가 발생했습니다: {str(e)}")
 
+
+def show_job_status(job):
+    title = job.get("title") or job.get("video_url", "")
+    status = job.get("status")
+    if status == jobs.STATUS_COMPLETED:
+        elapsed = (job["finished_at"] - job["started_at"]).total_seconds() if job.get("started_at") else 0
+        st.success(f"{title} - 처리 완료! 🎉 (소요 시간: {video_processing.format_time(elapsed)})")
+    elif status == jobs.STATUS_FAILED:
+        st.error(f"{title} - 처리 실패: {job.get('error', '알 수 없는 오류')}")
+    else:
+        st.progress(job.get("progress", 0), text=f"{title} - {job.get('stage', '대기 중')}")
+
+
+def show_jobs(user_id):
+    """사용자의 최근 처리 작업을 보여주고, 진행 중인 작업이 있으면 주기적으로 갱신합니다."""
+    polling = jobs.has_active_jobs(user_id)
+
+    @st.fragment(run_every=2 if polling else None)
+    def job_list():
+        user_jobs = jobs.get_user_jobs(user_id)
+        if not user_jobs:
+            return
+        st.subheader("처리 작업")
+        for job in user_jobs:
+            show_job_status(job)
+        # 진행 중이던 작업이 모두 끝나면 전체 페이지를 다시 그려 갱신을 멈춤
+        if polling and not any(job["status"] in jobs.ACTIVE_STATUSES for job in user_jobs):
+            st.rerun()
+
+    job_list()
+
+
+def show_subscriptions(user_id):
+    """채널 구독 관리: 구독한 채널의 새 업로드는 작업자가 주기적으로 확인하여 자동으로 처리합니다."""
+    with st.expander("📡 채널 구독 (새 업로드 자동 처리)"):
+        channel_url = st.text_input("구독할 채널 URL (예: https://www.youtube.com/@채널핸들)", key="subscription_url")
+        if st.button("구독", key="subscribe_button") and channel_url:
+            try:
+                subscription = subscriptions.subscribe(user_id, channel_url)
+                st.success(f"{subscription['channel_title']} 채널을 구독했습니다. 앞으로 올라오는 동영상이 자동으로 처리됩니다.")
+            except Exception as e:
+                st.error(f"구독 중 오류가 발생했습니다: {str(e)}")
+
+        for subscription in subscriptions.get_user_subscriptions(user_id):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                last_polled = subscription.get("last_polled_at")
+                st.write(f"**{subscription['channel_title']}** - 마지막 확인: "
+                         f"{last_polled.strftime('%Y-%m-%d %H:%M') if last_polled else '아직 없음'}")
+            with col2:
+                if st.button("구독 해제", key=f"unsubscribe_{subscription['channel_id']}"):
+                    subscriptions.unsubscribe(user_id, subscription['channel_id'])
+                    st.rerun()
+
+
 def main():
     st.title("⌛ 새 YouTube 동영상 처리")
 
@@ -69,6 +121,8 @@ def main():
         return
 
     show_video_processing_form()
+    show_subscriptions(st.session_state.user['_id'])
+    show_jobs(st.session_state.user['_id'])
 
 if __name__ == "__main__":
     main()
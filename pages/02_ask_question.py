@@ -1,5 +1,5 @@
 import streamlit as st
-from modules import database, nlp
+from modules import data_cache, database, nlp
 from datetime import datetime, timedelta
 import logging
 
@@ -7,13 +7,51 @@ logger = logging.getLogger(__name__)
 
 st.set_page_config(page_title="질문하기 - 유튜브 질문하기", page_icon="❓", layout="wide")
 
+# 정렬 옵션 -> (정렬 필드, 방향). 정렬과 페이지 나누기는 Mongo에서 처리
+SORT_OPTIONS = {
+    "처리 시간 (최신순)": ("processed_at", -1),
+    "처리 시간 (오래된순)": ("processed_at", 1),
+    "동영상 길이 (긴 순)": ("duration", -1),
+    "동영상 길이 (짧은 순)": ("duration", 1),
+}
+
 
 def display_response(question, response):
     st.markdown("### 질문:")
     st.write(question)
     st.divider()
     st.markdown("### 답변:")
-    st.write(response)
+    # 스트림이면 생성되는 대로 이어서 표시
+    if isinstance(response, str):
+        st.write(response)
+    else:
+        st.write_stream(response)
+
+
+def get_page_cursor(state_key, filters):
+    """필터나 정렬이 바뀌면 첫 페이지로 돌아가고, 현재 페이지의 커서를 반환"""
+    state = st.session_state.get(state_key)
+    if state is None or state["filters"] != filters:
+        # cursors: 지나온 페이지들의 시작 커서 스택 (이전 페이지로 돌아갈 때 pop)
+        state = {"filters": filters, "cursors": [None]}
+        st.session_state[state_key] = state
+    return state["cursors"][-1]
+
+
+def show_page_controls(state_key, next_cursor):
+    """이전/다음 페이지 버튼"""
+    state = st.session_state[state_key]
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("◀ 이전", key=f"{state_key}_prev", disabled=len(state["cursors"]) == 1):
+            state["cursors"].pop()
+            st.rerun()
+    with col_page:
+        st.markdown(f"<p style='text-align:center;'>{len(state['cursors'])} 페이지</p>", unsafe_allow_html=True)
+    with col_next:
+        if st.button("다음 ▶", key=f"{state_key}_next", disabled=next_cursor is None):
+            state["cursors"].append(next_cursor)
+            st.rerun()
 
 
 def show_individual_video_question(user_id):
@@ -23,21 +61,20 @@ def show_individual_video_question(user_id):
     st.subheader("필터 옵션")
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        all_tags = database.get_all_tags()
+        all_tags = data_cache.get_all_tags(user_id)
         logger.info(f"모든 태그: {all_tags}")
         selected_tags = st.multiselect("태그 선택", all_tags)
     with col2:
         today = datetime.now().date()
         date_range = st.date_input("날짜 범위 선택", [today - timedelta(days=30), today])
     with col3:
-        all_channels = database.get_all_channels(user_id)
+        all_channels = data_cache.get_all_channels(user_id)
         selected_channels = st.multiselect("채널 선택", all_channels)
     with col4:
         show_no_tags = st.checkbox("태그 없는 동영상만 표시")
 
     # Sort option
-    sort_options = ["처리 시간 (최신순)", "처리 시간 (오래된순)", "동영상 길이 (긴 순)", "동영상 길이 (짧은 순)"]
-    selected_sort = st.selectbox("정렬 기준", sort_options)
+    selected_sort = st.selectbox("정렬 기준", list(SORT_OPTIONS.keys()))
 
     # Apply filters and sorting
     start_date = None
@@ -54,30 +91,27 @@ def show_individual_video_question(user_id):
         start_date = datetime.combine(start_date, datetime.min.time())
         end_date = datetime.combine(end_date, datetime.max.time())
 
-    # Get filtered videos
-    videos = database.get_user_videos(
+    # Get filtered videos (current page only)
+    sort_field, sort_direction = SORT_OPTIONS[selected_sort]
+    filters = (tuple(selected_tags), start_date, end_date, tuple(selected_channels), show_no_tags, selected_sort)
+    cursor = get_page_cursor("question_video_pages", filters)
+    videos, next_cursor = data_cache.list_user_videos_page(
         user_id,
         selected_tags=selected_tags,
         start_date=start_date,
         end_date=end_date,
         selected_channels=selected_channels,
-        show_no_tags=show_no_tags
+        show_no_tags=show_no_tags,
+        sort_field=sort_field,
+        sort_direction=sort_direction,
+        cursor=cursor
     )
 
-    # Apply sorting
-    if selected_sort == "처리 시간 (최신순)":
-        videos.sort(key=lambda x: x.get('processed_at'), reverse=True)
-    elif selected_sort == "처리 시간 (오래된순)":
-        videos.sort(key=lambda x: x.get('processed_at'))
-    elif selected_sort == "동영상 길이 (긴 순)":
-        videos.sort(key=lambda x: x.get('duration'), reverse=True)
-    elif selected_sort == "동영상 길이 (짧은 순)":
-        videos.sort(key=lambda x: x.get('duration'))
-
     if videos:
         video_options = {f"{v['title']} - {v['channel']}": v['video_id'] for v in videos}
         selected_video_title = st.selectbox("동영상 선택", list(video_options.keys()),
                                             key="individual_video_selector")
+        show_page_controls("question_video_pages", next_cursor)
         selected_video_id = video_options[selected_video_title]
 
         question = st.text_input("질문을 입력하세요", key="individual_question_input")
@@ -85,9 +119,11 @@ def show_individual_video_question(user_id):
             if question:
                 with st.spinner("답변 생성 중..."):
                     try:
-                        video_data = database.get_video_info_from_db([selected_video_id])
-                        if video_data and 'transcript' in video_data[0]:
-                            response = nlp.generate_response(question, [video_data[0]['transcript']])
+                        # 목록에는 자막이 없으므로 질문한 동영상의 자막만 불러옴
+                        transcript = database.get_transcript(selected_video_id)
+                        if transcript:
+                            response = nlp.generate_response_stream(question, [transcript],
+                                                                    [selected_video_id], user_id)
                             display_response(question, response)
                         else:
                             st.error("선택한 동영상의 자막을 찾을 수 없습니다.")
@@ -101,11 +137,11 @@ def show_individual_video_question(user_id):
 
 def show_tag_based_question(user_id):
     st.subheader("태그 기반 질문")
-    all_tags = database.get_all_tags()
+    all_tags = data_cache.get_all_tags(user_id)
     selected_tags = st.multiselect("태그 선택", all_tags, key="tag_selector")
 
     if selected_tags:
-        videos = database.get_videos_by_tags(selected_tags)
+        videos = data_cache.list_videos_by_tags(selected_tags, user_id)
         if videos:
             st.write(f"선택된 동영상 수: {len(videos)}")
 
@@ -127,10 +163,10 @@ def show_tag_based_question(user_id):
                 if question:
                     with st.spinner("답변 생성 중..."):
                         try:
-                            video_data = database.get_video_info_from_db([v['video_id'] for v in videos])
-                            if video_data:
-                                transcripts = [v['transcript'] for v in video_data if 'transcript' in v]
-                                response = nlp.generate_response(question, transcripts)
+                            # 자막은 관련 구간 검색에 실패했을 때만 nlp에서 불러옴
+                            video_ids = [v['video_id'] for v in videos if v.get('transcript_length', 1)]
+                            if video_ids:
+                                response = nlp.generate_response_stream(question, None, video_ids, user_id)
                                 display_response(question, response)
                             else:
                                 st.error("선택한 동영상들의 자막을 찾을 수 없습니다.")
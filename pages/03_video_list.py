@@ -1,10 +1,9 @@
 # 03_video_list.py
 
 import streamlit as st
-from modules import database
+from modules import data_cache, database
 from datetime import datetime, timedelta
 import logging
-import time
 import re
 import streamlit_tags as st_tags
 
@@ -13,16 +12,13 @@ logger = logging.getLogger(__name__)
 
 st.set_page_config(page_title="동영상 목록 - 유튜브 질문하기", page_icon="📋", layout="wide")
 
-def delete_tag(video_id, tag):
-    try:
-        return database.remove_tag_from_video(video_id, tag)
-    except Exception as e:
-        logger.error(f"태그 삭제 중 오류 발생: {str(e)}")
-        return False
-
-def add_tag_to_video(video_id, new_tag):
-    success, message = database.add_tag_to_video(video_id, new_tag)
-    return success, message
+# 정렬 옵션 -> (정렬 필드, 방향). 정렬과 페이지 나누기는 Mongo에서 처리
+SORT_OPTIONS = {
+    "처리 시간 (최신순)": ("processed_at", -1),
+    "처리 시간 (오래된순)": ("processed_at", 1),
+    "동영상 길이 (긴 순)": ("duration", -1),
+    "동영상 길이 (짧은 순)": ("duration", 1),
+}
 
 def parse_title(title):
     # Remove emojis and replace consecutive spaces with a single space
@@ -31,6 +27,44 @@ def parse_title(title):
     # Select first 25 characters and add "🎥"
     return f"🎥 {title[:25].strip()}{'...' if len(title) > 25 else ''}"
 
+def get_page_cursor(state_key, filters):
+    """필터나 정렬이 바뀌면 첫 페이지로 돌아가고, 현재 페이지의 커서를 반환"""
+    state = st.session_state.get(state_key)
+    if state is None or state["filters"] != filters:
+        # cursors: 지나온 페이지들의 시작 커서 스택 (이전 페이지로 돌아갈 때 pop)
+        state = {"filters": filters, "cursors": [None]}
+        st.session_state[state_key] = state
+    return state["cursors"][-1]
+
+def show_page_controls(state_key, next_cursor):
+    """이전/다음 페이지 버튼"""
+    state = st.session_state[state_key]
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("◀ 이전", key=f"{state_key}_prev", disabled=len(state["cursors"]) == 1):
+            state["cursors"].pop()
+            st.rerun()
+    with col_page:
+        st.markdown(f"<p style='text-align:center;'>{len(state['cursors'])} 페이지</p>", unsafe_allow_html=True)
+    with col_next:
+        if st.button("다음 ▶", key=f"{state_key}_next", disabled=next_cursor is None):
+            state["cursors"].append(next_cursor)
+            st.rerun()
+
+def apply_tag_changes(tag_diffs):
+    """이번 실행에서 바뀐 모든 동영상의 태그를 bulk_write 한 번으로 반영하고 화면을 다시 그림"""
+    applied = database.bulk_update_video_tags(tag_diffs)
+    failed = [video_id for video_id, success in applied.items() if not success]
+    for video_id in failed:
+        # 변경이 거부되면 버전을 올려 위젯을 DB의 태그로 다시 그림
+        version_key = f"tags_version_{video_id}"
+        st.session_state[version_key] = st.session_state.get(version_key, 0) + 1
+    if failed:
+        st.toast(f"일부 동영상의 태그를 변경하지 못했습니다. (동영상당 최대 {database.MAX_VIDEO_TAGS}개)")
+    else:
+        st.toast("태그가 변경되었습니다.")
+    st.rerun()
+
 def main():
     st.title("📋 처리된 동영상 목록")
 
@@ -43,21 +77,20 @@ def main():
     st.subheader("필터 옵션")
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        all_tags = database.get_all_tags()
+        all_tags = data_cache.get_all_tags(st.session_state.user['_id'])
         logger.info(f"모든 태그: {all_tags}")
         selected_tags = st.multiselect("태그 선택", all_tags)
     with col2:
         today = datetime.now().date()
         date_range = st.date_input("날짜 범위 선택", [today - timedelta(days=30), today])
     with col3:
-        all_channels = database.get_all_channels(st.session_state.user['_id'])
+        all_channels = data_cache.get_all_channels(st.session_state.user['_id'])
         selected_channels = st.multiselect("채널 선택", all_channels)
     with col4:
         show_no_tags = st.checkbox("태그 없는 동영상만 표시")
 
     # Sort option
-    sort_options = ["처리 시간 (최신순)", "처리 시간 (오래된순)", "동영상 길이 (긴 순)", "동영상 길이 (짧은 순)"]
-    selected_sort = st.selectbox("정렬 기준", sort_options)
+    selected_sort = st.selectbox("정렬 기준", list(SORT_OPTIONS.keys()))
 
     # Apply filters and sorting
     start_date = None
@@ -74,30 +107,27 @@ def main():
         start_date = datetime.combine(start_date, datetime.min.time())
         end_date = datetime.combine(end_date, datetime.max.time())
 
-    # Get filtered videos
-    videos = database.get_user_videos(
+    # Get filtered videos (current page only)
+    sort_field, sort_direction = SORT_OPTIONS[selected_sort]
+    filters = (tuple(selected_tags), start_date, end_date, tuple(selected_channels), show_no_tags, selected_sort)
+    cursor = get_page_cursor("video_list_pages", filters)
+    videos, next_cursor = data_cache.list_user_videos_page(
         st.session_state.user['_id'],
         selected_tags=selected_tags,
         start_date=start_date,
         end_date=end_date,
         selected_channels=selected_channels,
-        show_no_tags=show_no_tags
+        show_no_tags=show_no_tags,
+        sort_field=sort_field,
+        sort_direction=sort_direction,
+        cursor=cursor
     )
 
-    # Apply sorting
-    if selected_sort == "처리 시간 (최신순)":
-        videos.sort(key=lambda x: x.get('processed_at'), reverse=True)
-    elif selected_sort == "처리 시간 (오래된순)":
-        videos.sort(key=lambda x: x.get('processed_at'))
-    elif selected_sort == "동영상 길이 (긴 순)":
-        videos.sort(key=lambda x: x.get('duration'), reverse=True)
-    elif selected_sort == "동영상 길이 (짧은 순)":
-        videos.sort(key=lambda x: x.get('duration'))
-
     if not videos:
         st.info("조건에 맞는 처리된 동영상이 없습니다.")
         st.page_link("pages/01_process_video.py", label="새 동영상 처리하기", icon="🎥")
     else:
+        tag_diffs = {}  # 동영상 _id -> (추가된 태그, 삭제된 태그)
         for video in videos:
             parsed_title = parse_title(video['title'])
             # Expander 추가 및 폰트 사이즈 복구
@@ -126,29 +156,23 @@ def main():
                 st.markdown("###### 태그")  # "Tags" 섹션 제목 추가
 
                 # streamlit-tags 컴포넌트를 사용하여 태그 입력 및 표시
+                # 변경이 거부되면 버전을 올려 위젯을 DB의 태그로 다시 그림
+                tags_version = st.session_state.get(f"tags_version_{video['_id']}", 0)
                 selected_tags = st_tags.st_tags(
                     label="",  # 라벨 숨기기
                     text="태그 입력",
                     value=tags,
                     suggestions=all_tags,  # 자동 완성 기능 추가
-                    key=f"tags_{video['_id']}"
+                    key=f"tags_{video['_id']}_{tags_version}"
                 )
 
-                # 새로운 태그 추가 로직 (st_tags에서 입력된 값 처리)
-                if st.session_state.get(f"tags_{video['_id']}") != selected_tags:
-                    new_tags = st.session_state.get(f"tags_{video['_id']}")
-                    # new_tags가 None인지 확인
-                    if new_tags is not None:
-                        for new_tag in new_tags:
-                            if new_tag not in tags:
-                                success, message = add_tag_to_video(video['_id'], new_tag)
-                                if success:
-                                    st.success("태그가 추가되었습니다.")
-                                else:
-                                    st.warning(message)
-                        st.session_state[f"tags_{video['_id']}"] = selected_tags
-                        time.sleep(1)
-                        st.experimental_rerun()
+                # 추가/삭제된 태그를 모아 두었다가 목록을 다 그린 뒤 한 번에 반영 (컴포넌트가 아직 값을 보내지 않았으면 변경 없음)
+                if selected_tags is None:
+                    selected_tags = tags
+                added_tags = [tag for tag in selected_tags if tag not in tags]
+                removed_tags = [tag for tag in tags if tag not in selected_tags]
+                if added_tags or removed_tags:
+                    tag_diffs[video['_id']] = (added_tags, removed_tags)
 
                 col1, col2 = st.columns(2)
                 with col1:
@@ -157,10 +181,17 @@ def main():
                         st.switch_page("pages/02_ask_question.py")
                 with col2:
                     if st.button(f"전체 자막 보기 📜", key=f"transcript_{video['_id']}"):
-                        if 'transcript' in video:
-                            st.text_area("전체 자막", value=video['transcript'], height=300)
+                        # 트랜스크립트는 목록 조회에 포함되지 않으므로 누를 때만 불러옴
+                        transcript = database.get_transcript(video['video_id'])
+                        if transcript:
+                            st.text_area("전체 자막", value=transcript, height=300)
                         else:
                             st.info("자막 정보가 없습니다")
 
+        if tag_diffs:
+            apply_tag_changes(tag_diffs)
+
+        show_page_controls("video_list_pages", next_cursor)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+chunk_text 마이크로 벤치마크
+
+기존 토큰 단위 루프 구현과 modules.chunking.split_text를 긴 한국어/영어 자막 텍스트로 비교합니다.
+사용법: python scripts/bench_chunking.py [--minutes 30] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+import tiktoken
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from modules import chunking  # noqa: E402
+
+KOREAN_SENTENCES = [
+    "오늘은 파이썬으로 데이터를 분석하는 방법을 알아보겠습니다.",
+    "먼저 필요한 라이브러리를 설치하고 환경을 설정해야 합니다.",
+    "이 부분이 조금 헷갈릴 수 있는데 천천히 따라오시면 됩니다.",
+    "영상이 도움이 되셨다면 구독과 좋아요 부탁드립니다.",
+    "그럼 다음 단계로 넘어가서 실제 예제를 살펴볼까요?",
+]
+ENGLISH_SENTENCES = [
+    "Today we are going to look at how to analyze data with Python.",
+    "First you need to install the required libraries and set up your environment.",
+    "This part can be a little confusing, so just follow along slowly.",
+    "If you found this video helpful, please like and subscribe.",
+    "So let's move on to the next step and look at a real example.",
+]
+
+
+def legacy_chunk_text(text, max_tokens=8000):
+    """변경 전 구현 (비교 기준)"""
+    enc = tiktoken.encoding_for_model("text-embedding-ada-002")
+    tokens = enc.encode(text)
+    chunks = []
+    current_chunk = []
+    current_chunk_tokens = 0
+
+    for token in tokens:
+        if current_chunk_tokens + 1 > max_tokens:
+            chunks.append(enc.decode(current_chunk))
+            current_chunk = []
+            current_chunk_tokens = 0
+        current_chunk.append(token)
+        current_chunk_tokens += 1
+
+    if current_chunk:
+        chunks.append(enc.decode(current_chunk))
+
+    return chunks
+
+
+def make_transcript(sentences, minutes, seed=0):
+    """분당 약 150단어 분량의 자막 텍스트를 생성합니다."""
+    rng = random.Random(seed)
+    target_words = minutes * 150
+    words = 0
+    parts = []
+    while words < target_words:
+        sentence = rng.choice(sentences)
+        parts.append(sentence)
+        words += len(sentence.split())
+    return ' '.join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-tokens", type=int, default=8000)
+    args = parser.parse_args()
+
+    # 인코더/어휘 테이블 로딩은 프로세스당 한 번이므로 측정에서 제외
+    chunking.split_text("warm up", max_tokens=args.max_tokens)
+
+    for label, sentences in (("korean", KOREAN_SENTENCES), ("english", ENGLISH_SENTENCES)):
+        text = make_transcript(sentences, args.minutes)
+        n_tokens = chunking.count_tokens(text)
+        legacy = min(timeit.repeat(lambda: legacy_chunk_text(text, args.max_tokens), number=1, repeat=args.repeat))
+        sliced = min(timeit.repeat(lambda: chunking.split_text(text, args.max_tokens, snap=False), number=1,
+                                   repeat=args.repeat))
+        snapped = min(timeit.repeat(lambda: chunking.split_text(text, args.max_tokens), number=1,
+                                    repeat=args.repeat))
+        print(f"{label:8s} chars={len(text):7d} tokens={n_tokens:6d} | "
+              f"legacy {legacy * 1000:8.2f} ms | slicing {sliced * 1000:8.2f} ms ({legacy / sliced:5.1f}x) | "
+              f"slicing+snap {snapped * 1000:8.2f} ms ({legacy / snapped:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+같은 video_id를 가진 중복 비디오 문서를 하나로 합치고 video_id 고유 인덱스를 만듭니다.
+
+동시 인제스트 선점을 도입하기 전에 생긴 중복 때문에 고유 인덱스를 만들 수 없을 때 실행합니다.
+- 남길 문서: 처리 완료 문서 중 가장 최근에 처리된 것 (처리 중 자리 표시 문서는 완료 문서가 없을 때만)
+- 나머지 문서의 user_ids는 합치고, 태그는 최대 개수(MAX_VIDEO_TAGS)까지 합친 뒤 삭제
+- 합친 후 사용자별 태그/채널 수(user_facets)를 다시 계산
+
+사용법: python scripts/dedupe_videos.py [--dry-run]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from pymongo import DeleteMany, UpdateOne
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from modules import database  # noqa: E402
+
+
+def _keeper_sort_key(video):
+    ready = video.get("status") != database.VIDEO_STATUS_PROCESSING
+    return ready, video.get("processed_at") or datetime.min, video.get("updated_at") or datetime.min
+
+
+def find_duplicate_groups():
+    """video_id별로 2개 이상인 문서 묶음 (트랜스크립트/임베딩은 읽지 않음)"""
+    pipeline = [
+        {"$group": {"_id": "$video_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    for group in database.videos_collection.aggregate(pipeline, allowDiskUse=True):
+        projection = {"status": 1, "processed_at": 1, "updated_at": 1, "user_ids": 1, "tags": 1}
+        yield group["_id"], list(database.videos_collection.find({"_id": {"$in": group["ids"]}}, projection))
+
+
+def merge_operations(videos):
+    """남길 문서의 갱신 연산과 삭제할 문서 _id 목록"""
+    videos = sorted(videos, key=_keeper_sort_key, reverse=True)
+    keeper, duplicates = videos[0], videos[1:]
+
+    user_ids = list(keeper.get("user_ids", []))
+    tags = list(keeper.get("tags", []))
+    for video in duplicates:
+        user_ids.extend(user_id for user_id in video.get("user_ids", []) if user_id not in user_ids)
+        for tag in video.get("tags", []):
+            if tag not in tags and len(tags) < database.MAX_VIDEO_TAGS:
+                tags.append(tag)
+    update = UpdateOne({"_id": keeper["_id"]}, {"$set": {"user_ids": user_ids, "tags": tags}})
+    return update, [video["_id"] for video in duplicates]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="중복 묶음만 출력")
+    args = parser.parse_args()
+
+    merged = 0
+    deleted = 0
+    for video_id, videos in find_duplicate_groups():
+        update, duplicate_ids = merge_operations(videos)
+        print(f"{video_id}: 문서 {len(videos)}개 -> 1개")
+        if args.dry_run:
+            continue
+        database.videos_collection.bulk_write([update, DeleteMany({"_id": {"$in": duplicate_ids}})], ordered=True)
+        merged += 1
+        deleted += len(duplicate_ids)
+
+    if args.dry_run:
+        return
+    print(f"videos: {merged}개 비디오의 중복 문서 {deleted}개 정리 완료")
+
+    if merged:
+        rebuilt = database.rebuild_user_facets()
+        print(f"user_facets: {rebuilt}명 다시 계산 완료")
+    database.videos_collection.create_index("video_id", unique=True)
+    print("videos: video_id 고유 인덱스 생성 완료")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+비디오/청크 문서를 압축 저장 형식으로 이전합니다.
+
+- videos: transcript(와 transcript_segments)를 transcripts 컬렉션에 zstd로 압축 저장하고 문서에서 제거,
+  embedding double 배열을 BSON Binary 벡터로 변환
+- video_chunks: embedding double 배열을 BSON Binary 벡터로 변환
+
+이미 이전된 문서는 건너뛰므로 중단 후 다시 실행해도 됩니다.
+사용법: python scripts/migrate_compact_storage.py [--dtype float32|int8] [--batch-size 200] [--dry-run]
+"""
+import argparse
+import os
+import sys
+
+from pymongo import UpdateOne
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from modules import database  # noqa: E402
+
+# BSON 타입 4 = 배열 (이전 전 double 배열 임베딩)
+LEGACY_EMBEDDING_FILTER = {"embedding": {"$type": "array"}}
+
+
+def migrate_videos(dtype, batch_size, dry_run):
+    query = {"$or": [{"transcript": {"$exists": True}}, LEGACY_EMBEDDING_FILTER]}
+    total = database.videos_collection.count_documents(query)
+    print(f"videos: 이전 대상 {total}개")
+    if dry_run:
+        return
+
+    migrated = 0
+    operations = []
+    for video in database.videos_collection.find(query, batch_size=batch_size):
+        update = {}
+        if "transcript" in video:
+            database.save_transcript(video["video_id"], video["transcript"], video.get("transcript_segments"))
+            update["$unset"] = {"transcript": "", "transcript_segments": ""}
+        if isinstance(video.get("embedding"), list):
+            update["$set"] = database.encode_embedding(video["embedding"], dtype)
+        operations.append(UpdateOne({"_id": video["_id"]}, update))
+        if len(operations) >= batch_size:
+            migrated += database.videos_collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+            print(f"videos: {migrated}/{total}")
+    if operations:
+        migrated += database.videos_collection.bulk_write(operations, ordered=False).modified_count
+    print(f"videos: {migrated}개 이전 완료")
+
+
+def migrate_chunks(dtype, batch_size, dry_run):
+    total = database.chunks_collection.count_documents(LEGACY_EMBEDDING_FILTER)
+    print(f"video_chunks: 이전 대상 {total}개")
+    if dry_run:
+        return
+
+    migrated = 0
+    operations = []
+    for chunk in database.chunks_collection.find(LEGACY_EMBEDDING_FILTER, {"embedding": 1}, batch_size=batch_size):
+        operations.append(UpdateOne({"_id": chunk["_id"]}, {"$set": database.encode_embedding(chunk["embedding"], dtype)}))
+        if len(operations) >= batch_size:
+            migrated += database.chunks_collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+            print(f"video_chunks: {migrated}/{total}")
+    if operations:
+        migrated += database.chunks_collection.bulk_write(operations, ordered=False).modified_count
+    print(f"video_chunks: {migrated}개 이전 완료")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dtype", choices=["float32", "int8"], default=database.EMBEDDING_STORAGE_DTYPE)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true", help="이전 대상 개수만 출력")
+    args = parser.parse_args()
+
+    migrate_videos(args.dtype, args.batch_size, args.dry_run)
+    migrate_chunks(args.dtype, args.batch_size, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
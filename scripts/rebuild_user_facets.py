@@ -0,0 +1,27 @@
+"""
+사용자별 태그/채널 수(user_facets)를 비디오 문서에서 다시 계산합니다.
+
+쓰기 경로에서 증감하는 값이 어긋났거나 user_facets를 처음 도입할 때 실행합니다.
+사용법: python scripts/rebuild_user_facets.py [--user-id USER_ID]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from modules import database  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    # videos.user_ids와 user_facets._id에는 사용자 ID가 문자열로 저장되어 있으므로 그대로 사용
+    parser.add_argument("--user-id", help="이 사용자만 다시 계산 (없으면 전체)")
+    args = parser.parse_args()
+
+    rebuilt = database.rebuild_user_facets(args.user_id)
+    print(f"user_facets: {rebuilt}명 다시 계산 완료")
+
+
+if __name__ == "__main__":
+    main()
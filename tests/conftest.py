@@ -0,0 +1,10 @@
+import os
+import sys
+
+# 모듈 임포트 시 만드는 클라이언트는 연결을 미루므로 실제 키/서버 없이도 테스트할 수 있음
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("YOUTUBE_API_KEY", "test")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
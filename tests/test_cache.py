@@ -0,0 +1,199 @@
+import threading
+
+import pytest
+
+from modules import cache as shared_cache
+
+
+class WatchError(Exception):
+    """redis.exceptions.WatchError와 같은 이름 (RedisCache는 이름으로 구분)"""
+
+
+class FakeRedis:
+    """RedisCache가 쓰는 redis-py 명령만 구현한 프로세스 내 대체 클라이언트 (만료는 무시)"""
+
+    def __init__(self):
+        self.data = {}
+        self.versions = {}  # 키 -> 쓰기 횟수 (WATCH 충돌 확인용)
+        self.lock = threading.Lock()
+
+    def _write(self, key, value):
+        self.data[key] = value
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        with self.lock:
+            if nx and key in self.data:
+                return None
+            self._write(key, value)
+            return True
+
+    def delete(self, key):
+        with self.lock:
+            if self.data.pop(key, None) is not None:
+                self.versions[key] = self.versions.get(key, 0) + 1
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.watched = {}
+        self.commands = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def watch(self, key):
+        self.watched[key] = self.client.versions.get(key, 0)
+
+    def unwatch(self):
+        self.watched = {}
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def multi(self):
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value))
+
+    def execute(self):
+        with self.client.lock:
+            if any(self.client.versions.get(key, 0) != version for key, version in self.watched.items()):
+                raise WatchError("watched key changed")
+            for key, value in self.commands:
+                self.client._write(key, value)
+        return [True] * len(self.commands)
+
+
+@pytest.fixture
+def redis_client():
+    return FakeRedis()
+
+
+def _tiered(redis_client, local_ttl=60):
+    return shared_cache.TieredCache(shared_cache.MemoryCache(), shared_cache.RedisCache(redis_client), local_ttl)
+
+
+def test_tiered_get_set_delete(redis_client):
+    cache = _tiered(redis_client)
+    assert cache.get("k") is None
+
+    cache.set("k", {"a": [1, 2]}, ttl=30)
+    assert cache.get("k") == {"a": [1, 2]}
+    assert cache.get_many(["k", "missing"]) == {"k": {"a": [1, 2]}}
+    # 공유 저장소에는 JSON으로 저장
+    assert redis_client.get("ytqa:k") == b'{"a":[1,2]}'
+
+    cache.delete("k")
+    assert cache.get("k") is None
+    assert redis_client.get("ytqa:k") is None
+    metrics = cache.snapshot()
+    assert metrics["sets"] == 1 and metrics["deletes"] == 1 and metrics["errors"] == 0
+
+
+def test_tiered_reads_other_replica_writes_through_shared(redis_client):
+    writer, reader = _tiered(redis_client), _tiered(redis_client)
+    writer.set("k", "v1")
+    assert reader.get("k") == "v1"
+    assert reader.local.get("k") == "v1"
+
+
+def test_tiered_local_copy_is_stale_until_local_ttl(redis_client, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(shared_cache.time, "monotonic", lambda: clock[0])
+    writer, reader = _tiered(redis_client, local_ttl=10), _tiered(redis_client, local_ttl=10)
+    writer.set("k", "v1")
+    assert reader.get("k") == "v1"
+
+    writer.delete("k")
+    # 다른 레플리카의 무효화는 local 사본이 만료될 때까지 보이지 않음. 토큰 조회는 공유 저장소를 봄
+    assert reader.get("k") == "v1"
+    assert reader.get_with_token("k") == (None, None)
+    clock[0] += 10
+    assert reader.get("k") is None
+
+
+def test_tiered_falls_back_to_miss_on_shared_errors(redis_client):
+    cache = _tiered(redis_client)
+
+    def broken(*args, **kwargs):
+        raise ConnectionError("down")
+
+    redis_client.get = redis_client.mget = redis_client.set = broken
+    cache.set("k", "v")
+    assert cache.get("k") == "v"  # local에는 남음
+    assert cache.get_with_token("k") == (None, None)
+    assert cache.snapshot()["errors"] == 2  # set, get_with_token (get은 local에서 찾음)
+
+
+def test_update_appends_with_compare_and_set(redis_client):
+    cache = _tiered(redis_client)
+    assert shared_cache.update(cache, "list", lambda values: (values or []) + ["a"]) == ["a"]
+    assert shared_cache.update(cache, "list", lambda values: (values or []) + ["b"]) == ["a", "b"]
+    assert cache.get("list") == ["a", "b"]
+
+
+def test_update_retries_after_concurrent_write(redis_client):
+    cache = _tiered(redis_client)
+    other = _tiered(redis_client)
+    cache.set("list", ["a"])
+    calls = []
+
+    def append_b(values):
+        calls.append(list(values))
+        if len(calls) == 1:
+            # 읽은 뒤 저장하기 전에 다른 레플리카가 값을 바꿈
+            other.set("list", values + ["x"])
+        return values + ["b"]
+
+    assert shared_cache.update(cache, "list", append_b) == ["a", "x", "b"]
+    assert calls == [["a"], ["a", "x"]]
+    assert cache.shared.snapshot()["cas_conflicts"] == 1
+    assert other.get_with_token("list")[0] == ["a", "x", "b"]
+
+
+def test_compare_and_set_detects_watch_conflict(redis_client, monkeypatch):
+    cache = shared_cache.RedisCache(redis_client)
+    cache.set("k", 1)
+    _, token = cache.get_with_token("k")
+
+    original_execute = FakePipeline.execute
+
+    def execute_after_other_write(pipe):
+        # WATCH 이후 EXEC 전에 다른 클라이언트가 씀
+        redis_client.set("ytqa:k", b"2")
+        return original_execute(pipe)
+
+    monkeypatch.setattr(FakePipeline, "execute", execute_after_other_write)
+    assert cache.compare_and_set("k", 3, token) is False
+    monkeypatch.undo()
+    assert cache.get("k") == 2
+    # 키가 없을 때만 저장 (토큰 None)
+    assert cache.compare_and_set("new", "v", None) is True
+    assert cache.compare_and_set("new", "w", None) is False
+
+
+def test_sqlite_compare_and_set(tmp_path):
+    cache = shared_cache.SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.compare_and_set("k", ["a"], None) is True
+    value, token = cache.get_with_token("k")
+    assert value == ["a"]
+    cache.set("k", ["other"])
+    assert cache.compare_and_set("k", ["a", "b"], token) is False
+    assert shared_cache.update(cache, "k", lambda values: values + ["b"]) == ["other", "b"]
+    cache.delete("k")
+    assert cache.get("k") is None
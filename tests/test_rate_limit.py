@@ -0,0 +1,45 @@
+import requests
+from yt_dlp.networking import Response
+from yt_dlp.networking.exceptions import HTTPError as YtdlpHTTPError
+from yt_dlp.utils import DownloadError
+
+from modules import rate_limit
+
+
+def _requests_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def test_classify_requests_http_errors():
+    assert rate_limit.classify_error(_requests_error(429, {"Retry-After": "3"})) == (True, True, 3.0)
+    assert rate_limit.classify_error(_requests_error(503)) == (True, False, None)
+    assert rate_limit.classify_error(_requests_error(404)) == (False, False, None)
+
+
+def test_classify_wrapped_ytdlp_http_error():
+    response = Response(None, "https://www.youtube.com/watch?v=x", {"Retry-After": "5"}, status=429)
+    try:
+        raise YtdlpHTTPError(response)
+    except YtdlpHTTPError as e:
+        # yt-dlp는 원래 예외를 exc_info에 담은 DownloadError로 다시 던짐
+        error = DownloadError("ERROR: HTTP Error 429", exc_info=(type(e), e, e.__traceback__))
+    assert rate_limit.classify_error(error) == (True, True, 5.0)
+
+
+def test_call_retries_requests_429(monkeypatch):
+    monkeypatch.setattr(rate_limit.time, "sleep", lambda seconds: None)
+    limiter = rate_limit.ProviderLimiter("test", requests_per_minute=6000, max_retries=2)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise _requests_error(429, {"Retry-After": "0"})
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    metrics = limiter.snapshot()
+    assert metrics["retries"] == 1 and metrics["throttled"] == 1 and metrics["succeeded"] == 1
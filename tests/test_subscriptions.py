@@ -0,0 +1,123 @@
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from modules import subscriptions, youtube_api
+
+
+def _item(video_id, published_at):
+    content_details = {"videoId": video_id}
+    if published_at:
+        content_details["videoPublishedAt"] = published_at
+    return {"contentDetails": content_details}
+
+
+class FakeYouTube:
+    """playlistItems만 흉내 내는 로컬 YouTube Data API 대체 서버"""
+
+    def __init__(self):
+        self.pages = {}  # (playlistId, pageToken) -> (ETag, 응답 JSON)
+        self.requests = []  # (경로, 쿼리, If-None-Match)
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                if_none_match = self.headers.get("If-None-Match")
+                fake.requests.append((parsed.path, query, if_none_match))
+
+                page = fake.pages.get((query.get("playlistId"), query.get("pageToken")))
+                if page is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                etag, body = page
+                if if_none_match == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                payload = json.dumps(dict(body, etag=etag)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def add_page(self, playlist_id, items, etag, page_token=None, next_page_token=None):
+        body = {"items": items}
+        if next_page_token:
+            body["nextPageToken"] = next_page_token
+        self.pages[(playlist_id, page_token)] = (etag, body)
+
+
+@pytest.fixture
+def fake_youtube(monkeypatch):
+    fake = FakeYouTube()
+    thread = threading.Thread(target=fake.server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(youtube_api, "YOUTUBE_API_BASE_URL", fake.url)
+    yield fake
+    fake.server.shutdown()
+    fake.server.server_close()
+
+
+def test_find_new_uploads_uses_video_published_at_watermark(fake_youtube):
+    fake_youtube.add_page("UU1", [
+        _item("new2", "2024-03-02T10:00:00Z"),
+        _item("new1", "2024-03-01T09:00:00+09:00"),
+        _item("private", None),
+        _item("old", "2024-02-01T00:00:00Z"),
+    ], etag='"page1-v1"')
+    subscription = {"uploads_playlist_id": "UU1", "watermark": datetime(2024, 2, 15), "etag": None}
+
+    video_ids, watermark, etag = subscriptions.find_new_uploads(subscription)
+
+    # 기준점 이후 게시된 비디오만 오래된 순으로, 기준점은 가장 최근 게시 시각(UTC)으로
+    assert video_ids == ["new1", "new2"]
+    assert watermark == datetime(2024, 3, 2, 10, 0, 0)
+    assert etag == '"page1-v1"'
+    assert fake_youtube.requests[0][2] is None
+
+
+def test_find_new_uploads_page1_not_modified(fake_youtube):
+    fake_youtube.add_page("UU1", [_item("new1", "2024-03-01T00:00:00Z")], etag='"page1-v1"')
+    watermark = datetime(2024, 2, 15)
+    subscription = {"uploads_playlist_id": "UU1", "watermark": watermark, "etag": '"page1-v1"'}
+
+    assert subscriptions.find_new_uploads(subscription) == ([], watermark, '"page1-v1"')
+    # 첫 페이지는 저장된 ETag로 조건부 요청하고, 304면 다음 페이지를 요청하지 않음
+    assert len(fake_youtube.requests) == 1
+    path, query, if_none_match = fake_youtube.requests[0]
+    assert path.endswith("/playlistItems")
+    assert query["playlistId"] == "UU1"
+    assert if_none_match == '"page1-v1"'
+
+
+def test_find_new_uploads_follows_pages_while_all_new(fake_youtube):
+    fake_youtube.add_page("UU1", [_item("c", "2024-03-03T00:00:00Z"), _item("b", "2024-03-02T00:00:00Z")],
+                          etag='"page1-v2"', next_page_token="p2")
+    fake_youtube.add_page("UU1", [_item("a", "2024-03-01T00:00:00Z"), _item("old", "2024-01-01T00:00:00Z")],
+                          etag='"page2-v2"', page_token="p2", next_page_token="p3")
+    subscription = {"uploads_playlist_id": "UU1", "watermark": datetime(2024, 2, 1), "etag": '"page1-v1"'}
+
+    video_ids, watermark, etag = subscriptions.find_new_uploads(subscription)
+
+    assert video_ids == ["a", "b", "c"]
+    assert watermark == datetime(2024, 3, 3)
+    # 저장하는 ETag는 첫 페이지의 것
+    assert etag == '"page1-v2"'
+    # 기준점 이전 항목이 나온 페이지에서 멈춤 (p3는 요청하지 않음)
+    assert [query.get("pageToken") for _, query, _ in fake_youtube.requests] == [None, "p2"]
@@ -0,0 +1,53 @@
+# worker.py
+
+import logging
+import os
+import threading
+import time
+
+from modules import cache, database, jobs, rate_limit, subscriptions
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 2  # 대기 작업이 없을 때 다시 확인하기까지의 시간 (초)
+STALE_CHECK_INTERVAL = 60
+
+
+def work_loop():
+    while True:
+        try:
+            if jobs.run_job() is None:
+                time.sleep(POLL_INTERVAL)
+        except Exception as e:
+            logger.error(f"작업 실행 루프 오류: {str(e)}")
+            time.sleep(POLL_INTERVAL)
+
+
+def main():
+    """웹 프로세스와 별도로 jobs 컬렉션의 대기 작업을 가져와 동시에 여러 개 실행합니다."""
+    concurrency = int(os.getenv("WORKER_CONCURRENCY", "2"))
+    logger.info(f"작업자 시작: {jobs.WORKER_ID} (동시 작업 {concurrency}개)")
+    database.ensure_indexes()
+    for _ in range(concurrency):
+        threading.Thread(target=work_loop, daemon=True).start()
+
+    while True:
+        try:
+            jobs.requeue_stale_jobs()
+        except Exception as e:
+            logger.error(f"중단된 작업 확인 오류: {str(e)}")
+        # 확인할 때가 된 채널 구독의 새 업로드를 작업으로 등록
+        try:
+            subscriptions.poll_due_subscriptions()
+        except Exception as e:
+            logger.error(f"채널 구독 확인 오류: {str(e)}")
+        for provider, metrics in rate_limit.get_metrics().items():
+            logger.info(f"API 호출 지표 [{provider}]: {metrics}")
+        for tier, metrics in cache.get_metrics().items():
+            logger.info(f"캐시 지표 [{tier}]: {metrics}")
+        time.sleep(STALE_CHECK_INTERVAL)
+
+
+if __name__ == "__main__":
+    main()